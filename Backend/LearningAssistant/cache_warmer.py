@@ -0,0 +1,210 @@
+import asyncio
+import os
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from observability.metrics import CACHE_WARMED
+from observability.tracing import CourseTrace, start_trace
+
+
+@dataclass
+class WarmingSchedule:
+    """When the cache warmer runs and how much it may spend per run.
+
+    `hours` is an off-peak window in UTC, start inclusive and end exclusive; it may wrap
+    past midnight (22-4). Searches are paced to `searches_per_minute` (cache hits are not
+    counted) and a run stops once its fetches downloaded `max_bytes`.
+
+    The caches are in-process, so every replica warms its own and the budgets are per
+    replica: N pods search up to N times `searches_per_minute`. Each pod starts at a random
+    point within the first `stagger_minutes` of the window so they do not all begin at once.
+    """
+    hours: Optional[Tuple[int, int]] = (2, 6)
+    pairs: int = 50                   # most requested (topic, subtopic) pairs warmed per run
+    history: int = 5000               # recent course requests they are counted over
+    subtopics_per_call: int = 3       # subtopics researched per topic in one go
+    searches_per_minute: float = 20.0
+    max_bytes: int = 50 * 1024 * 1024
+    stagger_minutes: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "WarmingSchedule":
+        """Read overrides such as CACHE_WARM_HOURS=1-5 (empty disables warming) from the environment"""
+        schedule = cls()
+        hours = os.getenv("CACHE_WARM_HOURS")
+        if hours is not None:
+            start, _, end = hours.partition("-")
+            schedule.hours = (int(start), int(end)) if hours.strip() else None
+        schedule.pairs = int(os.getenv("CACHE_WARM_PAIRS", schedule.pairs))
+        schedule.history = int(os.getenv("CACHE_WARM_HISTORY", schedule.history))
+        schedule.searches_per_minute = float(os.getenv("CACHE_WARM_SEARCHES_PER_MINUTE", schedule.searches_per_minute))
+        schedule.max_bytes = int(os.getenv("CACHE_WARM_MAX_BYTES", schedule.max_bytes))
+        schedule.stagger_minutes = float(os.getenv("CACHE_WARM_STAGGER_MINUTES", schedule.stagger_minutes))
+        return schedule
+
+    @property
+    def enabled(self) -> bool:
+        return self.hours is not None and self.pairs > 0
+
+    def in_window(self, now: datetime) -> bool:
+        start, end = self.hours
+        return start <= now.hour < end if start <= end else now.hour >= start or now.hour < end
+
+    def next_window(self, now: datetime) -> Tuple[datetime, datetime]:
+        """Start and end of the window `now` is in, or else of the next one"""
+        start, end = self.hours
+        opens = now.replace(hour=start, minute=0, second=0, microsecond=0)
+        if self.in_window(now):
+            if opens > now:
+                opens -= timedelta(days=1)
+        elif opens <= now:
+            opens += timedelta(days=1)
+        hours_open = (end - start) % 24 or 24
+        return opens, opens + timedelta(hours=hours_open)
+
+
+class WarmingBudgetExhausted(Exception):
+    """Raised inside the research of a warming run once the run may not search or fetch more"""
+
+
+class WarmingLimiter:
+    """The pacing and byte budget of one warming run, applied to each search and extraction.
+
+    LearningService.warm_research asks before every search that misses the cache and
+    before every extraction batch, so the budgets hold within a research call rather than
+    only between them. Bytes are those of the run's fetches as recorded in `trace`; a batch
+    that is already being extracted may take the run past `max_bytes`.
+    """
+
+    def __init__(self, schedule: WarmingSchedule, time_budget: float, trace: CourseTrace):
+        self.schedule = schedule
+        self.trace = trace
+        self.started = time.monotonic()
+        self.deadline = self.started + time_budget
+        self.searches = 0
+
+    @property
+    def bytes(self) -> int:
+        return sum(fetch["bytes"] for fetch in self.trace.fetches)
+
+    def check(self):
+        if self.bytes >= self.schedule.max_bytes:
+            raise WarmingBudgetExhausted("byte budget")
+        if time.monotonic() >= self.deadline:
+            raise WarmingBudgetExhausted("window closed")
+
+    async def before_search(self):
+        """Wait until the rate allows another search"""
+        self.check()
+        # Searches so far may not have been issued faster than the rate allows
+        issue_at = self.started + self.searches * 60.0 / self.schedule.searches_per_minute
+        if issue_at >= self.deadline:
+            raise WarmingBudgetExhausted("window closed")
+        self.searches += 1
+        await asyncio.sleep(max(0.0, issue_at - time.monotonic()))
+
+    async def before_extract(self):
+        self.check()
+
+
+class CacheWarmer:
+    """Researches the most requested (topic, subtopic) pairs ahead of demand.
+
+    During the schedule's off-peak window the research stage of LearningService runs for
+    the pairs most requested in recent course history, most popular first, which fills
+    the search and page content caches so the first requests of the day start warm. Each
+    topic's subtopics are researched a few at a time; the topic's own research is then
+    served from the cache after the first batch.
+    """
+
+    def __init__(self, service, schedule: WarmingSchedule,
+                 source: Callable[[int, int], Awaitable[List[Dict[str, Any]]]]):
+        self.service = service
+        self.schedule = schedule
+        # (limit, history) -> [{"topic", "subtopic", "count"}], most requested first
+        self.source = source
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def start(self):
+        if self.schedule.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            now = datetime.now(timezone.utc)
+            opens, closes = self.schedule.next_window(now)
+            # Replicas warm independently; spread their starts over the beginning of the window
+            stagger = random.uniform(0.0, self.schedule.stagger_minutes * 60.0)
+            await asyncio.sleep(max(0.0, (opens - now).total_seconds() + stagger))
+            try:
+                await self.warm((closes - datetime.now(timezone.utc)).total_seconds())
+            except Exception as e:
+                print(f"Cache warming failed: {str(e)}")
+            # Once per window
+            await asyncio.sleep(max(0.0, (closes - datetime.now(timezone.utc)).total_seconds()))
+
+    def _batches(self, pairs: List[Dict[str, Any]]) -> List[Tuple[str, List[str]]]:
+        """(topic, subtopics) research calls, most requested topic first"""
+        topics: Dict[str, Tuple[str, Dict[str, str]]] = {}
+        for pair in pairs:
+            topic = pair["topic"].strip()
+            subtopic = pair["subtopic"].strip()
+            if topic and subtopic:
+                topics.setdefault(topic.casefold(), (topic, {}))[1].setdefault(subtopic.casefold(), subtopic)
+        size = max(1, self.schedule.subtopics_per_call)
+        batches = []
+        for topic, subtopics in topics.values():
+            names = list(subtopics.values())
+            batches.extend((topic, names[i:i + size]) for i in range(0, len(names), size))
+        return batches
+
+    async def warm(self, time_budget: float) -> Dict[str, Any]:
+        """One warming run, stopping when the pairs, the byte budget or `time_budget` run out"""
+        async with self._lock:
+            schedule = self.schedule
+            run = {"started_at": datetime.now(timezone.utc).isoformat(), "topics": 0, "pairs": 0,
+                   "searches": 0, "bytes": 0, "seconds": 0.0, "stopped": "done"}
+            pairs = await self.source(schedule.pairs, schedule.history)
+            print(f"Warming caches for {len(pairs)} popular (topic, subtopic) pairs")
+
+            warmed_topics = set()
+            with start_trace() as trace:
+                limiter = WarmingLimiter(schedule, time_budget, trace)
+                for topic, subtopics in self._batches(pairs):
+                    try:
+                        limiter.check()
+                        await self.service.warm_research(topic, subtopics, limiter=limiter)
+                    except WarmingBudgetExhausted as e:
+                        run["stopped"] = str(e)
+                        break
+                    except Exception as e:
+                        print(f"Cache warming for '{topic}' failed: {str(e)}")
+                        continue
+                    finally:
+                        # Spans are only needed for the byte count's fetches
+                        trace.spans.clear()
+                    warmed_topics.add(topic.casefold())
+                    run["topics"] = len(warmed_topics)
+                    run["pairs"] += len(subtopics)
+                    CACHE_WARMED.inc(len(subtopics))
+
+            run["searches"] = limiter.searches
+            run["bytes"] = limiter.bytes
+            run["seconds"] = round(time.monotonic() - limiter.started, 2)
+            print(f"Cache warming finished: {run}")
+            self.last_run = run
+            return run
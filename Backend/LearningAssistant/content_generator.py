@@ -1,14 +1,71 @@
-from google import genai
 import asyncio
-from typing import List, Dict, Optional
+import time
+from typing import Awaitable, Callable, List, Dict, Mapping, Optional, Tuple
 import re
+from .context_cache import SharedContext
+from .model_router import ModelRouter
 from .models import DifficultyLevel, TopicIntroduction, SubTopicContent
-from dotenv import load_dotenv
-load_dotenv()
+from observability.metrics import LLM_FAILOVERS
+from observability.tracing import record_llm_usage, span
 class ContentGenerator:
-    def __init__(self):
+    def __init__(self, client=None, call_timeout: float = 120.0, router: Optional[ModelRouter] = None,
+                 context_cache_ttl: float = 900.0, context_cache_min_chars: int = 4000):
+        # `client` lets callers (e.g. the offline benchmarks) swap in a stand-in for genai.Client
+        if client is None:
+            # Imported here: google.genai alone takes most of a second to import
+            from google import genai
+            from google.genai import types
+            # The HTTP timeout also ends a call nobody is waiting for any more (in milliseconds)
+            client = genai.Client(http_options=types.HttpOptions(timeout=int(call_timeout * 1000)))
+        self.model = client
+        self.call_timeout = call_timeout
+        self.router = router or ModelRouter()
+        # Shared course context is cached with the provider only when it is long enough to pay off
+        # (providers also reject small caches); 0 disables caching
+        self.context_cache_ttl = context_cache_ttl
+        self.context_cache_min_chars = context_cache_min_chars
 
-        self.model = genai.Client()
+    async def _generate(self, call: str, prompt: str, shared: Optional[SharedContext] = None, **span_attrs) -> Tuple[object, str]:
+        """Run a single LLM call on the async client, timed and with token usage recorded.
+
+        Models are tried in the router's order for the call type, moving on when one times
+        out or fails. With `shared`, the prompt is sent after the shared course context,
+        by reference when the context is cached for the model. Returns the response and
+        the model that produced it.
+        """
+        timeout = min(self.router.route(call).timeout, self.call_timeout)
+        errors = []
+        for model in self.router.candidates(call):
+            contents, config = prompt, {}
+            if shared:
+                cache_name = await shared.cache_for(model)
+                if cache_name:
+                    config = {"config": {"cached_content": cache_name}}
+                else:
+                    contents = shared.inline(prompt)
+            started = time.perf_counter()
+            try:
+                with span(f"llm.{call}", model=model, cached=bool(config), **span_attrs) as attrs:
+                    # The async client runs on the event loop, so a timeout or cancellation
+                    # really aborts the request instead of leaving a worker thread blocked on it
+                    response = await asyncio.wait_for(
+                        self.model.aio.models.generate_content(
+                            model=model,
+                            contents=contents,
+                            **config
+                        ),
+                        timeout=timeout
+                    )
+                    attrs["prompt_tokens"], attrs["response_tokens"] = record_llm_usage(call, response)
+            except Exception as e:
+                self.router.record(model, time.perf_counter() - started, ok=False)
+                LLM_FAILOVERS.labels(call=call, model=model).inc()
+                errors.append(f"{model}: {str(e) or type(e).__name__}")
+                print(f"LLM call '{call}' failed on {model}: {errors[-1]}")
+                continue
+            self.router.record(model, time.perf_counter() - started, ok=True)
+            return response, model
+        raise Exception(f"every model failed for '{call}' ({'; '.join(errors)})")
     
     async def design_course_structure(
         self,
@@ -56,11 +113,7 @@ class ContentGenerator:
         """
         
         try:
-            response = await asyncio.to_thread(
-                self.model.models.generate_content,
-                 model="gemini-2.5-flash",
-                contents = prompt
-            )
+            response, _ = await self._generate("design", prompt)
             
             content = response.text if response.text else ""
             
@@ -115,43 +168,89 @@ class ContentGenerator:
         }
         return contexts[difficulty]
 
+    @staticmethod
+    def _difficulty_block(difficulty_context: dict[str, str], shared: Optional[SharedContext], keys) -> str:
+        if shared:
+            return "Difficulty Context: as given in the course context above."
+        lines = "\n".join(f"        - {key.capitalize()}: {difficulty_context[key]}" for key in keys)
+        return f"Difficulty Context:\n{lines}"
+
+    def open_shared_context(
+        self,
+        topic: str,
+        difficulty: DifficultyLevel,
+        topic_extracted_content: Mapping[str, str],
+        language: str = "english"
+    ) -> SharedContext:
+        """Course context used by the introduction and every section of one course.
+
+        Holds what those prompts would otherwise each repeat: the difficulty guidance and
+        the topic research. The caller closes it once the course is generated.
+        """
+        difficulty_context = self._get_difficulty_context(difficulty)
+        research_context = "\n".join(
+            f"Source content: {content[:1000]}..."
+            for content in topic_extracted_content.values() if content
+        )
+        text = f"""
+        COURSE CONTEXT
+        Topic: {topic}
+        Level: {difficulty.value}, written in {language}
+
+        Difficulty Context:
+        - Tone: {difficulty_context['tone']}
+        - Depth: {difficulty_context['depth']}
+        - Examples: {difficulty_context['examples']}
+        - Length: {difficulty_context['length']}
+
+        Topic Research Context (use as reference):
+        {research_context}
+        """
+        return SharedContext(
+            self.model,
+            text,
+            ttl=self.context_cache_ttl,
+            display_name=f"course: {topic}",
+            enabled=0 < self.context_cache_min_chars <= len(text)
+        )
+
     async def generate_topic_introduction(
         self, 
         topic: str, 
         subtopics: List[str], 
         difficulty: DifficultyLevel,
-        topic_extracted_content: Dict[str, str],
-        subtopic_content_map: Dict[str, Dict[str, str]],
-        language: str = "english"
+        topic_extracted_content: Mapping[str, str],
+        subtopic_content_map: Mapping[str, Mapping[str, str]],
+        language: str = "english",
+        shared: Optional[SharedContext] = None
     ) -> TopicIntroduction:
-        """Generate comprehensive introduction for the main topic"""
+        """Generate comprehensive introduction for the main topic.
+
+        With `shared`, the difficulty guidance and topic research come from the shared
+        course context instead of this prompt.
+        """
         
         difficulty_context = self._get_difficulty_context(difficulty)
         
         # Combine extracted content for context
-        research_context = "\n".join([
+        research_context = "See the topic research in the course context above." if shared else "\n".join([
             f"Source content: {content[:1000]}..." 
             for content in topic_extracted_content.values() if content
         ])
         
-        # provide some context related to subtopics as well
-        all_subtopic_content = []
-        for subtopic_content in subtopic_content_map.values():
-            all_subtopic_content.extend(subtopic_content.values())
-        
-        if all_subtopic_content:
-            research_context += "\nSubtopic source content:\n" + "\n".join([
-                f"Source content: {content[:400]}..." 
-                for content in all_subtopic_content if content
-            ])
+        # provide some context related to subtopics as well, one source at a time
+        subtopic_context = "\n".join(
+            f"Source content: {content[:400]}..."
+            for subtopic_content in subtopic_content_map.values()
+            for content in subtopic_content.values() if content
+        )
+        if subtopic_context:
+            research_context += "\nSubtopic source content:\n" + subtopic_context
         
         prompt = f"""
         Create a comprehensive introduction for the topic "{topic}" at {difficulty.value} level in {language}.
         
-        Difficulty Context:
-        - Tone: {difficulty_context['tone']}
-        - Depth: {difficulty_context['depth']}
-        - Examples: {difficulty_context['examples']}
+        {self._difficulty_block(difficulty_context, shared, ("tone", "depth", "examples"))}
         
         Subtopics to be covered: {', '.join(subtopics)}
         
@@ -187,11 +286,7 @@ class ContentGenerator:
         """
         
         try:
-            response = await asyncio.to_thread(
-                self.model.models.generate_content,
-                 model="gemini-2.5-flash",
-                contents = prompt
-            )
+            response, model = await self._generate("introduction", prompt, shared)
 
             content = response.text if response.text else ""
 
@@ -223,7 +318,8 @@ class ContentGenerator:
                 overview=sections.get('overview', ''),
                 learning_objectives=learning_objectives,
                 prerequisites=prerequisites,
-                word_count=len(content.split())
+                word_count=len(content.split()),
+                model=model
             )
         except Exception as e:
             raise Exception(f"Error generating topic introduction: {str(e)}")
@@ -234,20 +330,28 @@ class ContentGenerator:
         topic: str,
         subtopic: str,
         difficulty: DifficultyLevel,
-        topic_extracted_content: Dict[str, str],
-        subtopic_content_map: Dict[str, Dict[str, str]],
+        topic_extracted_content: Mapping[str, str],
+        subtopic_content_map: Mapping[str, Mapping[str, str]],
         learning_objectives: List[str] | None,
         language: str = "english",
+        shared: Optional[SharedContext] = None
     ) -> SubTopicContent:
-        """Generate comprehensive content for a subtopic with learning objectives context"""
+        """Generate comprehensive content for a subtopic with learning objectives context.
+
+        With `shared`, only the subtopic-specific part of the prompt is sent; the
+        difficulty guidance and topic research come from the shared course context.
+        """
         
         difficulty_context = self._get_difficulty_context(difficulty)
         
         # Get topic context
-        relevant_content = "Topic Source Content:\n" + "\n".join([
-            f"Source: {content[:500]}..." 
-            for content in topic_extracted_content.values() if content
-        ])
+        if shared:
+            relevant_content = "Topic Source Content: see the topic research in the course context above."
+        else:
+            relevant_content = "Topic Source Content:\n" + "\n".join([
+                f"Source: {content[:500]}..." 
+                for content in topic_extracted_content.values() if content
+            ])
         
         # Get subtopic-specific content
         subtopic_content = subtopic_content_map.get(subtopic, {})
@@ -270,11 +374,7 @@ class ContentGenerator:
         Create comprehensive educational content about "{subtopic}" as part of the main topic "{topic}" 
         at {difficulty.value} level in {language}.
         
-        Difficulty Context:
-        - Tone: {difficulty_context['tone']}
-        - Depth: {difficulty_context['depth']}
-        - Examples: {difficulty_context['examples']}
-        - Length: {difficulty_context['length']}
+        {self._difficulty_block(difficulty_context, shared, ("tone", "depth", "examples", "length"))}
         {objectives_context}
         
         Research Context (use as reference):
@@ -347,11 +447,7 @@ class ContentGenerator:
         """
         
         try:
-            response = await asyncio.to_thread(
-                self.model.models.generate_content,
-                 model="gemini-2.5-flash",
-                contents = prompt
-            )
+            response, model = await self._generate("subtopic", prompt, shared, subtopic=subtopic)
 
             content = response.text if response.text else ""
             sources = list(subtopic_content.keys()) if subtopic_content else []
@@ -360,12 +456,107 @@ class ContentGenerator:
                 subtopic=subtopic,
                 content=content,
                 sources=sources,
-                word_count=len(content.split())
+                word_count=len(content.split()),
+                model=model
             )
             
         except Exception as e:
             raise Exception(f"Error generating content for subtopic '{subtopic}': {str(e)}")
 
+    @staticmethod
+    def _snippet_context(snippets: Mapping[str, str]) -> str:
+        return "\n".join(f"- {snippet} ({url})" for url, snippet in snippets.items() if snippet)
+
+    async def generate_draft_introduction(
+        self,
+        topic: str,
+        subtopics: List[str],
+        difficulty: DifficultyLevel,
+        snippets: Mapping[str, str],
+        language: str = "english"
+    ) -> TopicIntroduction:
+        """Short introduction for a draft course, grounded in search result snippets only"""
+
+        difficulty_context = self._get_difficulty_context(difficulty)
+        prompt = f"""
+        Write a short introduction for the topic "{topic}" at {difficulty.value} level in {language}.
+
+        Tone: {difficulty_context['tone']}
+        Subtopics to be covered: {', '.join(subtopics)}
+
+        Search result snippets (use as reference):
+        {self._snippet_context(snippets)}
+
+        Format your response as:
+        INTRODUCTION:
+        [80-120 words]
+
+        OVERVIEW:
+        [80-120 words]
+
+        LEARNING_OBJECTIVES:
+        • [3-5 objectives]
+
+        PREREQUISITES:
+        • [2-3 prerequisites]
+        """
+
+        try:
+            response, model = await self._generate("draft_introduction", prompt)
+            content = response.text if response.text else ""
+            sections = self._parse_introduction_sections(content)
+            return TopicIntroduction(
+                topic=topic,
+                introduction=sections.get('introduction', ''),
+                overview=sections.get('overview', ''),
+                learning_objectives=sections.get('learning_objectives', []),
+                prerequisites=sections.get('prerequisites', []),
+                word_count=len(content.split()),
+                model=model
+            )
+        except Exception as e:
+            raise Exception(f"Error generating draft introduction: {str(e)}")
+
+    async def generate_draft_subtopic_content(
+        self,
+        topic: str,
+        subtopic: str,
+        difficulty: DifficultyLevel,
+        snippets: Mapping[str, str],
+        language: str = "english"
+    ) -> SubTopicContent:
+        """Short Markdown section for a draft course, grounded in search result snippets only"""
+
+        difficulty_context = self._get_difficulty_context(difficulty)
+        prompt = f"""
+        Write a short educational section about "{subtopic}" as part of the main topic "{topic}"
+        at {difficulty.value} level in {language}.
+
+        Tone: {difficulty_context['tone']}
+
+        Search result snippets (use as reference):
+        {self._snippet_context(snippets)}
+
+        Requirements:
+        - 200-300 words of Markdown starting with a # heading
+        - The key ideas and one short example
+        - No filler; this is a preview that a longer section will replace
+        """
+
+        try:
+            response, model = await self._generate("draft_subtopic", prompt, subtopic=subtopic)
+            content = response.text if response.text else ""
+            return SubTopicContent(
+                subtopic=subtopic,
+                content=content,
+                sources=list(snippets),
+                word_count=len(content.split()),
+                draft=True,
+                model=model
+            )
+        except Exception as e:
+            raise Exception(f"Error generating draft content for subtopic '{subtopic}': {str(e)}")
+
     def _parse_introduction_sections(self, content: str) -> Dict[str, str]:
         """Parse structured introduction content"""
         sections = {}
@@ -409,31 +600,45 @@ class ContentGenerator:
         topic: str,
         subtopics: List[str],
         difficulty: DifficultyLevel,
-        topic_extracted_content: Dict[str, str],
-        subtopic_content_map: Dict[str, Dict[str, str]],
-        language: str = "english"
+        topic_extracted_content: Mapping[str, str],
+        subtopic_content_map: Mapping[str, Mapping[str, str]],
+        language: str = "english",
+        on_section: Optional[Callable[[int, SubTopicContent], Awaitable[None]]] = None
     ) -> tuple[TopicIntroduction, List[SubTopicContent]]:
-        """Generate complete learning content for topic and all subtopics"""
-        
-        # Step 1: Generate topic introduction first
-        introduction = await self.generate_topic_introduction(
-            topic, subtopics, difficulty, topic_extracted_content, subtopic_content_map, language
-        )
+        """Generate complete learning content for topic and all subtopics.
+
+        `on_section(index, section)` is awaited as each section is finished.
+        """
         
-        # Step 2: Generate subtopic contents with learning objectives context
-        # Note: Making this sequential to use learning objectives from introduction
-        subtopic_contents = []
-        for subtopic in subtopics:
-            subtopic_content = await self.generate_subtopic_content(
-                topic, 
-                subtopic, 
-                difficulty, 
-                topic_extracted_content, 
-                subtopic_content_map, 
-                introduction.learning_objectives,  # Pass learning objectives
-                language
+        # The introduction and every section share one course context, cached for this job only
+        shared = self.open_shared_context(topic, difficulty, topic_extracted_content, language)
+        # Without caching, each call keeps its own self-contained prompt
+        context = shared if shared.enabled else None
+        try:
+            # Step 1: Generate topic introduction first
+            introduction = await self.generate_topic_introduction(
+                topic, subtopics, difficulty, topic_extracted_content, subtopic_content_map, language, context
             )
-            subtopic_contents.append(subtopic_content)
+            
+            # Step 2: Generate subtopic contents with learning objectives context
+            # Note: Making this sequential to use learning objectives from introduction
+            subtopic_contents = []
+            for subtopic in subtopics:
+                subtopic_content = await self.generate_subtopic_content(
+                    topic, 
+                    subtopic, 
+                    difficulty, 
+                    topic_extracted_content, 
+                    subtopic_content_map, 
+                    introduction.learning_objectives,  # Pass learning objectives
+                    language,
+                    context
+                )
+                subtopic_contents.append(subtopic_content)
+                if on_section:
+                    await on_section(len(subtopic_contents) - 1, subtopic_content)
+        finally:
+            await shared.close()
         
         # Return both introduction and subtopic contents
         print(f"Subtopic contents generated successfully for topic '{topic}'")
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Dict, Optional
+
+from observability.tracing import span
+
+
+class SharedContext:
+    """Prompt prefix shared by the introduction and section calls of one course.
+
+    The text is registered with the provider's context cache (`client.aio.caches`) the first
+    time a model needs it, since a cached context belongs to a single model; calls then
+    send only their own part of the prompt and reference the cache. When caching is
+    disabled or fails for a model, calls send the text inline instead. The caches expire
+    after `ttl` seconds at the latest; `close()` deletes them when the course is done.
+    """
+
+    def __init__(self, client, text: str, ttl: float = 900.0, display_name: str = "course", enabled: bool = True,
+                 create_timeout: float = 30.0):
+        self.client = client
+        self.text = text
+        self.ttl = ttl
+        self.display_name = display_name
+        self.enabled = enabled and hasattr(getattr(client, "aio", None), "caches")
+        self.create_timeout = create_timeout
+        self.caches: Dict[str, Optional[str]] = {}
+        self._lock = asyncio.Lock()
+
+    async def cache_for(self, model: str) -> Optional[str]:
+        """Name of this context's cache for `model`, creating it on first use; None to send it inline"""
+        if not self.enabled:
+            return None
+        async with self._lock:
+            if model not in self.caches:
+                try:
+                    with span("llm.cache_create", model=model):
+                        cache = await asyncio.wait_for(
+                            self.client.aio.caches.create(
+                                model=model,
+                                config={
+                                    "contents": [self.text],
+                                    "ttl": f"{int(self.ttl)}s",
+                                    "display_name": self.display_name[:120],
+                                }
+                            ),
+                            timeout=self.create_timeout
+                        )
+                    self.caches[model] = cache.name
+                except Exception as e:
+                    print(f"Context cache for {model} unavailable, sending context inline: {str(e) or type(e).__name__}")
+                    self.caches[model] = None
+            return self.caches[model]
+
+    def inline(self, prompt: str) -> str:
+        return f"{self.text}\n{prompt}"
+
+    async def close(self):
+        """Delete every cache created for this context"""
+        names = [name for name in self.caches.values() if name]
+        self.caches = {}
+        self.enabled = False
+        for name in names:
+            try:
+                await self.client.aio.caches.delete(name=name)
+            except Exception as e:
+                print(f"Could not delete context cache {name}: {str(e)}")
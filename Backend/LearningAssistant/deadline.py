@@ -0,0 +1,44 @@
+import asyncio
+import os
+from dataclasses import dataclass, fields
+
+
+@dataclass
+class GenerationBudget:
+    """Time budgets in seconds for one course generation.
+
+    `total` bounds the whole pipeline; the stage budgets are caps within it and the
+    *_call budgets bound individual external calls. `draft` bounds building a draft course.
+    """
+    total: float = 600.0
+    design: float = 60.0
+    research: float = 180.0
+    search_call: float = 15.0
+    fetch_call: float = 20.0
+    llm_call: float = 120.0
+    draft: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "GenerationBudget":
+        """Read overrides such as GENERATION_BUDGET_TOTAL=300 from the environment"""
+        overrides = {}
+        for f in fields(cls):
+            value = os.getenv(f"GENERATION_BUDGET_{f.name.upper()}")
+            if value:
+                overrides[f.name] = float(value)
+        return cls(**overrides)
+
+
+class Deadline:
+    """Wall-clock deadline for one generation, handing out per-stage timeouts"""
+
+    def __init__(self, budget: GenerationBudget):
+        self.budget = budget
+        self._expires_at = asyncio.get_running_loop().time() + budget.total
+
+    def remaining(self) -> float:
+        return max(0.0, self._expires_at - asyncio.get_running_loop().time())
+
+    def timeout_for(self, stage: str) -> float:
+        """The stage's own budget, cut short if the overall deadline comes first"""
+        return min(getattr(self.budget, stage), self.remaining())
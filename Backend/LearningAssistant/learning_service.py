@@ -1,60 +1,164 @@
-from typing import List, Dict, Tuple
+from typing import Awaitable, Callable, List, Dict, Optional, Tuple
 import asyncio
+import os
+from contextvars import ContextVar
+from dataclasses import replace
+import re
+from .cache_warmer import WarmingBudgetExhausted, WarmingLimiter
 from .content_generator import ContentGenerator
-from WebSearch.content_extractor import ContentExtractor
+from .model_router import ModelRouter
+from WebSearch.cache import TTLCache, default_search_cache
+from WebSearch.content_extractor import ContentExtractor, ExtractionQuorum
 from WebSearch.websearch import WebSearcher
-from .models import LearningRequest, LearningResponse, TopicIntroduction, SubTopicContent
+from .deadline import Deadline, GenerationBudget
+from .query_planner import CoverageTarget, QueryPlan
+from .research_corpus import PassageView, ResearchBudget, ResearchCorpus
+from .models import DifficultyLevel, GenerationStatus, LearningRequest, LearningResponse, ResearchSnapshot, SubtopicResearch, ResearchSource, SubTopicContent
+from observability.metrics import QUERY_PLAN_STOPS, SEARCH_QUERIES
+from observability.tracing import span
+
+
+# Words that say nothing about which part of a topic a subtopic covers
+_MATCH_STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "by", "for", "from", "how", "in", "into", "is", "its", "of",
+    "on", "or", "the", "to", "vs", "what", "why", "with",
+    "basics", "fundamentals", "guide", "intro", "introduction", "overview", "understanding",
+})
+
+# Budget of the cache warming run the current research belongs to, if any
+_warming_limiter: ContextVar[Optional[WarmingLimiter]] = ContextVar("warming_limiter", default=None)
+
+
+async def _ignore_stage(status: GenerationStatus, sections: Optional[int] = None):
+    pass
 
 class LearningService:
-    def __init__(self, content_generator: ContentGenerator, web_searcher:WebSearcher, content_extractor:ContentExtractor):
+    def __init__(self, content_generator: ContentGenerator, web_searcher:WebSearcher, content_extractor:ContentExtractor, budget: Optional[GenerationBudget] = None, pipelined: bool = True, quorum: Optional[ExtractionQuorum] = None, research_budget: Optional[ResearchBudget] = None, search_cache: Optional[TTLCache] = None, coverage: Optional[CoverageTarget] = None):
         self.content_generator = content_generator
         self.web_searcher = web_searcher
         self.content_extractor = content_extractor
+        self.budget = budget or GenerationBudget()
+        # Research the topic and the user's subtopics while the course is being designed
+        self.pipelined = pipelined
+        # Stop extracting a batch once it has enough usable documents (None waits for every URL)
+        self.quorum = quorum
+        # Memory held by each job's research passages
+        self.research_budget = research_budget or ResearchBudget()
+        # Search results by query, shared across generations and filled by the cache warmer
+        self.search_cache = search_cache if search_cache is not None else default_search_cache
+        # When a scope has researched enough to stop searching
+        self.coverage = coverage or CoverageTarget()
 
-    async def create_learning_content(self, request: LearningRequest) -> LearningResponse:
-        """Main service method to create comprehensive learning content"""
-        
+    @staticmethod
+    def settings_from_env() -> Dict[str, object]:
+        """Budget, extraction and research settings from the environment, as constructor kwargs"""
+        budget = GenerationBudget.from_env()
+        # EXTRACTION_QUORUM=0 waits for every URL of a batch
+        quorum_documents = int(os.getenv("EXTRACTION_QUORUM", "4"))
+        return {
+            "budget": budget,
+            "pipelined": os.getenv("GENERATION_PIPELINED", "true").lower() == "true",
+            "quorum": ExtractionQuorum(
+                documents=quorum_documents,
+                soft_deadline=float(os.getenv("EXTRACTION_SOFT_DEADLINE", "10")),
+                hedge_after=float(os.getenv("EXTRACTION_HEDGE_AFTER", "3")),
+            ) if quorum_documents else None,
+            "research_budget": ResearchBudget.from_env(),
+            "coverage": CoverageTarget.from_env(),
+        }
+
+    @classmethod
+    def from_env(cls) -> "LearningService":
+        """Build the service and its clients from environment settings"""
+        if not os.getenv("GEMINI_API_KEY"):
+            raise ValueError("GEMINI_API_KEY environment variable is required")
+
+        settings = cls.settings_from_env()
+        budget = settings["budget"]
+        return cls(
+            content_generator=ContentGenerator(
+                call_timeout=budget.llm_call,
+                router=ModelRouter.from_env(),
+                context_cache_ttl=float(os.getenv("CONTEXT_CACHE_TTL", "900")),
+                # CONTEXT_CACHE_MIN_CHARS=0 disables context caching
+                context_cache_min_chars=int(os.getenv("CONTEXT_CACHE_MIN_CHARS", "4000"))
+            ),
+            web_searcher=WebSearcher(timeout=budget.search_call),
+            content_extractor=ContentExtractor(
+                timeout=budget.fetch_call,
+                max_bytes=int(os.getenv("FETCH_MAX_BYTES", "2000000"))
+            ),
+            **settings
+        )
+
+    async def aclose(self):
+        await self.content_extractor.aclose()
+
+    async def create_learning_content(
+        self,
+        request: LearningRequest,
+        outline: Optional[List[str]] = None,
+        on_section: Optional[Callable[[int, SubTopicContent], Awaitable[None]]] = None,
+        on_stage: Optional[Callable[[GenerationStatus, Optional[int]], Awaitable[None]]] = None
+    ) -> LearningResponse:
+        """Main service method to create comprehensive learning content.
+
+        `outline` skips course design (a draft upgrade keeps the draft's sections),
+        `on_section(index, section)` is awaited as each section is generated and
+        `on_stage(status, sections)` as the job enters designing, researching and
+        generating (with the number of sections to generate).
+        """
         
+        on_stage = on_stage or _ignore_stage
+        deadline = Deadline(self.budget)
+        corpus = ResearchCorpus(request.topic, self.research_budget)
         try:
-            # Step 0: course design logic
-            # If subtopics are less than or equal to 6, design course structure
-            final_subtopics = request.sub_topics
-            course_designed = False
-            # if len(request.sub_topics) <= 6: # 
-            print(f"Designing course structure for {len(request.sub_topics)} subtopics...")
-            try:
-                designed_subtopics = await self.content_generator.design_course_structure(
-                    topic=request.topic,
-                    user_subtopics=request.sub_topics,
-                    difficulty=request.difficulty,
-                    language=request.language if request.language else "english"
-                )
-                final_subtopics = designed_subtopics
-                print(f"Designed subtopics: {final_subtopics}")
-                course_designed = True
-                print(f"Course design completed. Using {len(final_subtopics)} designed subtopics.")
-            except Exception as e:
-                print(f"Course design failed: {str(e)}. Using original subtopics.")
-                final_subtopics = request.sub_topics
-            # else:
-            #     print(f"Skipping course design for {len(request.sub_topics)} subtopics (>6) to reduce costs.")
-            
-            # Step 1: Search for relevant content
-            topic_queries, subtopic_queries_map = self._generate_search_queries(request.topic, final_subtopics)
-            topic_extracted_content, subtopic_content_map = await self._search_and_extract_content(topic_queries, subtopic_queries_map)
+            # Steps 0-1: course design and research
+            if outline:
+                await on_stage(GenerationStatus.RESEARCHING)
+                final_subtopics, course_designed = outline, outline != request.sub_topics
+                topic_queries, subtopic_queries_map = self._generate_search_queries(request.topic, final_subtopics)
+                with span("research"):
+                    topic_extracted_content, subtopic_content_map = await self._search_and_extract_content(
+                        request.topic, topic_queries, subtopic_queries_map, corpus, timeout=deadline.timeout_for("research")
+                    )
+            elif self.pipelined:
+                await on_stage(GenerationStatus.DESIGNING)
+                final_subtopics, course_designed, topic_extracted_content, subtopic_content_map = \
+                    await self._design_and_research_pipelined(request, deadline, corpus, on_stage)
+            else:
+                await on_stage(GenerationStatus.DESIGNING)
+                final_subtopics, course_designed = await self._design_course(request, deadline)
+                await on_stage(GenerationStatus.RESEARCHING)
+                
+                # Step 1: Search for relevant content
+                topic_queries, subtopic_queries_map = self._generate_search_queries(request.topic, final_subtopics)
+                with span("research"):
+                    topic_extracted_content, subtopic_content_map = await self._search_and_extract_content(
+                        request.topic, topic_queries, subtopic_queries_map, corpus, timeout=deadline.timeout_for("research")
+                    )
+            print(f"Research for '{request.topic}': {corpus.usage()}")
 
             print(f"Topic content extracted successfully for topic '{request.topic}'")
 
 
             # Step 2: Generate learning content
-            introduction, subtopic_contents = await self.content_generator.generate_complete_learning_content(
-                topic=request.topic,
-                subtopics=final_subtopics,
-                difficulty=request.difficulty,
-                topic_extracted_content=topic_extracted_content,
-                subtopic_content_map=subtopic_content_map,
-                language= request.language if request.language else "english"
-            )
+            # Whatever is left of the deadline; without sections there is no course to return
+            await on_stage(GenerationStatus.GENERATING, len(final_subtopics))
+            try:
+                with span("generation"):
+                    async with asyncio.timeout(deadline.remaining()):
+                        introduction, subtopic_contents = await self.content_generator.generate_complete_learning_content(
+                            topic=request.topic,
+                            subtopics=final_subtopics,
+                            difficulty=request.difficulty,
+                            topic_extracted_content=topic_extracted_content,
+                            subtopic_content_map=subtopic_content_map,
+                            language= request.language if request.language else "english",
+                            on_section=on_section
+                        )
+            except TimeoutError:
+                raise Exception(f"generation deadline of {self.budget.total:.0f}s exceeded")
             
             # Step 3: Calculate metrics
             total_word_count = introduction.word_count + sum(sc.word_count for sc in subtopic_contents)
@@ -69,11 +173,212 @@ class LearningService:
                 subtopic_contents=subtopic_contents,
                 total_word_count=total_word_count,
                 estimated_reading_time=estimated_reading_time,
-                course_designed=course_designed
+                course_designed=course_designed,
+                research=ResearchSnapshot.from_maps(topic_extracted_content, subtopic_content_map)
             )
             
         except Exception as e:
             raise Exception(f"Error creating learning content: {str(e)}")
+        finally:
+            corpus.close()
+
+    async def create_draft_content(self, request: LearningRequest) -> LearningResponse:
+        """Short course built from the designed outline and search result snippets.
+
+        Nothing is fetched or extracted; one search per scope runs alongside the design
+        call and every section is written concurrently, so a draft takes a few LLM
+        round trips instead of the full pipeline. Bounded by the `draft` budget.
+        """
+        # Design gets half the draft budget before falling back to the user's subtopics
+        deadline = Deadline(replace(self.budget, total=self.budget.draft / 2))
+        language = request.language if request.language else "english"
+        try:
+            with span("draft"):
+                async with asyncio.timeout(self.budget.draft):
+                    topic_queries, _ = self._generate_search_queries(request.topic, [])
+                    topic_task = asyncio.create_task(self._search_snippets(topic_queries[0]))
+                    try:
+                        final_subtopics, course_designed = await self._design_course(request, deadline)
+                        _, subtopic_queries_map = self._generate_search_queries(request.topic, final_subtopics)
+                        subtopic_snippets = await asyncio.gather(*(
+                            self._search_snippets(queries[0]) for queries in subtopic_queries_map.values()
+                        ))
+                        topic_snippets = await topic_task
+                    finally:
+                        topic_task.cancel()
+
+                    introduction, *subtopic_contents = await asyncio.gather(
+                        self.content_generator.generate_draft_introduction(
+                            request.topic, final_subtopics, request.difficulty, topic_snippets, language
+                        ),
+                        *(
+                            self.content_generator.generate_draft_subtopic_content(
+                                request.topic, subtopic, request.difficulty, {**topic_snippets, **snippets}, language
+                            )
+                            for subtopic, snippets in zip(final_subtopics, subtopic_snippets)
+                        )
+                    )
+        except TimeoutError:
+            raise Exception(f"Error creating draft content: draft deadline of {self.budget.draft:.0f}s exceeded")
+        except Exception as e:
+            raise Exception(f"Error creating draft content: {str(e)}")
+
+        total_word_count = introduction.word_count + sum(sc.word_count for sc in subtopic_contents)
+        print(f"Draft of '{request.topic}' ready with {len(subtopic_contents)} sections")
+        return LearningResponse(
+            topic=request.topic,
+            sub_topics=final_subtopics,
+            difficulty=request.difficulty,
+            introduction=introduction,
+            subtopic_contents=subtopic_contents,
+            total_word_count=total_word_count,
+            estimated_reading_time=max(1, total_word_count // 200),
+            course_designed=course_designed
+        )
+
+    async def _search_snippets(self, query: str) -> Dict[str, str]:
+        """url -> "title: snippet" for one search; a failed search just yields no snippets"""
+        try:
+            results = await self._search(query)
+        except Exception as e:
+            print(f"Search error for draft query '{query}': {str(e)}")
+            return {}
+        return {result["url"]: f"{result['title']}: {result['snippet']}" for result in results if result.get("snippet")}
+
+    async def _design_course(self, request: LearningRequest, deadline: Deadline) -> Tuple[List[str], bool]:
+        """Step 0: course design logic, falling back to the user's subtopics"""
+        # If subtopics are less than or equal to 6, design course structure
+        # if len(request.sub_topics) <= 6: # 
+        print(f"Designing course structure for {len(request.sub_topics)} subtopics...")
+        try:
+            with span("design"):
+                designed_subtopics = await asyncio.wait_for(
+                    self.content_generator.design_course_structure(
+                        topic=request.topic,
+                        user_subtopics=request.sub_topics,
+                        difficulty=request.difficulty,
+                        language=request.language if request.language else "english"
+                    ),
+                    timeout=deadline.timeout_for("design")
+                )
+            print(f"Designed subtopics: {designed_subtopics}")
+            print(f"Course design completed. Using {len(designed_subtopics)} designed subtopics.")
+            return designed_subtopics, True
+        except Exception as e:
+            print(f"Course design failed: {str(e)}. Using original subtopics.")
+            return request.sub_topics, False
+        # else:
+        #     print(f"Skipping course design for {len(request.sub_topics)} subtopics (>6) to reduce costs.")
+
+    async def _design_and_research_pipelined(
+        self,
+        request: LearningRequest,
+        deadline: Deadline,
+        corpus: ResearchCorpus,
+        on_stage: Callable[[GenerationStatus, Optional[int]], Awaitable[None]] = _ignore_stage
+    ) -> Tuple[List[str], bool, PassageView, Dict[str, PassageView]]:
+        """Overlap research with course design.
+
+        Topic queries do not depend on the outline, and designed subtopics usually overlap
+        the user's own, so both are researched while the design call runs. Designed
+        subtopics that match a user subtopic reuse its research; only new ones are
+        researched once the outline is known. Research shares one budget, measured from
+        the moment it starts; whatever has arrived when it runs out is used.
+
+        Every task adds passages to the corpus as its extractions arrive, speculative ones
+        under the user's subtopic name, so memory stays within the corpus budget; research
+        for user subtopics the design left out is discarded.
+        """
+        loop = asyncio.get_running_loop()
+        research_expires = loop.time() + deadline.timeout_for("research")
+        topic_queries, speculative_queries = self._generate_search_queries(request.topic, request.sub_topics)
+
+        tasks: List[asyncio.Task] = []
+        try:
+            with span("design_research"):
+                topic_task = asyncio.create_task(self._research_topic(request.topic, topic_queries, corpus))
+                speculative = {
+                    subtopic: asyncio.create_task(self._research_subtopic(request.topic, subtopic, queries, corpus))
+                    for subtopic, queries in speculative_queries.items()
+                }
+                tasks = [topic_task, *speculative.values()]
+
+                final_subtopics, course_designed = await self._design_course(request, deadline)
+                # Topic and speculative research have been running all along
+                await on_stage(GenerationStatus.RESEARCHING)
+
+                matches = self._match_subtopics(final_subtopics, list(speculative), request.topic)
+                for subtopic, task in speculative.items():
+                    if subtopic not in matches.values():
+                        task.cancel()
+                        corpus.discard(subtopic)
+
+                new_subtopics = [subtopic for subtopic in final_subtopics if subtopic not in matches]
+                _, new_queries = self._generate_search_queries(request.topic, new_subtopics)
+                subtopic_tasks = {}
+                for subtopic in final_subtopics:
+                    if subtopic in matches:
+                        subtopic_tasks[subtopic] = speculative[matches[subtopic]]
+                    else:
+                        subtopic_tasks[subtopic] = asyncio.create_task(
+                            self._research_subtopic(request.topic, subtopic, new_queries[subtopic], corpus)
+                        )
+                        tasks.append(subtopic_tasks[subtopic])
+                print(f"Reusing speculative research for {len(matches)} of {len(final_subtopics)} subtopics")
+
+                _, not_done = await asyncio.wait(
+                    [topic_task, *subtopic_tasks.values()],
+                    timeout=max(0.0, research_expires - loop.time())
+                )
+                if not_done:
+                    print(f"Research budget exhausted, continuing with partial research for {len(not_done)} unfinished tasks")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        # Matched subtopics read the research gathered under the user's name for them
+        subtopic_map = {subtopic: corpus.subtopic(matches.get(subtopic, subtopic)) for subtopic in final_subtopics}
+        return final_subtopics, course_designed, corpus.topic, subtopic_map
+
+    @staticmethod
+    def _match_subtopics(designed: List[str], user: List[str], topic: str = "", threshold: float = 0.75) -> Dict[str, str]:
+        """Pair designed subtopics with the user subtopic they cover, each used once.
+
+        Subtopics are compared on their significant words: stopwords and the topic's own
+        words are dropped, since every subtopic of a course shares them. A pair matches when
+        the word sets are nearly the same (Jaccard >= `threshold`) or one holds all of the
+        other's words and those are at least two ("Neural Networks" is covered by
+        "Convolutional Neural Networks"). Better overlaps are paired first.
+        """
+        def words(text: str) -> List[str]:
+            return re.findall(r"\w+", text.casefold())
+
+        topic_words = set(words(topic))
+
+        def significant(text: str) -> frozenset:
+            return frozenset(w for w in words(text) if w not in _MATCH_STOPWORDS and w not in topic_words)
+
+        candidates = []
+        for d in designed:
+            for u in user:
+                if words(d) == words(u):
+                    candidates.append((2.0, d, u))
+                    continue
+                sd, su = significant(d), significant(u)
+                if not sd or not su:
+                    continue
+                score = len(sd & su) / len(sd | su)
+                contained = (su <= sd or sd <= su) and min(len(sd), len(su)) >= 2
+                if score >= threshold or contained:
+                    candidates.append((score, d, u))
+
+        matches: Dict[str, str] = {}
+        used = set()
+        for _, d, u in sorted(candidates, reverse=True):
+            if d not in matches and u not in used:
+                matches[d] = u
+                used.add(u)
+        return matches
 
     def _generate_search_queries(self, topic: str, subtopics: List[str]) -> Tuple[List[str], Dict[str, List[str]]]:
         """Generate comprehensive search queries with proper subtopic mapping"""
@@ -96,59 +401,216 @@ class LearningService:
         
         return topic_queries, subtopic_queries_map
 
+    async def _search(self, query: str, num_results: int = 3):
+        """Single search call bounded by the per-call budget; answered from the cache when possible"""
+        key = (" ".join(query.casefold().split()), num_results)
+        results = self.search_cache.get(key)
+        if results is not None:
+            return results
+        limiter = _warming_limiter.get()
+        if limiter is not None:
+            await limiter.before_search()
+        results = await asyncio.wait_for(
+            self.web_searcher.search_duckduckgo(query, num_results=num_results),
+            timeout=self.budget.search_call
+        )
+        if results:
+            self.search_cache.put(key, results)
+        return results
+
+    async def _extract(self, urls: List[str], documents: int = 0) -> Dict[str, str]:
+        """Extract a batch of URLs, stopping at the quorum when one is configured.
+
+        A planned batch is only a few URLs, so the quorum is the `documents` its scope
+        still needs (at most the configured quorum) rather than a fixed count; with none
+        needed (only characters are missing) the whole batch is awaited. Full texts are
+        returned; ResearchCorpus cuts them down to relevant passages.
+        """
+        limiter = _warming_limiter.get()
+        if limiter is not None:
+            await limiter.before_extract()
+        urls = self.content_extractor.prioritize(urls)
+        if not self.quorum:
+            return await self.content_extractor.extract_multiple_contents(urls, max_chars=None)
+        quorum = replace(
+            self.quorum,
+            documents=min(documents, self.quorum.documents) if documents else len(urls),
+            min_chars=self.coverage.min_chars,
+        )
+        return await self.content_extractor.extract_multiple_contents(
+            urls[:quorum.fanout],
+            quorum=quorum,
+            alternates=urls[quorum.fanout:],
+            max_chars=None
+        )
+
     async def _search_and_extract_content(
         self, 
+        topic: str,
         topic_queries: List[str], 
-        subtopic_queries_map: Dict[str, List[str]]
-    ) -> Tuple[Dict[str, str], Dict[str, Dict[str, str]]]:
-        """Search web and extract content with robust subtopic mapping"""
+        subtopic_queries_map: Dict[str, List[str]],
+        corpus: ResearchCorpus,
+        timeout: Optional[float] = None
+    ) -> Tuple[PassageView, Dict[str, PassageView]]:
+        """Search web and extract content with robust subtopic mapping.
+
+        When `timeout` runs out the research stops and whatever has been collected so far
+        is returned, so generation can go ahead with partial research.
+        """
+        try:
+            async with asyncio.timeout(timeout):
+                await self._collect_research(topic, topic_queries, subtopic_queries_map, corpus)
+        except TimeoutError:
+            researched = sum(1 for subtopic in subtopic_queries_map if corpus.subtopic(subtopic))
+            print(f"Research budget exhausted, continuing with {len(corpus.topic)} topic sources and {researched} researched subtopics")
+        # Every subtopic has an entry (even if empty)
+        return corpus.topic, corpus.subtopic_map(list(subtopic_queries_map))
+
+    async def _collect_research(
+        self,
+        topic: str,
+        topic_queries: List[str],
+        subtopic_queries_map: Dict[str, List[str]],
+        corpus: ResearchCorpus
+    ):
+        """Fill the corpus as results arrive"""
         
         # Step 1: Extract topic content
-        topic_urls = set()
-        for query in topic_queries:
-            try:
-                search_results = await self.web_searcher.search_duckduckgo(query, num_results=3)
-                for result in search_results:
-                    topic_urls.add(result['url'])
-            except Exception as e:
-                print(f"Search error for topic query '{query}': {str(e)}")
-                continue
-        
-        # Extract topic content
-        topic_extracted_content = await self.content_extractor.extract_multiple_contents(list(topic_urls))
-        topic_dict = {url: content for url, content in topic_extracted_content.items() if content}
+        await self._research_topic(topic, topic_queries, corpus)
         
         # Step 2: Extract subtopic content with proper mapping
-        subtopic_content_map = {}
-        
         # Process each subtopic separately to maintain mapping
         for subtopic, queries in subtopic_queries_map.items():
-            subtopic_urls = set()
-            
-            # Search for this specific subtopic
-            for query in queries:
-                try:
-                    search_results = await self.web_searcher.search_duckduckgo(query, num_results=3)
-                    for result in search_results:
-                        subtopic_urls.add(result['url'])
-                except Exception as e:
-                    print(f"Search error for subtopic '{subtopic}' query '{query}': {str(e)}")
-                    continue
-            
-            # Extract content for this subtopic
-            if subtopic_urls:
-                # Limit URLs per subtopic to prevent overload
-                limited_urls = list(subtopic_urls)[:12]  # Max 12 URLs per subtopic
-                subtopic_extracted = await self.content_extractor.extract_multiple_contents(limited_urls)
-                
-                # Store only non-empty content for this subtopic
-                subtopic_content_map[subtopic] = {
-                    url: content for url, content in subtopic_extracted.items() if content
-                }
-            else:
-                # Ensure every subtopic has an entry (even if empty)
-                subtopic_content_map[subtopic] = {}
-        
-        return topic_dict, subtopic_content_map
-    
-    
\ No newline at end of file
+            await self._research_subtopic(topic, subtopic, queries, corpus)
+
+    def _reformulate_queries(self, topic: str, subtopic: Optional[str] = None) -> List[str]:
+        """Differently worded queries for a scope whose templated queries found too little"""
+        if subtopic is None:
+            return [f"{topic} tutorial", f"{topic} basics with examples", f"introduction to {topic}"]
+        return [f"{subtopic} tutorial", f"{subtopic} examples", f"{subtopic} in {topic}"]
+
+    async def _research_scope(self, plan: QueryPlan, corpus: ResearchCorpus, subtopic: Optional[str] = None):
+        """Search and extract one scope query by query until its plan is covered.
+
+        Only URLs that no earlier query of the scope returned are extracted, and each
+        batch goes into the corpus as soon as it arrives, so full page texts are never
+        held beyond one batch.
+        """
+        scope = "subtopic" if subtopic else "topic"
+        scope_attrs = {"subtopic": subtopic} if subtopic else {}
+        with span("query_plan", scope=scope, **scope_attrs) as attrs:
+            try:
+                while (query := plan.next_query()) is not None:
+                    SEARCH_QUERIES.labels(scope=scope, kind="reformulated" if query.reformulated else "planned").inc()
+                    try:
+                        search_results = await self._search(query.text, num_results=query.num_results)
+                    except WarmingBudgetExhausted:
+                        raise
+                    except Exception as e:
+                        print(f"Search error for {scope} query '{query.text}': {str(e)}")
+                        search_results = []
+                    urls = plan.record_search([result['url'] for result in search_results])
+                    if not urls:
+                        continue
+                    with span("extraction", scope=scope, urls=len(urls), **scope_attrs):
+                        extracted = await self._extract(urls, plan.documents_needed)
+                    plan.record_extraction(extracted)
+                    corpus.add_many(subtopic, {url: content for url, content in extracted.items() if content})
+            finally:
+                # Cancelled by the research budget or because the subtopic was designed away
+                plan.stopped = plan.stopped or "interrupted"
+                attrs.update(plan.summary())
+                QUERY_PLAN_STOPS.labels(scope=scope, reason=plan.stopped).inc()
+
+    async def _research_topic(self, topic: str, topic_queries: List[str], corpus: ResearchCorpus):
+        """Search and extract content for the main topic into the corpus"""
+        plan = QueryPlan(topic_queries, self._reformulate_queries(topic), self.coverage)
+        await self._research_scope(plan, corpus)
+
+    async def _research_subtopic(self, topic: str, subtopic: str, queries: List[str], corpus: ResearchCorpus):
+        """Search and extract content for a single subtopic into the corpus"""
+        plan = QueryPlan(queries, self._reformulate_queries(topic, subtopic), self.coverage)
+        await self._research_scope(plan, corpus, subtopic)
+
+    async def warm_research(self, topic: str, subtopics: List[str], limiter: Optional[WarmingLimiter] = None) -> Dict[str, int]:
+        """Run the research stage for a topic and subtopics so their searches and pages are cached.
+
+        Nothing is generated and the passages are dropped; the search and content caches
+        keep what was found for the generations that ask for it later. With a `limiter`,
+        every search and extraction waits for its pace and WarmingBudgetExhausted is
+        raised once its budget is spent.
+        """
+        topic_queries, subtopic_queries_map = self._generate_search_queries(topic, subtopics)
+        token = _warming_limiter.set(limiter)
+        try:
+            with ResearchCorpus(topic, self.research_budget) as corpus:
+                with span("warm", topic=topic, subtopics=len(subtopics)):
+                    await self._search_and_extract_content(
+                        topic, topic_queries, subtopic_queries_map, corpus, timeout=self.budget.research
+                    )
+                return corpus.usage()
+        finally:
+            _warming_limiter.reset(token)
+
+    async def create_subtopic_content(
+        self,
+        course: dict,
+        subtopic: str,
+        research: Optional[ResearchSnapshot] = None
+    ) -> Tuple[SubTopicContent, ResearchSnapshot]:
+        """Generate a single section for an existing course.
+
+        Reuses the course's learning objectives and stored research, so only a subtopic
+        that has never been researched triggers search/extraction, within the research
+        budget. Returns the section and the research snapshot including anything newly fetched.
+        """
+        topic = course["topic"]
+        research = research or ResearchSnapshot()
+        deadline = Deadline(self.budget)
+        corpus = ResearchCorpus(topic, self.research_budget)
+        try:
+            subtopic_content_map = research.subtopic_content_map()
+            try:
+                with span("research", subtopic=subtopic):
+                    async with asyncio.timeout(deadline.timeout_for("research")):
+                        if not research.topic_sources:
+                            # Courses generated before research was stored
+                            topic_queries, _ = self._generate_search_queries(topic, [])
+                            await self._research_topic(topic, topic_queries, corpus)
+                        if subtopic not in subtopic_content_map:
+                            _, subtopic_queries_map = self._generate_search_queries(topic, [subtopic])
+                            await self._research_subtopic(topic, subtopic, subtopic_queries_map[subtopic], corpus)
+            except TimeoutError:
+                print(f"Research budget exhausted for subtopic '{subtopic}', continuing with what was found")
+
+            if not research.topic_sources:
+                research.topic_sources = ResearchSnapshot.from_maps(corpus.topic, {}).topic_sources
+            if subtopic not in subtopic_content_map:
+                contents = dict(corpus.subtopic(subtopic))
+                research.subtopic_sources.append(SubtopicResearch(
+                    subtopic=subtopic,
+                    sources=[ResearchSource(url=url, content=content) for url, content in contents.items()]
+                ))
+                subtopic_content_map[subtopic] = contents
+
+            introduction = course.get("introduction") or {}
+            try:
+                with span("generation", subtopic=subtopic):
+                    async with asyncio.timeout(deadline.remaining()):
+                        content = await self.content_generator.generate_subtopic_content(
+                            topic,
+                            subtopic,
+                            DifficultyLevel(course["difficulty"]),
+                            research.topic_content(),
+                            subtopic_content_map,
+                            introduction.get("learning_objectives"),
+                            course.get("language") or "english"
+                        )
+            except TimeoutError:
+                raise Exception(f"generation deadline of {self.budget.total:.0f}s exceeded")
+            return content, research
+
+        except Exception as e:
+            raise Exception(f"Error creating content for subtopic '{subtopic}': {str(e)}")
+        finally:
+            corpus.close()
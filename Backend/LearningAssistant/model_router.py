@@ -0,0 +1,133 @@
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+# Cheapest capable model first; a call type only needs more than that when the output is long
+DEFAULT_ROUTES = {
+    "design": ("gemini-2.5-flash-lite", ["gemini-2.5-flash"], 20.0),
+    "introduction": ("gemini-2.5-flash", ["gemini-2.5-flash-lite"], 60.0),
+    "subtopic": ("gemini-2.5-flash", ["gemini-2.5-flash-lite"], 90.0),
+    "draft": ("gemini-2.5-flash-lite", ["gemini-2.5-flash"], 15.0),
+}
+# Calls without a route of their own, e.g. the draft introduction and draft sections
+ROUTE_ALIASES = {"draft_introduction": "draft", "draft_subtopic": "draft"}
+
+
+@dataclass
+class ModelRoute:
+    """Models for one call type, tried in order; `timeout` bounds each attempt"""
+    primary: str
+    fallbacks: List[str] = field(default_factory=list)
+    timeout: float = 120.0
+    # A primary whose recent median latency is above this is tried after its fallbacks
+    slow_after: Optional[float] = None
+
+    def models(self) -> List[str]:
+        return [self.primary, *self.fallbacks]
+
+
+class ModelStats:
+    """Rolling latency and failure streak of one model.
+
+    Latency samples expire after `horizon` seconds, so a model demoted for being slow
+    (and therefore no longer sampled) is tried first again once they have aged out.
+    """
+
+    def __init__(self, window: int = 50, horizon: float = 300.0):
+        self.latencies: Deque[Tuple[float, float]] = deque(maxlen=window)
+        self.horizon = horizon
+        self.failures = 0
+        self.cooldown_until = 0.0
+
+    def record(self, latency: float, ok: bool, cooldown: float):
+        self.latencies.append((time.monotonic(), latency))
+        if ok:
+            self.failures = 0
+            return
+        self.failures += 1
+        # Back off for longer the more consecutive attempts fail
+        if self.failures >= 2:
+            self.cooldown_until = time.monotonic() + cooldown * min(self.failures - 1, 8)
+
+    def median(self) -> Optional[float]:
+        since = time.monotonic() - self.horizon
+        ordered = sorted(latency for at, latency in self.latencies if at >= since)
+        if not ordered:
+            return None
+        return ordered[len(ordered) // 2]
+
+    def cooling_down(self) -> bool:
+        return time.monotonic() < self.cooldown_until
+
+    def snapshot(self) -> Dict[str, object]:
+        median = self.median()
+        return {
+            "samples": len(self.latencies),
+            "median_seconds": round(median, 3) if median is not None else None,
+            "consecutive_failures": self.failures,
+            "cooling_down": self.cooling_down(),
+        }
+
+
+class ModelRouter:
+    """Picks the model for each LLM call type.
+
+    Each call type has a primary model and fallbacks. Attempts that time out or fail move
+    on to the next model. Per-model rolling latency and failure streaks decide the order:
+    a model that keeps failing cools down and goes last, and a primary that has become
+    slower than its route's `slow_after` goes after its fallbacks until it recovers.
+    """
+
+    def __init__(self, routes: Optional[Dict[str, ModelRoute]] = None, cooldown: float = 30.0):
+        self.routes = routes if routes is not None else {
+            call: ModelRoute(primary, list(fallbacks), timeout, slow_after=timeout / 2)
+            for call, (primary, fallbacks, timeout) in DEFAULT_ROUTES.items()
+        }
+        self.cooldown = cooldown
+        self.stats: Dict[str, ModelStats] = {}
+
+    @classmethod
+    def from_env(cls) -> "ModelRouter":
+        """Read overrides such as MODEL_ROUTE_DESIGN=gemini-2.5-flash,gemini-2.5-flash-lite
+        and MODEL_ROUTE_DESIGN_TIMEOUT=15 from the environment"""
+        router = cls(cooldown=float(os.getenv("MODEL_ROUTE_COOLDOWN", "30")))
+        for call, route in router.routes.items():
+            models = os.getenv(f"MODEL_ROUTE_{call.upper()}")
+            if models:
+                names = [name.strip() for name in models.split(",") if name.strip()]
+                route.primary, route.fallbacks = names[0], names[1:]
+            timeout = os.getenv(f"MODEL_ROUTE_{call.upper()}_TIMEOUT")
+            if timeout:
+                route.timeout = float(timeout)
+                route.slow_after = route.timeout / 2
+        return router
+
+    def route(self, call: str) -> ModelRoute:
+        call = ROUTE_ALIASES.get(call, call)
+        if call not in self.routes:
+            raise KeyError(f"No model route for call type '{call}'")
+        return self.routes[call]
+
+    def _stats(self, model: str) -> ModelStats:
+        return self.stats.setdefault(model, ModelStats())
+
+    def candidates(self, call: str) -> List[str]:
+        """Models to try for a call, best first"""
+        route = self.route(call)
+
+        def rank(position_model):
+            position, model = position_model
+            stats = self._stats(model)
+            median = stats.median()
+            slow = position == 0 and route.slow_after is not None and median is not None and median > route.slow_after
+            return (stats.cooling_down(), slow, position)
+
+        return [model for _, model in sorted(enumerate(route.models()), key=rank)]
+
+    def record(self, model: str, latency: float, ok: bool):
+        self._stats(model).record(latency, ok, self.cooldown)
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        return {model: stats.snapshot() for model, stats in self.stats.items()}
@@ -1,6 +1,6 @@
 # models.py
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Mapping
 from enum import Enum
 
 class DifficultyLevel(str, Enum):
@@ -8,11 +8,27 @@ class DifficultyLevel(str, Enum):
     INTERMEDIATE = "intermediate"
     ADVANCED = "advanced"
 
+class GenerationMode(str, Enum):
+    DRAFT = "draft"
+    FULL = "full"
+
+class GenerationStatus(str, Enum):
+    """Where a course is in its generation; done, failed and cancelled are final"""
+    QUEUED = "queued"
+    DRAFT = "draft"
+    DESIGNING = "designing"
+    RESEARCHING = "researching"
+    GENERATING = "generating"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
 class LearningRequest(BaseModel):
     topic: str = Field(..., description="Main topic to learn about")
     sub_topics: List[str] = Field(..., description="List of subtopics to cover")
     difficulty: DifficultyLevel = Field(..., description="Learning difficulty level")
     language: Optional[str] = Field(default="english", description="Content language")
+    mode: GenerationMode = Field(default=GenerationMode.FULL, description="draft returns a short course built from search snippets at once and upgrades it in the background")
 
 class SubTopicContent(BaseModel):
     subtopic: str
@@ -20,6 +36,8 @@ class SubTopicContent(BaseModel):
     sources: List[str] = Field(default_factory=list)
     word_count: int
     read : bool = Field(default=False, description="Whether the subtopic content has been read")
+    draft: bool = Field(default=False, description="Whether this is a short draft section still to be replaced by the full one")
+    model: Optional[str] = Field(default=None, description="LLM that wrote the section")
 
 class TopicIntroduction(BaseModel):
     topic: str
@@ -28,6 +46,43 @@ class TopicIntroduction(BaseModel):
     learning_objectives: List[str]
     prerequisites: List[str]
     word_count: int
+    model: Optional[str] = Field(default=None, description="LLM that wrote the introduction")
+
+class ResearchSource(BaseModel):
+    url: str
+    content: str
+
+class SubtopicResearch(BaseModel):
+    subtopic: str
+    sources: List[ResearchSource] = Field(default_factory=list)
+
+class ResearchSnapshot(BaseModel):
+    """Extracted research kept with a course so single sections can be regenerated later"""
+    topic_sources: List[ResearchSource] = Field(default_factory=list)
+    subtopic_sources: List[SubtopicResearch] = Field(default_factory=list)
+
+    @classmethod
+    def from_maps(cls, topic_content: Mapping[str, str], subtopic_content_map: Mapping[str, Mapping[str, str]]) -> "ResearchSnapshot":
+        # URLs are stored as values rather than keys since they contain dots
+        return cls(
+            topic_sources=[ResearchSource(url=url, content=content) for url, content in topic_content.items() if content],
+            subtopic_sources=[
+                SubtopicResearch(
+                    subtopic=subtopic,
+                    sources=[ResearchSource(url=url, content=content) for url, content in contents.items() if content]
+                )
+                for subtopic, contents in subtopic_content_map.items()
+            ]
+        )
+
+    def topic_content(self) -> Dict[str, str]:
+        return {source.url: source.content for source in self.topic_sources}
+
+    def subtopic_content_map(self) -> Dict[str, Dict[str, str]]:
+        return {
+            research.subtopic: {source.url: source.content for source in research.sources}
+            for research in self.subtopic_sources
+        }
 
 class LearningResponse(BaseModel):
     topic: str
@@ -38,6 +93,7 @@ class LearningResponse(BaseModel):
     total_word_count: int
     estimated_reading_time: int  # in minutes
     course_designed: bool = Field(default=False, description="Whether course structure was designed by AI")
+    research: Optional[ResearchSnapshot] = Field(default=None, exclude=True, description="Research used for generation, stored separately from the course")
 
 
 class ErrorResponse(BaseModel):
@@ -0,0 +1,120 @@
+import os
+from dataclasses import dataclass, fields
+from typing import Dict, List, Optional
+
+from WebSearch.content_extractor import MAX_CONTENT_CHARS
+
+
+@dataclass
+class CoverageTarget:
+    """When the research of one scope (the topic or a subtopic) has enough material.
+
+    A scope is covered once it has `documents` usable sources (at least `min_chars`
+    extracted) holding `chars` characters, counting at most MAX_CONTENT_CHARS per source
+    since that is all a prompt uses of it. `max_queries` and `max_urls` bound a scope that
+    never gets there.
+    """
+    documents: int = 3
+    chars: int = 2500
+    min_chars: int = 200
+    max_queries: int = 5
+    max_urls: int = 12
+    results_per_query: int = 3
+    # Reformulated queries are only issued when coverage is poor, so they ask for more results
+    results_per_reformulation: int = 5
+
+    @classmethod
+    def from_env(cls) -> "CoverageTarget":
+        """Read overrides such as QUERY_PLAN_DOCUMENTS=4 from the environment"""
+        overrides = {}
+        for f in fields(cls):
+            value = os.getenv(f"QUERY_PLAN_{f.name.upper()}")
+            if value:
+                overrides[f.name] = int(value)
+        return cls(**overrides)
+
+
+@dataclass
+class PlannedQuery:
+    text: str
+    num_results: int
+    reformulated: bool = False
+
+
+class QueryPlan:
+    """Search queries for one scope, issued one at a time until it is covered.
+
+    Queries go out in priority order. Every search reports the URLs it returned, of which
+    only those not seen before are extracted, and every extraction reports the usable
+    content it produced. The plan stops as soon as the coverage target is met. When a
+    query brings no new URLs or its pages yield nothing usable, the remaining templated
+    queries are likely to do the same, so the next query is a reformulation instead;
+    reformulations are also used once the templated queries run out.
+    """
+
+    def __init__(self, queries: List[str], reformulations: List[str], target: CoverageTarget):
+        self.target = target
+        self._queued = [PlannedQuery(q, target.results_per_query) for q in queries]
+        self._reformulations = [PlannedQuery(q, target.results_per_reformulation, True) for q in reformulations]
+        self.issued: List[PlannedQuery] = []
+        self.urls: Dict[str, None] = {}
+        self.documents = 0
+        self.chars = 0
+        self.stopped: Optional[str] = None
+        self._poor = False
+
+    @property
+    def covered(self) -> bool:
+        return self.documents >= self.target.documents and self.chars >= self.target.chars
+
+    def next_query(self) -> Optional[PlannedQuery]:
+        """The next query to search, or None once the scope is covered or out of queries"""
+        if self.covered:
+            self.stopped = "covered"
+        elif len(self.issued) >= self.target.max_queries:
+            self.stopped = "max_queries"
+        elif len(self.urls) >= self.target.max_urls:
+            self.stopped = "max_urls"
+        elif not self._queued and not self._reformulations:
+            self.stopped = "exhausted"
+        if self.stopped:
+            return None
+
+        if self._reformulations and (self._poor or not self._queued):
+            query = self._reformulations.pop(0)
+        else:
+            query = self._queued.pop(0)
+        self._poor = False
+        self.issued.append(query)
+        return query
+
+    @property
+    def documents_needed(self) -> int:
+        """Usable documents still missing from the target"""
+        return max(0, self.target.documents - self.documents)
+
+    def record_search(self, urls: List[str]) -> List[str]:
+        """URLs of the last search worth extracting: unseen ones, within the URL cap"""
+        room = self.target.max_urls - len(self.urls)
+        new = [url for url in dict.fromkeys(urls) if url not in self.urls][:max(0, room)]
+        for url in new:
+            self.urls.setdefault(url)
+        if not new:
+            self._poor = True
+        return new
+
+    def record_extraction(self, contents: Dict[str, Optional[str]]):
+        usable = [text for text in contents.values() if text and len(text) >= self.target.min_chars]
+        self.documents += len(usable)
+        self.chars += sum(min(len(text), MAX_CONTENT_CHARS) for text in usable)
+        if not usable:
+            self._poor = True
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "queries": len(self.issued),
+            "reformulated": sum(1 for query in self.issued if query.reformulated),
+            "urls": len(self.urls),
+            "documents": self.documents,
+            "stopped": self.stopped,
+        }
@@ -0,0 +1,219 @@
+import os
+import re
+import shutil
+import tempfile
+from collections.abc import Mapping
+from dataclasses import dataclass, fields
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from WebSearch.content_extractor import MAX_CONTENT_CHARS
+from observability.metrics import RESEARCH_BYTES
+
+
+@dataclass
+class ResearchBudget:
+    """Memory limits for research passages.
+
+    Passages beyond either budget are written to disk and read back when a prompt needs them.
+    """
+    job_bytes: int = 256 * 1024            # in memory per generation
+    process_bytes: int = 32 * 1024 * 1024  # in memory across every generation in the process
+    passage_chars: int = MAX_CONTENT_CHARS  # kept per source
+
+    @classmethod
+    def from_env(cls) -> "ResearchBudget":
+        """Read overrides such as RESEARCH_BUDGET_JOB_BYTES=131072 from the environment"""
+        overrides = {}
+        for f in fields(cls):
+            value = os.getenv(f"RESEARCH_BUDGET_{f.name.upper()}")
+            if value:
+                overrides[f.name] = int(value)
+        return cls(**overrides)
+
+
+class ResearchMemory:
+    """Process-wide accounting of research held by running generations"""
+
+    def __init__(self):
+        self.in_memory = 0
+        self.spilled = 0
+        self.jobs = 0
+
+    def reserve(self, size: int, limit: int) -> bool:
+        if self.in_memory + size > limit:
+            return False
+        self.in_memory += size
+        RESEARCH_BYTES.labels(location="memory").set(self.in_memory)
+        return True
+
+    def release(self, in_memory: int, spilled: int):
+        self.in_memory -= in_memory
+        self.spilled -= spilled
+        RESEARCH_BYTES.labels(location="memory").set(self.in_memory)
+        RESEARCH_BYTES.labels(location="disk").set(self.spilled)
+
+    def add_spilled(self, size: int):
+        self.spilled += size
+        RESEARCH_BYTES.labels(location="disk").set(self.spilled)
+
+    def usage(self) -> Dict[str, int]:
+        return {"jobs": self.jobs, "in_memory_bytes": self.in_memory, "spilled_bytes": self.spilled}
+
+
+# Shared by every corpus unless one is passed in
+default_research_memory = ResearchMemory()
+
+_WORD = re.compile(r"\w+")
+
+
+def select_passage(text: str, terms: Iterable[str], limit: int) -> str:
+    """The paragraphs of `text` that mention the most query terms, in page order, up to `limit` chars"""
+    if len(text) <= limit:
+        return text
+    wanted = {term for term in terms if len(term) > 2}
+    paragraphs = [p.strip() for p in text.split("\n") if p.strip()]
+    scored = sorted(
+        range(len(paragraphs)),
+        key=lambda i: (-len(wanted & set(_WORD.findall(paragraphs[i].casefold()))), i)
+    )
+    chosen, size = [], 0
+    for i in scored:
+        if size + len(paragraphs[i]) > limit and chosen:
+            continue
+        chosen.append(i)
+        size += len(paragraphs[i]) + 1
+        if size >= limit:
+            break
+    return "\n".join(paragraphs[i] for i in sorted(chosen))[:limit]
+
+
+class _Passage:
+    __slots__ = ("text", "path", "size")
+
+    def __init__(self, text: Optional[str], path: Optional[str], size: int):
+        self.text = text
+        self.path = path
+        self.size = size
+
+    def read(self) -> str:
+        if self.text is not None:
+            return self.text
+        with open(self.path, encoding="utf-8") as f:
+            return f.read()
+
+
+class PassageView(Mapping):
+    """Read-only url -> passage mapping over one scope; spilled passages are read on access"""
+
+    def __init__(self, passages: Dict[str, _Passage]):
+        self._passages = passages
+
+    def __getitem__(self, url: str) -> str:
+        return self._passages[url].read()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._passages))
+
+    def __len__(self) -> int:
+        return len(self._passages)
+
+
+class ResearchCorpus:
+    """Research for one generation, bounded in memory.
+
+    Each extracted page is reduced to a passage of the paragraphs most relevant to the
+    topic (and subtopic) as soon as it arrives; the rest of the page is dropped. Passages
+    stay in memory while the job and process budgets allow and are spilled to a temporary
+    directory otherwise. The topic and each subtopic are exposed as url -> passage mappings.
+    """
+
+    def __init__(self, topic: str, budget: Optional[ResearchBudget] = None,
+                 memory: Optional[ResearchMemory] = None, spill_dir: Optional[str] = None):
+        self.topic_terms = set(_WORD.findall(topic.casefold()))
+        self.budget = budget or ResearchBudget()
+        self.memory = memory or default_research_memory
+        self.spill_root = spill_dir or os.getenv("RESEARCH_SPILL_DIR")
+        self._spill_dir: Optional[str] = None
+        self._spill_files = 0
+        self._scopes: Dict[Optional[str], Dict[str, _Passage]] = {None: {}}
+        self.in_memory = 0
+        self.spilled = 0
+        self._closed = False
+        self.memory.jobs += 1
+
+    def __enter__(self) -> "ResearchCorpus":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, subtopic: Optional[str], url: str, text: str):
+        """Keep the relevant passage of a page for the topic (subtopic None) or a subtopic"""
+        scope = self._scopes.setdefault(subtopic, {})
+        if not text or self._closed or url in scope:
+            return
+        terms = self.topic_terms | set(_WORD.findall(subtopic.casefold())) if subtopic else self.topic_terms
+        passage = select_passage(text, terms, self.budget.passage_chars)
+        size = len(passage.encode("utf-8"))
+
+        if self.in_memory + size <= self.budget.job_bytes and self.memory.reserve(size, self.budget.process_bytes):
+            self.in_memory += size
+            scope[url] = _Passage(passage, None, size)
+            return
+
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="research-", dir=self.spill_root)
+        self._spill_files += 1
+        path = os.path.join(self._spill_dir, f"{self._spill_files}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(passage)
+        self.spilled += size
+        self.memory.add_spilled(size)
+        scope[url] = _Passage(None, path, size)
+
+    def add_many(self, subtopic: Optional[str], contents: Dict[str, str]):
+        for url, text in contents.items():
+            self.add(subtopic, url, text)
+
+    def discard(self, subtopic: str):
+        """Drop a subtopic's passages, e.g. speculative research for a subtopic the design left out"""
+        scope = self._scopes.pop(subtopic, {})
+        in_memory = sum(p.size for p in scope.values() if p.text is not None)
+        spilled = sum(p.size for p in scope.values() if p.text is None)
+        for passage in scope.values():
+            if passage.path:
+                try:
+                    os.remove(passage.path)
+                except OSError:
+                    pass
+        self.in_memory -= in_memory
+        self.spilled -= spilled
+        self.memory.release(in_memory, spilled)
+
+    @property
+    def topic(self) -> PassageView:
+        return PassageView(self._scopes[None])
+
+    def subtopic(self, name: str) -> PassageView:
+        return PassageView(self._scopes.get(name, {}))
+
+    def subtopic_map(self, names: List[str]) -> Dict[str, PassageView]:
+        return {name: self.subtopic(name) for name in names}
+
+    def usage(self) -> Dict[str, int]:
+        return {
+            "passages": sum(len(scope) for scope in self._scopes.values()),
+            "in_memory_bytes": self.in_memory,
+            "spilled_bytes": self.spilled,
+        }
+
+    def close(self):
+        """Release the memory reservation and delete spilled passages"""
+        if self._closed:
+            return
+        self._closed = True
+        self.memory.release(self.in_memory, self.spilled)
+        self.memory.jobs -= 1
+        if self._spill_dir:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+        self._scopes = {None: {}}
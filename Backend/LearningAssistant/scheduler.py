@@ -0,0 +1,95 @@
+import asyncio
+import itertools
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+@dataclass(order=True)
+class _QueuedJob:
+    tag: float
+    seq: int
+    user_id: str = field(compare=False)
+    job_id: str = field(compare=False)
+    ready: asyncio.Future = field(compare=False)
+
+
+class GenerationScheduler:
+    """Weighted fair queue in front of the generation pipeline.
+
+    Every job gets a virtual finish tag: the later of the scheduler's virtual clock and
+    the user's previous tag, plus 1/weight. The runnable job with the smallest tag starts
+    next, so a user who submits many jobs is interleaved with everyone else instead of
+    starving them. At most `max_running` jobs run at once, and at most `per_user_limit`
+    per user.
+    """
+
+    def __init__(self, max_running: int = 4, per_user_limit: int = 2):
+        self.max_running = max_running
+        self.per_user_limit = per_user_limit
+        self._queue: List[_QueuedJob] = []
+        self._running: Dict[str, str] = {}  # job_id -> user_id
+        self._user_tags: Dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+
+    async def run(
+        self,
+        user_id: str,
+        job_id: str,
+        factory: Callable[[], Awaitable[Any]],
+        weight: float = 1.0,
+    ) -> Any:
+        """Wait for a slot, then run factory()"""
+        await self._acquire(user_id, job_id, weight)
+        try:
+            return await factory()
+        finally:
+            del self._running[job_id]
+            self._dispatch()
+
+    async def _acquire(self, user_id: str, job_id: str, weight: float):
+        tag = max(self._virtual_time, self._user_tags.get(user_id, 0.0)) + 1.0 / max(weight, 1e-6)
+        self._user_tags[user_id] = tag
+        job = _QueuedJob(tag, next(self._seq), user_id, job_id, asyncio.get_running_loop().create_future())
+        self._queue.append(job)
+        self._dispatch()
+        try:
+            await job.ready
+        except asyncio.CancelledError:
+            if job in self._queue:
+                self._queue.remove(job)
+            elif job.ready.done() and not job.ready.cancelled():
+                # Dispatched in the same tick we were cancelled: give the slot back
+                del self._running[job_id]
+                self._dispatch()
+            raise
+
+    def _dispatch(self):
+        # Waiters cancelled since the last dispatch have not cleaned up after themselves yet
+        self._queue = [j for j in self._queue if not j.ready.done()]
+        while len(self._running) < self.max_running:
+            job = min(
+                (j for j in self._queue if self._running_for(j.user_id) < self.per_user_limit),
+                default=None,
+            )
+            if job is None:
+                return
+            self._queue.remove(job)
+            self._virtual_time = max(self._virtual_time, job.tag)
+            self._running[job.job_id] = job.user_id
+            job.ready.set_result(None)
+
+    def _running_for(self, user_id: str) -> int:
+        return sum(1 for owner in self._running.values() if owner == user_id)
+
+    def position(self, job_id: str) -> Optional[int]:
+        """0 while running, 1-based place in the queue while waiting, None if unknown"""
+        if job_id in self._running:
+            return 0
+        for index, job in enumerate(sorted(self._queue)):
+            if job.job_id == job_id:
+                return index + 1
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        return {"running": len(self._running), "queued": len(self._queue)}
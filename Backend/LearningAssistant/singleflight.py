@@ -0,0 +1,64 @@
+import asyncio
+import hashlib
+import json
+import re
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from .models import LearningRequest
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+def request_fingerprint(request: LearningRequest) -> str:
+    """Stable key for requests that would produce the same course.
+
+    Topic, subtopics and language are case/whitespace normalized; subtopic order and
+    duplicates are ignored because the course designer decides the final outline anyway.
+    """
+    key = {
+        "topic": _normalize(request.topic),
+        "sub_topics": sorted({_normalize(s) for s in request.sub_topics if s.strip()}),
+        "difficulty": request.difficulty.value,
+        "language": _normalize(request.language or "english"),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """Runs at most one coroutine per key; concurrent callers share its result.
+
+    The shared work runs in its own task so that one caller going away does not cancel it
+    for the others. It is only cancelled once every caller waiting on it has gone.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Return (result, shared) where shared is True if an in-flight call was joined"""
+        task = self._inflight.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.create_task(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task), shared
+        finally:
+            self._waiters[task] -= 1
+            if self._waiters[task] == 0:
+                del self._waiters[task]
+                if not task.done():
+                    task.cancel()
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Retrieve the exception so an abandoned, failed task is not reported as unhandled
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,96 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from observability.metrics import CACHE_BYTES, CACHE_LOOKUPS
+
+
+def text_size(text: str) -> int:
+    return len(text.encode("utf-8"))
+
+
+def search_results_size(results: list) -> int:
+    return sum(text_size(str(value)) for result in results for value in result.values())
+
+
+class TTLCache:
+    """In-process cache whose entries expire `ttl` seconds after they were stored.
+
+    Entries are sized by `sizeof` and the least recently used ones are evicted once the
+    total goes over `max_bytes`. A `ttl` or `max_bytes` of 0 disables the cache.
+    """
+
+    def __init__(self, name: str, ttl: float, max_bytes: int, sizeof: Callable[[Any], int] = text_size):
+        self.name = name
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls, name: str, ttl: float, max_bytes: int, sizeof: Callable[[Any], int] = text_size) -> "TTLCache":
+        """Read overrides such as SEARCH_CACHE_TTL=3600 and SEARCH_CACHE_BYTES=0 from the environment"""
+        prefix = name.upper()
+        return cls(
+            name,
+            ttl=float(os.getenv(f"{prefix}_CACHE_TTL", str(ttl))),
+            max_bytes=int(os.getenv(f"{prefix}_CACHE_BYTES", str(max_bytes))),
+            sizeof=sizeof,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_bytes > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= time.monotonic():
+            self._drop(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            CACHE_LOOKUPS.labels(cache=self.name, outcome="miss").inc()
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        CACHE_LOOKUPS.labels(cache=self.name, outcome="hit").inc()
+        return entry[2]
+
+    def put(self, key: Hashable, value: Any):
+        if not self.enabled:
+            return
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        self._drop(key)
+        self._entries[key] = (time.monotonic() + self.ttl, size, value)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+        CACHE_BYTES.labels(cache=self.name).set(self.bytes)
+
+    def _drop(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+            CACHE_BYTES.labels(cache=self.name).set(self.bytes)
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+        CACHE_BYTES.labels(cache=self.name).set(0)
+
+    def usage(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "bytes": self.bytes, "hits": self.hits, "misses": self.misses}
+
+
+# Shared by every service in the process unless one is passed in. Entries outlive a day's
+# peak so that research warmed off-peak is still there when it is needed.
+default_search_cache = TTLCache.from_env("search", ttl=24 * 3600, max_bytes=8 * 1024 * 1024, sizeof=search_results_size)
+default_content_cache = TTLCache.from_env("content", ttl=24 * 3600, max_bytes=64 * 1024 * 1024)
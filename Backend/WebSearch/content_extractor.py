@@ -1,36 +1,186 @@
 import asyncio
-from typing import List, Dict, Optional
-from trafilatura import extract, fetch_url
+import codecs
+import re
+import time
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple, Union
+from observability.tracing import record_fetch, span
+from .cache import TTLCache, default_content_cache
+from .domain_health import DomainHealth, default_domain_health
+# Characters kept per page; prompts only use the first few hundred to 1500 of each source
+MAX_CONTENT_CHARS = 1000
+# Only these are worth downloading; PDFs, videos, images and other binaries are skipped
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+USER_AGENT = "Mozilla/5.0 (compatible; CourseGen/1.0; +https://github.com/Deepakpottavatri06/CourseGen)"
+
+
+# <meta charset="..."> or <meta http-equiv="Content-Type" content="text/html; charset=...">
+META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE)
+
+
+def _meta_charset(body: bytes) -> Optional[str]:
+    """Charset declared in the page's head, if Python knows it"""
+    match = META_CHARSET.search(body[:4096])
+    if not match:
+        return None
+    try:
+        return codecs.lookup(match.group(1).decode("ascii")).name
+    except (LookupError, UnicodeDecodeError):
+        return None
+
+
+class FetchRejected(Exception):
+    """A page was skipped before or while downloading it"""
+    def __init__(self, outcome: str, detail: str):
+        super().__init__(detail)
+        self.outcome = outcome
+
+
+@dataclass
+class ExtractionQuorum:
+    """When a batch of URLs has yielded enough content to stop waiting for the rest"""
+    fanout: int = 6                # URLs fetched up front; the rest are kept as alternates
+    documents: int = 4             # stop after this many usable documents
+    target_chars: int = 0          # ...or once this many characters were kept (0 disables)
+    soft_deadline: float = 10.0    # ...or after this many seconds, with whatever arrived
+    min_chars: int = 200           # shorter extractions do not count as usable
+    hedge_after: float = 0.0       # start an alternate URL if nothing completes for this long (0 disables)
+
+
 class ContentExtractor:
-    def __init__(self):
-        # self.client = httpx.AsyncClient(timeout=30.0)
-        pass
+    def __init__(self, timeout: float = 20.0, max_bytes: int = 2_000_000, domain_health: Optional[DomainHealth] = None,
+                 cache: Optional[TTLCache] = None):
+        # Upper bound for fetching and extracting a single URL
+        self.timeout = timeout
+        # Bodies are streamed and cut off here, so a huge page costs no more than this
+        self.max_bytes = max_bytes
+        # Heavy imports (trafilatura pulls in lxml and friends) happen when the service is built
+        import httpx
+        from trafilatura import extract
+        self._extract = extract
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml"},
+        )
+        self.domain_health = domain_health or default_domain_health
+        # Extracted page text by URL, shared across generations and filled by the cache warmer
+        self.cache = cache if cache is not None else default_content_cache
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    def prioritize(self, urls: List[str]) -> List[str]:
+        """Order URLs so fast, reliable domains are fetched first"""
+        return self.domain_health.order(urls)
+
+    def _record(self, url: str, outcome: str, start: float, chars: int = 0, downloaded: int = 0):
+        duration = time.perf_counter() - start
+        record_fetch(url, outcome, duration, chars, downloaded)
+        self.domain_health.record(url, outcome, duration)
+
+    async def _download(self, url: str) -> Tuple[Union[str, bytes], int, bool]:
+        """Stream an HTML page, returning (html, bytes downloaded, truncated).
+
+        The page is decoded with the charset named by the Content-Type header or, failing
+        that, by a <meta> tag; without either the raw bytes are returned for trafilatura to
+        guess the encoding.
+        """
+        async with self.client.stream("GET", url) as response:
+            if response.status_code != 200:
+                raise FetchRejected("http_error", f"HTTP {response.status_code}")
+
+            content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+            if content_type and content_type not in HTML_CONTENT_TYPES:
+                raise FetchRejected("rejected_type", f"content type {content_type}")
+
+            content_length = response.headers.get("content-length")
+            if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+                raise FetchRejected("rejected_size", f"{content_length} bytes exceeds {self.max_bytes}")
+
+            chunks = []
+            size = 0
+            truncated = False
+            async for chunk in response.aiter_bytes():
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= self.max_bytes:
+                    truncated = True
+                    break
+
+            body = b"".join(chunks)[:self.max_bytes]
+            charset = response.charset_encoding or _meta_charset(body)
+            html = body.decode(charset, errors="replace") if charset else body
+            return html, response.num_bytes_downloaded, truncated
 
     async def extract_content(self, url: str) -> Optional[str]:
         """Extract clean content from URL using trafilatura"""
+        cached = self.cache.get(url)
+        if cached is not None:
+            record_fetch(url, "cached", 0.0, min(len(cached), MAX_CONTENT_CHARS))
+            return cached
+        if self.domain_health.is_open(url):
+            record_fetch(url, "circuit_open", 0.0)
+            return None
+
+        start = time.perf_counter()
+        downloaded = 0
         try:
-            response = fetch_url(url)
+            with span("fetch", url=url) as attrs:
+                response, downloaded, truncated = await asyncio.wait_for(self._download(url), timeout=self.timeout)
+                attrs["bytes"] = downloaded
+                attrs["truncated"] = truncated
             if not response:
+                self._record(url, "fetch_failed", start, downloaded=downloaded)
                 return ""
-            # Use trafilatura to extract clean content
-            content = extract(
-                response,
-                include_comments=False,
-                include_tables=True,
-                include_images=False,
-                fast=True,
-            )
-            
+            # Use trafilatura to extract clean content, within what is left of the URL's timeout;
+            # on timeout the worker thread finishes on its own and its result is dropped
+            with span("extract", url=url):
+                content = await asyncio.wait_for(asyncio.to_thread(
+                    self._extract,
+                    response,
+                    include_comments=False,
+                    include_tables=True,
+                    include_images=False,
+                    fast=True,
+                ), timeout=max(0.0, self.timeout - (time.perf_counter() - start)))
+            kept = min(len(content or ""), MAX_CONTENT_CHARS)
+            self._record(url, "ok" if content else "empty", start, kept, downloaded)
+            if content:
+                self.cache.put(url, content)
             return content
+        except FetchRejected as e:
+            print(f"Skipped {url}: {str(e)}")
+            self._record(url, e.outcome, start, downloaded=downloaded)
+            return None
+        except TimeoutError:
+            print(f"Timed out extracting content from {url}")
+            self._record(url, "timeout", start, downloaded=downloaded)
+            return None
         except Exception as e:
             print(f"Error extracting content from {url}: {str(e)}")
+            self._record(url, "error", start, downloaded=downloaded)
             return None
     
-    async def extract_multiple_contents(self, urls: List[str]) -> Dict[str, str]:
-        """Extract content from multiple URLs concurrently"""
+    async def extract_multiple_contents(
+        self,
+        urls: List[str],
+        quorum: Optional[ExtractionQuorum] = None,
+        alternates: Optional[List[str]] = None,
+        max_chars: Optional[int] = MAX_CONTENT_CHARS
+    ) -> Dict[str, str]:
+        """Extract content from multiple URLs concurrently.
+
+        With a quorum, returns as soon as it is met and cancels the remaining fetches;
+        `alternates` are tried in order whenever a fetch fails (or stalls, see hedge_after).
+        Contents are cut to `max_chars` (None keeps the full text).
+        """
+        if quorum is not None:
+            return await self._extract_until_quorum(urls, quorum, list(alternates or []), max_chars)
+
         tasks = [self.extract_content(url) for url in urls]
         results = await asyncio.gather(*tasks, return_exceptions=True)
-        results = [result[:1000] if isinstance(result, str) else None for result in results]
+        results = [result[:max_chars] if isinstance(result, str) else None for result in results]
         content_dict = {}
         for url, result in zip(urls, results):
             if isinstance(result, str) and result:
@@ -38,4 +188,54 @@ class ContentExtractor:
             elif not isinstance(result, Exception):
                 content_dict[url] = None
                 
-        return content_dict
\ No newline at end of file
+        return content_dict
+
+    async def _extract_until_quorum(self, urls: List[str], quorum: ExtractionQuorum, spare: List[str], max_chars: Optional[int]) -> Dict[str, str]:
+        loop = asyncio.get_running_loop()
+        soft_deadline = loop.time() + quorum.soft_deadline
+        pending: Dict[asyncio.Task, str] = {}
+        content_dict = {}
+        usable = kept_chars = 0
+
+        def launch(url: str):
+            pending[asyncio.create_task(self.extract_content(url))] = url
+
+        for url in urls:
+            launch(url)
+        try:
+            while pending:
+                timeout = soft_deadline - loop.time()
+                if timeout <= 0:
+                    break
+                if quorum.hedge_after and spare:
+                    timeout = min(timeout, quorum.hedge_after)
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Stalled: hedge with the next alternate while the slow fetches continue
+                    if spare and loop.time() < soft_deadline:
+                        launch(spare.pop(0))
+                    continue
+
+                for task in done:
+                    url = pending.pop(task)
+                    result = task.result() if not task.exception() else None
+                    if isinstance(result, str) and len(result) >= quorum.min_chars:
+                        content_dict[url] = result[:max_chars]
+                        usable += 1
+                        kept_chars += len(content_dict[url])
+                    else:
+                        content_dict[url] = None
+                        if spare:
+                            launch(spare.pop(0))
+
+                if usable >= quorum.documents or (quorum.target_chars and kept_chars >= quorum.target_chars):
+                    break
+        finally:
+            # Stragglers are abandoned; their downloads stop right away, an extraction already
+            # running in a worker thread finishes there but its result is dropped
+            for task in pending:
+                task.cancel()
+
+        if pending:
+            print(f"Extraction stopped with {usable} usable documents, cancelled {len(pending)} outstanding fetches")
+        return content_dict
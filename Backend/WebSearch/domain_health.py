@@ -0,0 +1,117 @@
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+
+@dataclass
+class DomainStats:
+    requests: int = 0
+    successes: int = 0
+    empty: int = 0
+    failures: int = 0
+    latency: Optional[float] = None  # exponentially weighted, seconds
+    consecutive_failures: int = 0
+    open_until: float = 0.0
+    cooldown: float = 0.0
+
+    @property
+    def success_rate(self) -> float:
+        return self.successes / self.requests if self.requests else 0.0
+
+    @property
+    def empty_rate(self) -> float:
+        return self.empty / self.requests if self.requests else 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "requests": self.requests,
+            "success_rate": round(self.success_rate, 3),
+            "empty_rate": round(self.empty_rate, 3),
+            "latency": round(self.latency, 3) if self.latency is not None else None,
+            "open": self.open_until > time.monotonic(),
+        }
+
+
+class DomainHealth:
+    """Per-domain fetch statistics with a circuit breaker, shared by every extraction.
+
+    After `failure_threshold` consecutive failures a domain's circuit opens and its URLs
+    are skipped for `cooldown` seconds. The first fetch after that is a probe: success
+    closes the circuit, failure opens it again for twice as long (up to `max_cooldown`).
+    """
+
+    # Outcomes recorded by ContentExtractor that say nothing useful came back
+    EMPTY_OUTCOMES = ("empty", "fetch_failed", "rejected_type", "rejected_size")
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 300.0,
+                 max_cooldown: float = 3600.0, alpha: float = 0.3, min_requests: int = 3):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.alpha = alpha
+        self.min_requests = min_requests
+        self._domains: Dict[str, DomainStats] = {}
+
+    @staticmethod
+    def domain_of(url: str) -> str:
+        host = urlsplit(url).hostname or ""
+        return host[4:] if host.startswith("www.") else host
+
+    def record(self, url: str, outcome: str, latency: float):
+        stats = self._domains.setdefault(self.domain_of(url), DomainStats())
+        stats.requests += 1
+        stats.latency = latency if stats.latency is None else (
+            self.alpha * latency + (1 - self.alpha) * stats.latency
+        )
+
+        if outcome == "ok":
+            stats.successes += 1
+        elif outcome in self.EMPTY_OUTCOMES:
+            stats.empty += 1
+        else:
+            stats.failures += 1
+
+        if outcome in ("ok",) + self.EMPTY_OUTCOMES:
+            # The site answered; the breaker only cares about timeouts and errors
+            stats.consecutive_failures = 0
+            stats.cooldown = 0.0
+            return
+
+        stats.consecutive_failures += 1
+        if stats.consecutive_failures >= self.failure_threshold:
+            stats.cooldown = min(self.max_cooldown, stats.cooldown * 2 or self.base_cooldown)
+            stats.open_until = time.monotonic() + stats.cooldown
+            # Half-open after the cool-down: one more failure re-opens the circuit
+            stats.consecutive_failures = self.failure_threshold - 1
+
+    def is_open(self, url: str) -> bool:
+        stats = self._domains.get(self.domain_of(url))
+        return bool(stats) and stats.open_until > time.monotonic()
+
+    def _tier(self, url: str) -> int:
+        """0 fast & reliable, 1 unknown, 2 mediocre, 3 unreliable, 4 circuit open"""
+        stats = self._domains.get(self.domain_of(url))
+        if stats is None or stats.requests < self.min_requests:
+            return 1
+        if stats.open_until > time.monotonic():
+            return 4
+        if stats.success_rate >= 0.8 and (stats.latency or 0) < 2.0:
+            return 0
+        if stats.success_rate >= 0.5:
+            return 2
+        return 3
+
+    def order(self, urls: List[str]) -> List[str]:
+        """Fast, reliable domains first; search rank is kept within each tier"""
+        return sorted(urls, key=self._tier)
+
+    def snapshot(self, limit: int = 50) -> Dict[str, Dict[str, float]]:
+        """Stats of the `limit` domains with open circuits or the most requests, in that order"""
+        now = time.monotonic()
+        ranked = sorted(self._domains.items(), key=lambda item: (item[1].open_until <= now, -item[1].requests))
+        return {domain: stats.to_dict() for domain, stats in ranked[:limit]}
+
+
+# Process-wide store shared by every ContentExtractor unless one is passed in
+default_domain_health = DomainHealth()
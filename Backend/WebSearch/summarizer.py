@@ -1,16 +1,13 @@
 import os
 from typing import List
 from fastapi import HTTPException
-from openai import OpenAI
-from dotenv import load_dotenv
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
 #! NOT ACTIVELY USED COURSE GENERATION, BUT KEPT FOR FUTURE USE
 class Summarizer:
     def __init__(self):
+        from openai import OpenAI
         self.client = OpenAI(
-        api_key=GEMINI_API_KEY,
+        api_key=os.getenv("GEMINI_API_KEY"),
         base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
         )
     
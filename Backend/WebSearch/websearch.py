@@ -1,10 +1,21 @@
-from ddgs import DDGS
+import asyncio
+from observability.tracing import span
 
 class WebSearcher:
-    def __init__(self):
-        self.ddgs = DDGS()
+    def __init__(self, timeout: float = 10.0):
+        from ddgs import DDGS
+        # DDGS runs in a worker thread that a timed-out search cannot interrupt; its own
+        # HTTP timeout is what frees the thread
+        self.ddgs = DDGS(timeout=max(1, int(timeout)))
 
     async def search_duckduckgo(self, query: str, num_results: int = 5):
+        with span("search", query=query) as attrs:
+            # DDGS is synchronous; run it in a thread so the call can be timed out or cancelled
+            results = await asyncio.to_thread(self._search, query, num_results)
+            attrs["results"] = len(results)
+        return results
+
+    def _search(self, query: str, num_results: int):
         results = []
         for result in self.ddgs.text(query, max_results=num_results):
             results.append({
@@ -12,4 +23,4 @@ class WebSearcher:
                     "url": result["href"],
                     "snippet": result["body"]
                 })
-        return results
\ No newline at end of file
+        return results
@@ -7,7 +7,6 @@ import jwt
 from jwt.exceptions import InvalidTokenError
 from passlib.context import CryptContext
 import os
-from dotenv import load_dotenv
 from typing import Dict
 from model.db_connect import db
 from model.user_schema import User, UserResponse, UserLogin
@@ -15,7 +14,6 @@ from model.user_schema import User, UserResponse, UserLogin
 
 
 
-load_dotenv()
 SECRET_KEY = os.getenv('SECRET_KEY', '1234567890')
 ALGORITHM = os.getenv('ALGORITHM', 'HS256') 
 
@@ -1,4 +1,5 @@
 from datetime import datetime
+from functools import lru_cache
 from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Request, status, Depends
 from fastapi.responses import JSONResponse
@@ -39,14 +40,17 @@ class SummaryResponse(BaseModel):
 
 
 
-# Initialize services
-searcher = WebSearcher()
-extractor = ContentExtractor()
-summarizer = Summarizer()
+# Services are built on first use so importing this module stays cheap
+@lru_cache(maxsize=None)
+def get_services():
+    return WebSearcher(), ContentExtractor(), Summarizer()
+
+
 @router.post("/search-summarize", response_model=SummaryResponse)
 async def search_and_summarize(request: SearchRequest):
     """Main endpoint: search web and generate summary"""
     start_time = datetime.now()
+    searcher, extractor, summarizer = get_services()
     
     try:
         # Step 0: Check if query is profane
@@ -0,0 +1,125 @@
+"""Compression ratio and CPU cost of the codecs considered for stored course markdown.
+
+Reads courses from a JSONL file written by scripts.bulk_generate; without one, the
+paragraphs of the offline corpus pages are stitched into section-sized samples (fine
+for CPU cost, but they repeat far more than real courses, so use real course markdown
+for representative ratios, especially with a dictionary). The zstd dictionary
+is trained on the first half of the samples and measured on the other half:
+
+    cd Backend
+    python -m benchmarks.compression_bench --input courses.jsonl
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import time
+import zlib
+from typing import Callable, Dict, List, Tuple
+
+import zstandard
+
+from model.compression import course_texts
+
+from .fakes import CORPUS_DIR
+
+
+def corpus_samples(count: int = 400, section_chars: int = 4000, seed: int = 0) -> List[str]:
+    """Section-sized markdown stitched together from paragraphs of the corpus pages"""
+    from trafilatura import extract
+    paragraphs = []
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, "pages", "*.html"))):
+        with open(path) as f:
+            text = extract(f.read(), output_format="markdown", include_tables=True) or ""
+        paragraphs.extend(p for p in text.split("\n") if p.strip())
+    rng = random.Random(seed)
+    samples = []
+    for i in range(count):
+        parts = [f"## Section {i + 1}"]
+        while sum(len(p) for p in parts) < section_chars:
+            parts.append(rng.choice(paragraphs))
+        samples.append("\n\n".join(parts))
+    return samples
+
+
+def jsonl_samples(path: str) -> List[str]:
+    samples = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                samples.extend(course_texts(json.loads(line)["course"]))
+    return samples
+
+
+def measure(name: str, compress: Callable, decompress: Callable, samples: List[bytes], repeat: int) -> Dict:
+    raw = sum(len(s) for s in samples)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        compressed = [compress(s) for s in samples]
+    compress_time = (time.perf_counter() - start) / repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for blob in compressed:
+            decompress(blob)
+    decompress_time = (time.perf_counter() - start) / repeat
+    stored = sum(len(c) for c in compressed)
+    return {
+        "codec": name,
+        "raw_bytes": raw,
+        "stored_bytes": stored,
+        "ratio": round(raw / stored, 2),
+        "compress_mb_s": round(raw / compress_time / 1e6, 1),
+        "decompress_mb_s": round(raw / decompress_time / 1e6, 1),
+        "compress_us_per_field": round(compress_time / len(samples) * 1e6, 1),
+        "decompress_us_per_field": round(decompress_time / len(samples) * 1e6, 1),
+    }
+
+
+def codecs(train: List[bytes], dict_size: int) -> List[Tuple[str, Callable, Callable]]:
+    result = [
+        ("zlib-6", lambda b: zlib.compress(b, 6), zlib.decompress),
+    ]
+    for level in (3, 6, 12):
+        c, d = zstandard.ZstdCompressor(level=level), zstandard.ZstdDecompressor()
+        result.append((f"zstd-{level}", c.compress, d.decompress))
+    try:
+        dictionary = zstandard.train_dictionary(dict_size, train)
+    except zstandard.ZstdError as e:
+        print(f"Dictionary training failed ({e}); use more or longer samples")
+        return result
+    for level in (3, 6):
+        c = zstandard.ZstdCompressor(level=level, dict_data=dictionary)
+        d = zstandard.ZstdDecompressor(dict_data=dictionary)
+        result.append((f"zstd-{level}+dict", c.compress, d.decompress))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compression of course markdown")
+    parser.add_argument("--input", help="JSONL courses from scripts.bulk_generate (default: corpus pages)")
+    parser.add_argument("--dict-size", type=int, default=110 * 1024)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write machine readable results to this file")
+    args = parser.parse_args()
+
+    samples = jsonl_samples(args.input) if args.input else corpus_samples(seed=args.seed)
+    random.Random(args.seed).shuffle(samples)
+    encoded = [s.encode("utf-8") for s in samples]
+    train, test = encoded[:len(encoded) // 2], encoded[len(encoded) // 2:]
+    print(f"{len(samples)} samples, {len(test)} measured, "
+          f"median {sorted(len(s) for s in test)[len(test) // 2]} bytes per field")
+
+    results = [measure(name, c, d, test, args.repeat) for name, c, d in codecs(train, args.dict_size)]
+    print(f"{'codec':<16}{'ratio':>8}{'comp MB/s':>11}{'decomp MB/s':>13}{'comp us':>10}{'decomp us':>11}")
+    for r in results:
+        print(f"{r['codec']:<16}{r['ratio']:>8}{r['compress_mb_s']:>11}{r['decompress_mb_s']:>13}"
+              f"{r['compress_us_per_field']:>10}{r['decompress_us_per_field']:>11}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from .fakes import CORPUS_DIR
+
+
+class _CorpusHandler(SimpleHTTPRequestHandler):
+    latency: float = 0.0
+    padding_bytes: int = 0
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        # Search results carry a per-query "?r=" marker; the file on disk is the same
+        self.path = self.path.split("?", 1)[0]
+        if not self.padding_bytes or not self.path.endswith(".html"):
+            return super().do_GET()
+
+        path = Path(self.translate_path(self.path))
+        if not path.is_file():
+            return self.send_error(404, "File not found")
+        # Pad pages with markup boilerplate so transfer sizes look like real websites
+        body = path.read_bytes().replace(
+            b"</body>", b"<!-- " + b"x" * self.padding_bytes + b" --></body>"
+        )
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CorpusServer:
+    """Serves a recorded HTML corpus on localhost from a background thread"""
+
+    def __init__(self, corpus_dir: Path = CORPUS_DIR, latency: float = 0.0, padding_bytes: int = 0):
+        handler = type("CorpusHandler", (_CorpusHandler,), {
+            "latency": latency,
+            "padding_bytes": padding_bytes,
+        })
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), partial(handler, directory=str(corpus_dir)))
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "CorpusServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
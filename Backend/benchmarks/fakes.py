@@ -0,0 +1,228 @@
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from observability.tracing import span
+
+
+CORPUS_DIR = Path(__file__).parent / "corpus"
+
+
+class FakeBackendError(Exception):
+    """Raised by the fake LLM backend to simulate provider failures"""
+
+
+@dataclass
+class LatencyProfile:
+    """Log-normal latency distribution with an error rate, all in seconds"""
+    median: float = 0.0
+    sigma: float = 0.0
+    error_rate: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        if self.median <= 0:
+            return 0.0
+        return rng.lognormvariate(0.0, self.sigma) * self.median if self.sigma else self.median
+
+    def should_fail(self, rng: random.Random) -> bool:
+        return self.error_rate > 0 and rng.random() < self.error_rate
+
+
+class FakeWebSearcher:
+    """Drop-in for WebSearcher that answers from recorded results.
+
+    Recorded queries are served verbatim; any other query is mapped deterministically
+    onto the corpus pages with a per-query URL so that distinct queries yield distinct
+    URLs, like a real search engine would.
+    """
+
+    def __init__(self, base_url: str, corpus_dir: Path = CORPUS_DIR,
+                 latency: Optional[LatencyProfile] = None, blocking: bool = False, seed: int = 0):
+        self.base_url = base_url.rstrip("/")
+        self.latency = latency or LatencyProfile()
+        # The real WebSearcher runs DDGS in a worker thread; blocking=True models a searcher
+        # that stalls the event loop instead.
+        self.blocking = blocking
+        self.rng = random.Random(seed)
+        self.recorded: Dict[str, List[dict]] = {}
+        results_file = corpus_dir / "search_results.json"
+        if results_file.exists():
+            self.recorded = json.loads(results_file.read_text(encoding="utf-8"))
+        self.pages = sorted(p.name for p in (corpus_dir / "pages").iterdir() if p.is_file())
+        if not self.pages:
+            raise ValueError(f"No pages found in corpus {corpus_dir}")
+
+    async def search_duckduckgo(self, query: str, num_results: int = 5):
+        with span("search", query=query) as attrs:
+            results = await self._search(query, num_results)
+            attrs["results"] = len(results)
+        return results
+
+    async def _search(self, query: str, num_results: int):
+        delay = self.latency.sample(self.rng)
+        if self.blocking:
+            time.sleep(delay)
+        else:
+            await asyncio.sleep(delay)
+        if self.latency.should_fail(self.rng):
+            raise FakeBackendError(f"search failed for '{query}'")
+
+        recorded = self.recorded.get(query.strip())
+        if recorded is not None:
+            return [
+                {**result, "url": self.base_url + result["url"]}
+                for result in recorded[:num_results]
+            ]
+
+        digest = hashlib.sha1(query.encode("utf-8")).hexdigest()
+        start = int(digest[:8], 16)
+        results = []
+        for i in range(min(num_results, len(self.pages))):
+            page = self.pages[(start + i) % len(self.pages)]
+            results.append({
+                "title": page.rsplit(".", 1)[0].replace("-", " ").title(),
+                "url": f"{self.base_url}/pages/{page}?r={digest[:10]}{i}",
+                "snippet": f"Recorded snippet about {query.strip()}.",
+            })
+        return results
+
+
+class _FakeUsage:
+    def __init__(self, prompt: str, text: str, cached: str = ""):
+        # Roughly four characters per token, like the Gemini tokenizer on English prose
+        self.prompt_token_count = (len(cached) + len(prompt)) // 4
+        self.cached_content_token_count = len(cached) // 4
+        self.candidates_token_count = len(text) // 4
+
+
+class _FakeResponse:
+    def __init__(self, text: str, prompt: str = "", cached: str = ""):
+        self.text = text
+        self.usage_metadata = _FakeUsage(prompt, text, cached)
+
+
+class _FakeModels:
+    def __init__(self, client: "FakeGenAIClient"):
+        self._client = client
+
+    async def generate_content(self, model: str, contents: str, config=None, **kwargs):
+        cached = ""
+        name = (config or {}).get("cached_content")
+        if name:
+            cache = self._client.caches.get(name=name)
+            if cache.model != model:
+                raise FakeBackendError(f"cached content {name} belongs to {cache.model}")
+            cached = cache.text
+        return await self._client._generate(model, contents, cached)
+
+
+class _FakeCache:
+    def __init__(self, name: str, model: str, text: str):
+        self.name = name
+        self.model = model
+        self.text = text
+
+
+class _FakeCaches:
+    """Local stand-in for the provider's context caches"""
+
+    def __init__(self):
+        self.live: Dict[str, _FakeCache] = {}
+        self.created = 0
+
+    def create(self, model: str, config: dict) -> _FakeCache:
+        self.created += 1
+        cache = _FakeCache(f"cachedContents/fake-{self.created}", model, "\n".join(config["contents"]))
+        self.live[cache.name] = cache
+        return cache
+
+    def get(self, name: str) -> _FakeCache:
+        if name not in self.live:
+            raise FakeBackendError(f"cached content {name} not found")
+        return self.live[name]
+
+    def delete(self, name: str):
+        self.live.pop(name, None)
+
+
+class _FakeAsyncCaches:
+    def __init__(self, caches: _FakeCaches):
+        self._caches = caches
+
+    async def create(self, model: str, config: dict) -> _FakeCache:
+        return self._caches.create(model=model, config=config)
+
+    async def delete(self, name: str):
+        self._caches.delete(name=name)
+
+
+class _FakeAio:
+    """`client.aio`: the async surface ContentGenerator and SharedContext call"""
+
+    def __init__(self, client: "FakeGenAIClient"):
+        self.models = _FakeModels(client)
+        self.caches = _FakeAsyncCaches(client.caches)
+
+
+class FakeGenAIClient:
+    """Stand-in for google.genai.Client used by ContentGenerator.
+
+    Only `client.aio.models.generate_content(model=..., contents=..., config=...)` and the
+    context caches (`client.aio.caches`, with `client.caches` holding the live ones) are
+    implemented. Like the real async client, calls wait on the event loop, so latency is
+    simulated with asyncio.sleep and a timeout cancels the call. Responses are shaped like
+    the real model output so that ContentGenerator's parsing runs unchanged.
+    """
+
+    def __init__(self, latency: Optional[LatencyProfile] = None, designed_subtopics: int = 5,
+                 section_words: int = 650, seed: int = 0):
+        self.latency = latency or LatencyProfile()
+        self.designed_subtopics = designed_subtopics
+        self.section_words = section_words
+        self.rng = random.Random(seed)
+        self.caches = _FakeCaches()
+        self.aio = _FakeAio(self)
+        self.calls = 0
+
+    async def _generate(self, model: str, prompt: str, cached: str = "") -> _FakeResponse:
+        # Responses only depend on the call's own prompt, not on a cached context
+        self.calls += 1
+        await asyncio.sleep(self.latency.sample(self.rng))
+        if self.latency.should_fail(self.rng):
+            raise FakeBackendError(f"{model} overloaded")
+        return _FakeResponse(self._respond(prompt), prompt, cached)
+
+    def _respond(self, prompt: str) -> str:
+        if "expert course designer" in prompt:
+            topic = _quoted(prompt) or "Topic"
+            return "\n".join(
+                f"{topic} Part {i + 1}" for i in range(self.designed_subtopics)
+            )
+        if "INTRODUCTION:" in prompt:
+            return (
+                "INTRODUCTION:\n" + _words(350) +
+                "\n\nOVERVIEW:\n" + _words(450) +
+                "\n\nLEARNING_OBJECTIVES:\n" + "\n".join(f"• Objective {i + 1}" for i in range(6)) +
+                "\n\nPREREQUISITES:\n" + "\n".join(f"• Prerequisite {i + 1}" for i in range(4))
+            )
+        subtopic = _quoted(prompt) or "Section"
+        return f"# {subtopic}\n\n" + _words(self.section_words)
+
+
+def _quoted(prompt: str) -> Optional[str]:
+    match = re.search(r'"([^"]+)"', prompt)
+    return match.group(1) if match else None
+
+
+_FILLER = ("learners build understanding step by step through clear explanations "
+           "worked examples and practice questions that connect each idea to the next").split()
+
+
+def _words(count: int) -> str:
+    return " ".join(_FILLER[i % len(_FILLER)] for i in range(count))
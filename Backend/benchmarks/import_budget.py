@@ -0,0 +1,85 @@
+"""Import-time budget check for the API entry point.
+
+Importing `main` must stay cheap so pods start and scale out quickly; heavy clients are
+built in the app's lifespan instead. This check imports the app in fresh interpreters,
+fails if the median import time exceeds the budget or if any deferred module was
+imported eagerly, and prints the slowest imports to help find the culprit:
+
+    cd Backend
+    python -m benchmarks.import_budget --budget 1.0
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Modules that must only be imported once the services are built
+DEFERRED_MODULES = (
+    "google.genai",
+    "openai",
+    "trafilatura",
+    "ddgs",
+    "motor",
+)
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+
+def measure(module: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(module: str, count: int = 10) -> list:
+    """Top cumulative import times (seconds) from python -X importtime"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        check=True, capture_output=True, text=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((int(cumulative) / 1e6, name))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Fail if importing the app is too slow")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget", type=float, default=1.0, help="median import time allowed (s)")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    samples = [measure(args.module) for _ in range(args.runs)]
+    median = statistics.median(sample["seconds"] for sample in samples)
+    loaded = set(samples[-1]["modules"])
+    eager = [m for m in DEFERRED_MODULES if m in loaded]
+
+    print(f"import {args.module}: median {median:.3f}s over {args.runs} runs (budget {args.budget:.3f}s)")
+    for seconds, name in slowest_imports(args.module):
+        print(f"  {seconds:8.3f}s  {name}")
+
+    failed = False
+    if median > args.budget:
+        print(f"FAIL: import time {median:.3f}s exceeds budget {args.budget:.3f}s")
+        failed = True
+    if eager:
+        print(f"FAIL: deferred modules imported eagerly: {', '.join(eager)}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
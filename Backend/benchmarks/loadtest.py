@@ -0,0 +1,325 @@
+"""API load test against the real FastAPI app with Mongo and the generation pipeline faked.
+
+The app runs under uvicorn in a background thread, backed by the in-memory Mongo
+stand-in (memory_db.MemoryDatabase) and a LearningService built on the offline fakes.
+Virtual users replay a weighted scenario mix over HTTP. The report shows requests per
+second and latency percentiles per endpoint, plus the lag of the server's event loop:
+anything that blocks the loop shows up as lag, well before it shows up as latency.
+
+    cd Backend
+    python -m benchmarks.loadtest --scenario mixed --users 50 --courses-per-user 5 --duration 30
+
+The load generator shares the process (and the GIL) with the server, so compare runs
+made on the same machine with the same settings rather than reading absolute numbers.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from .pipeline_bench import percentile
+
+# Weighted operation mixes per scenario
+SCENARIOS: Dict[str, Dict[str, int]] = {
+    "browse": {"list": 30, "progress": 15, "get": 45, "read": 10},
+    "mixed": {"login": 5, "list": 20, "progress": 10, "get": 40, "read": 20, "generate": 5},
+    "write-heavy": {"login": 10, "register": 5, "get": 25, "read": 40, "generate": 20},
+    "auth": {"login": 80, "register": 20},
+    # Run with many --courses-per-user: each user's first search builds their index
+    "search": {"search": 50, "get": 25, "read": 15, "list": 10},
+}
+
+PASSWORD = "loadtest-password"
+TOPICS = ["Machine Learning", "Python Basics", "Data Structures", "Neural Networks", "Model Evaluation"]
+SEARCH_QUERIES = ["neural networks", "python", "evaluation metrics", "data structures part 2", "learning"]
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up from a short sleep"""
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.samples: List[float] = []
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+
+class ServerThread:
+    """Runs the app under uvicorn on its own event loop in a daemon thread"""
+
+    def __init__(self, app, port: int):
+        import uvicorn
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self.lag = LoopLagMonitor()
+        self.thread = threading.Thread(target=lambda: asyncio.run(self._serve()), daemon=True)
+
+    async def _serve(self):
+        monitor = asyncio.create_task(self.lag.run())
+        try:
+            await self.server.serve()
+        finally:
+            monitor.cancel()
+
+    def __enter__(self) -> "ServerThread":
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("server failed to start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def install_fakes(args, corpus_url: str):
+    """Point the app at the in-memory database and a LearningService built on the fakes"""
+    os.environ.setdefault("GEMINI_API_KEY", "loadtest")
+    os.environ.setdefault("SECRET_KEY", "loadtest-secret")
+    # Off-peak cache warming would kick in at random times during a run
+    os.environ.setdefault("CACHE_WARM_HOURS", "")
+
+    from LearningAssistant.content_generator import ContentGenerator
+    from LearningAssistant.learning_service import LearningService
+    from WebSearch.content_extractor import ContentExtractor
+    from model.db_connect import set_database
+
+    from .fakes import FakeGenAIClient, FakeWebSearcher, LatencyProfile
+    from .memory_db import MemoryDatabase
+
+    database = MemoryDatabase(latency=args.db_latency)
+    set_database(database)
+
+    def fake_service(cls):
+        return cls(
+            content_generator=ContentGenerator(client=FakeGenAIClient(
+                latency=LatencyProfile(args.llm_latency, 0.3), seed=args.seed
+            )),
+            web_searcher=FakeWebSearcher(corpus_url, latency=LatencyProfile(args.search_latency, 0.3), seed=args.seed),
+            content_extractor=ContentExtractor(),
+        )
+
+    LearningService.from_env = classmethod(fake_service)
+    return database
+
+
+async def seed(database, users: int, courses_per_user: int, seed_value: int) -> List[dict]:
+    """Users with completed courses, written straight into the stand-in; returns their sessions"""
+    from api.login_register import create_access_token, hash_password
+    from model.compression import compress_course
+
+    from .compression_bench import corpus_samples
+
+    rng = random.Random(seed_value)
+    texts = corpus_samples(count=50, seed=seed_value)
+    # bcrypt is slow on purpose; one hash serves every seeded user
+    password_hash = hash_password(PASSWORD)
+    sessions = []
+    for u in range(users):
+        email = f"user{u}@loadtest.example"
+        result = await database['users'].insert_one({"email": email, "name": f"User {u}", "password": password_hash})
+        session = {
+            "email": email,
+            "token": create_access_token({"user_id": str(result.inserted_id), "email": email}),
+            "courses": [],
+        }
+        for c in range(courses_per_user):
+            topic = rng.choice(TOPICS)
+            subtopics = [f"{topic} Part {i + 1}" for i in range(5)]
+            course = await database['course_content'].insert_one(compress_course({
+                "user_id": result.inserted_id,
+                "topic": topic,
+                "sub_topics": subtopics,
+                "difficulty": "beginner",
+                "language": "english",
+                "content_loaded": True,
+                "status": "done",
+                "introduction": {
+                    "topic": topic,
+                    "introduction": rng.choice(texts),
+                    "overview": rng.choice(texts),
+                    "learning_objectives": ["Objective 1", "Objective 2"],
+                    "prerequisites": ["Prerequisite 1"],
+                    "word_count": 1200,
+                },
+                "subtopic_contents": [
+                    {"subtopic": s, "content": rng.choice(texts), "sources": [], "word_count": 650, "read": False}
+                    for s in subtopics
+                ],
+                "total_word_count": 1200 + 650 * len(subtopics),
+                "estimated_reading_time": (1200 + 650 * len(subtopics)) // 200,
+                "course_designed": True,
+                "progress": {"sections": len(subtopics), "read": 0},
+            }))
+            session["courses"].append((str(course.inserted_id), subtopics))
+        sessions.append(session)
+    return sessions
+
+
+async def operation(name: str, client, session: dict, rng: random.Random, counter: List[int]):
+    headers = {"Authorization": f"Bearer {session['token']}"}
+    if name == "login":
+        return await client.post("/api/login", json={"email": session["email"], "password": PASSWORD})
+    if name == "register":
+        counter[0] += 1
+        return await client.post("/api/register", json={
+            "email": f"new{counter[0]}-{rng.randrange(10**9)}@loadtest.example", "name": "New User", "password": PASSWORD
+        })
+    if name == "list":
+        return await client.get("/api/course-content", headers=headers)
+    if name == "progress":
+        return await client.get("/api/course-progress", headers=headers, params={"page": 1, "page_size": 20})
+    if name == "search":
+        return await client.get("/api/course-search", headers=headers, params={"q": rng.choice(SEARCH_QUERIES)})
+    content_id, subtopics = rng.choice(session["courses"])
+    if name == "get":
+        return await client.get(f"/api/course-content/{content_id}", headers=headers)
+    if name == "read":
+        return await client.put(f"/api/course-content/{content_id}/read", headers=headers,
+                                 json={"sub_topic": rng.choice(subtopics)})
+    if name == "generate":
+        topic = rng.choice(TOPICS)
+        return await client.post("/api/generate-learning-content", headers=headers, json={
+            "topic": topic, "sub_topics": [f"{topic} Part {i + 1}" for i in range(3)], "difficulty": "beginner"
+        })
+    raise ValueError(f"unknown operation {name}")
+
+
+async def run_load(args, base_url: str, sessions: List[dict], server: ServerThread) -> dict:
+    import httpx
+
+    weights = SCENARIOS[args.scenario]
+    names, cumulative = list(weights), list(weights.values())
+    samples: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    counter = [0]
+    loop = asyncio.get_running_loop()
+    measure_from = loop.time() + args.warmup
+    stop_at = measure_from + args.duration
+
+    async def virtual_user(index: int, client):
+        rng = random.Random(args.seed * 10007 + index)
+        session = sessions[index % len(sessions)]
+        while loop.time() < stop_at:
+            name = rng.choices(names, weights=cumulative)[0]
+            start = loop.time()
+            try:
+                response = await operation(name, client, session, rng, counter)
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            if start >= measure_from:
+                samples[name].append(loop.time() - start)
+                errors[name] += failed
+            if args.think_time:
+                await asyncio.sleep(rng.expovariate(1 / args.think_time))
+
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        await asyncio.sleep(0)
+        lag_start = None
+
+        async def reset_lag():
+            nonlocal lag_start
+            await asyncio.sleep(args.warmup)
+            lag_start = len(server.lag.samples)
+
+        await asyncio.gather(reset_lag(), *(virtual_user(i, client) for i in range(args.users)))
+
+    lag = server.lag.samples[lag_start or 0:]
+    total = sum(len(v) for v in samples.values())
+    return {
+        "scenario": args.scenario,
+        "users": args.users,
+        "duration_s": args.duration,
+        "requests": total,
+        "rps": round(total / args.duration, 1),
+        "errors": sum(errors.values()),
+        "endpoints": {
+            name: {
+                "count": len(values),
+                "errors": errors[name],
+                "rps": round(len(values) / args.duration, 1),
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+                "max_ms": round(max(values) * 1000, 1),
+            }
+            for name, values in sorted(samples.items()) if values
+        },
+        "loop_lag_ms": {
+            "p50": round(percentile(lag, 50) * 1000, 2),
+            "p99": round(percentile(lag, 99) * 1000, 2),
+            "max": round(max(lag, default=0) * 1000, 2),
+            "mean": round(statistics.fmean(lag) * 1000, 2) if lag else 0.0,
+        },
+    }
+
+
+def print_report(result: dict, generated: int):
+    print(f"\n=== {result['scenario']} | {result['users']} users | {result['duration_s']}s ===")
+    print(f"{result['requests']} requests, {result['rps']} req/s, {result['errors']} errors, "
+          f"{generated} courses generated in the background")
+    print(f"{'endpoint':<12}{'count':>8}{'errors':>8}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for name, s in result["endpoints"].items():
+        print(f"{name:<12}{s['count']:>8}{s['errors']:>8}{s['rps']:>8}{s['p50_ms']:>9}{s['p95_ms']:>9}"
+              f"{s['p99_ms']:>9}{s['max_ms']:>9}")
+    lag = result["loop_lag_ms"]
+    print(f"event loop lag: p50 {lag['p50']} ms, p99 {lag['p99']} ms, max {lag['max']} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the API with Mongo and the generation pipeline faked")
+    parser.add_argument("--scenario", default="mixed", choices=sorted(SCENARIOS))
+    parser.add_argument("--users", type=int, default=50, help="concurrent virtual users")
+    parser.add_argument("--courses-per-user", type=int, default=5)
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="seconds of load before measuring")
+    parser.add_argument("--think-time", type=float, default=0.1, help="mean pause between a user's requests (s)")
+    parser.add_argument("--db-latency", type=float, default=0.001, help="simulated Mongo round trip (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="median fake LLM latency (s)")
+    parser.add_argument("--search-latency", type=float, default=0.2, help="median fake search latency (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write machine readable results to this file")
+    args = parser.parse_args()
+
+    from .corpus_server import CorpusServer
+
+    with CorpusServer() as corpus:
+        database = install_fakes(args, corpus.base_url)
+        import main as api
+
+        sessions = asyncio.run(seed(database, args.users, args.courses_per_user, args.seed))
+        port = free_port()
+        with ServerThread(api.app, port) as server:
+            result = asyncio.run(run_load(args, f"http://127.0.0.1:{port}", sessions, server))
+        generated = sum(1 for doc in database['course_content'].docs.values() if doc.get("status") == "done") \
+            - args.users * args.courses_per_user
+
+    print_report(result, generated)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
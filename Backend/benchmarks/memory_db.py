@@ -0,0 +1,479 @@
+"""In-memory stand-in for the Motor database, covering the queries the app issues.
+
+Install it with model.db_connect.set_database(MemoryDatabase()) before the app serves
+requests. Every operation yields to the event loop (or sleeps for `latency`) like a
+network round trip would; documents are copied in and out, as with a real driver.
+"""
+import asyncio
+import copy
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+
+_MISSING = object()
+
+
+@dataclass
+class InsertOneResult:
+    inserted_id: Any
+
+
+@dataclass
+class UpdateResult:
+    matched_count: int
+    modified_count: int
+    upserted_id: Any = None
+
+
+@dataclass
+class DeleteResult:
+    deleted_count: int
+
+
+def _values(doc, parts: List[str]) -> List[Any]:
+    """Every value at a dotted path, descending into arrays like MongoDB does"""
+    if not parts:
+        return [doc]
+    if isinstance(doc, list):
+        if parts[0].isdigit():
+            index = int(parts[0])
+            return _values(doc[index], parts[1:]) if index < len(doc) else []
+        return [value for item in doc for value in _values(item, parts)]
+    if isinstance(doc, dict) and parts[0] in doc:
+        return _values(doc[parts[0]], parts[1:])
+    return []
+
+
+def _equals(value, expected) -> bool:
+    return value == expected or (isinstance(value, list) and expected in value)
+
+
+def _compare(values: List[Any], op: str, arg) -> bool:
+    if op == "$eq":
+        return any(_equals(v, arg) for v in values) or (arg is None and not values)
+    if op == "$ne":
+        return not _compare(values, "$eq", arg)
+    if op == "$in":
+        return any(_equals(v, a) for v in values for a in arg)
+    if op == "$nin":
+        return not _compare(values, "$in", arg)
+    if op == "$exists":
+        return bool(values) == bool(arg)
+    if op == "$elemMatch":
+        return any(isinstance(v, list) and any(_matches(e, arg) for e in v) for v in values)
+    comparisons = {"$gt": lambda a, b: a > b, "$gte": lambda a, b: a >= b,
+                   "$lt": lambda a, b: a < b, "$lte": lambda a, b: a <= b}
+    if op in comparisons:
+        return any(v is not None and comparisons[op](v, arg) for v in values if not isinstance(v, list))
+    raise NotImplementedError(f"query operator {op}")
+
+
+def _matches(doc, query: Dict[str, Any]) -> bool:
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(_matches(doc, q) for q in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(_matches(doc, q) for q in condition):
+                return False
+            continue
+        values = _values(doc, key.split(".")) if isinstance(doc, dict) else []
+        if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            if not all(_compare(values, op, arg) for op, arg in condition.items()):
+                return False
+        elif not _compare(values, "$eq", condition):
+            return False
+    return True
+
+
+def _set(target, parts: List[str], value, array_filters: Dict[str, Dict[str, Any]], op: str):
+    key = parts[0]
+    if key.startswith("$[") and key.endswith("]"):
+        identifier = key[2:-1]
+        condition = array_filters.get(identifier, {})
+        for i, item in enumerate(target):
+            element_query = {k[len(identifier) + 1:]: v for k, v in condition.items()}
+            if _matches(item, element_query) if isinstance(item, dict) else _compare([item], "$eq", condition.get(identifier)):
+                if len(parts) == 1:
+                    target[i] = _apply(target[i], value, op)
+                else:
+                    _set(item, parts[1:], value, array_filters, op)
+        return
+    if isinstance(target, list):
+        index = int(key)
+        if len(parts) == 1:
+            target[index] = _apply(target[index], value, op)
+        else:
+            _set(target[index], parts[1:], value, array_filters, op)
+        return
+    if len(parts) == 1:
+        if op == "$unset":
+            target.pop(key, None)
+        else:
+            target[key] = _apply(target.get(key, _MISSING), value, op)
+        return
+    _set(target.setdefault(key, {}), parts[1:], value, array_filters, op)
+
+
+def _apply(current, value, op: str):
+    if op == "$set":
+        return copy.deepcopy(value)
+    if op == "$inc":
+        return (0 if current is _MISSING else current) + value
+    if op == "$push":
+        items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+        return (list(current) if current is not _MISSING else []) + copy.deepcopy(items)
+    raise NotImplementedError(f"update operator {op}")
+
+
+def _update(doc: dict, update: Dict[str, Any], array_filters: Optional[List[dict]]):
+    filters = {}
+    for condition in array_filters or []:
+        identifier = next(iter(condition)).split(".")[0]
+        filters[identifier] = condition
+    for op, fields in update.items():
+        for path, value in fields.items():
+            _set(doc, path.split("."), value, filters, op)
+
+
+def _includes_only(projection) -> bool:
+    if isinstance(projection, list):
+        return bool(projection)
+    fields = {k: v for k, v in (projection or {}).items() if k != "_id"}
+    return bool(fields) and all(fields.values())
+
+
+def _project(doc: dict, projection) -> dict:
+    if not projection:
+        return doc
+    if isinstance(projection, list):
+        projection = {field: 1 for field in projection}
+    include_id = projection.get("_id", 1)
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+    if fields and all(fields.values()):
+        result = _include(doc, [path.split(".") for path in fields])
+        if include_id and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+    for path in fields:
+        _exclude(doc, path.split("."))
+    if not include_id:
+        doc.pop("_id", None)
+    return doc
+
+
+def _include(source, paths: List[List[str]]):
+    if isinstance(source, list):
+        return [_include(item, paths) for item in source if isinstance(item, dict)]
+    groups: Dict[str, List[List[str]]] = {}
+    for parts in paths:
+        groups.setdefault(parts[0], []).append(parts[1:])
+    result = {}
+    for key, rests in groups.items():
+        if key not in source:
+            continue
+        if any(not rest for rest in rests):
+            result[key] = source[key]
+        elif isinstance(source[key], (dict, list)):
+            result[key] = _include(source[key], rests)
+    return result
+
+
+def _exclude(target, parts: List[str]):
+    if isinstance(target, list):
+        for item in target:
+            _exclude(item, parts)
+    elif isinstance(target, dict) and parts[0] in target:
+        if len(parts) == 1:
+            del target[parts[0]]
+        else:
+            _exclude(target[parts[0]], parts[1:])
+
+
+def _evaluate(expression, doc: dict, variables: Dict[str, Any]):
+    """Aggregation expressions: field paths, $$variables and the operators the app uses"""
+    if isinstance(expression, str) and expression.startswith("$$"):
+        name, *path = expression[2:].split(".")
+        values = _values(variables.get(name), path)
+        return values[0] if values else None
+    if isinstance(expression, str) and expression.startswith("$"):
+        values = _values(doc, expression[1:].split("."))
+        return values[0] if values else None
+    if isinstance(expression, list):
+        return [_evaluate(item, doc, variables) for item in expression]
+    if isinstance(expression, dict) and not any(key.startswith("$") for key in expression):
+        return {key: _evaluate(value, doc, variables) for key, value in expression.items()}
+    if not isinstance(expression, dict) or len(expression) != 1 or not next(iter(expression)).startswith("$"):
+        return expression
+
+    op, arg = next(iter(expression.items()))
+    evaluate = lambda e: _evaluate(e, doc, variables)
+    if op in ("$filter", "$map"):
+        name = arg.get("as", "this")
+        items = evaluate(arg["input"]) or []
+        if op == "$filter":
+            return [item for item in items if _evaluate(arg["cond"], doc, {**variables, name: item})]
+        return [_evaluate(arg["in"], doc, {**variables, name: item}) for item in items]
+    if op == "$cond":
+        condition, then, otherwise = (arg["if"], arg["then"], arg["else"]) if isinstance(arg, dict) else arg
+        return evaluate(then) if evaluate(condition) else evaluate(otherwise)
+    if op == "$ifNull":
+        first, fallback = arg
+        value = evaluate(first)
+        return evaluate(fallback) if value is None else value
+    if op == "$size":
+        return len(evaluate(arg))
+    if op == "$sum":
+        values = evaluate(arg)
+        values = values if isinstance(values, list) else [values]
+        return sum(v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool))
+    if op == "$not":
+        return not evaluate(arg[0] if isinstance(arg, list) else arg)
+    if op == "$divide":
+        numerator, denominator = evaluate(arg)
+        return numerator / denominator
+    if op == "$floor":
+        return math.floor(evaluate(arg))
+    if op == "$ceil":
+        return math.ceil(evaluate(arg))
+    if op == "$trim":
+        value = evaluate(arg["input"])
+        return value.strip() if isinstance(value, str) else None
+    if op == "$toLower":
+        value = evaluate(arg)
+        return value.lower() if isinstance(value, str) else ""
+    raise NotImplementedError(f"aggregation operator {op}")
+
+
+def _aggregate(docs: List[dict], pipeline: List[dict]) -> List[dict]:
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            docs = [doc for doc in docs if _matches(doc, spec)]
+        elif name == "$sort":
+            for key, direction in reversed(list(spec.items())):
+                docs = sorted(docs, key=lambda d: _values(d, key.split("."))[:1], reverse=direction < 0)
+        elif name == "$skip":
+            docs = docs[spec:]
+        elif name == "$limit":
+            docs = docs[:spec]
+        elif name == "$unwind":
+            path = (spec["path"] if isinstance(spec, dict) else spec)[1:].split(".")
+            unwound = []
+            for doc in docs:
+                values = _values(doc, path[:-1])
+                items = values[0].get(path[-1]) if values and isinstance(values[0], dict) else None
+                for item in items if isinstance(items, list) else []:
+                    unwound_doc = copy.deepcopy(doc)
+                    _values(unwound_doc, path[:-1])[0][path[-1]] = item
+                    unwound.append(unwound_doc)
+            docs = unwound
+        elif name == "$group":
+            groups: Dict[Any, dict] = {}
+            for doc in docs:
+                key = _evaluate(spec["_id"], doc, {})
+                group = groups.setdefault(repr(key), {"_id": key})
+                for field, accumulator in spec.items():
+                    if field == "_id":
+                        continue
+                    (op, arg), = accumulator.items()
+                    value = _evaluate(arg, doc, {})
+                    if op == "$sum":
+                        group[field] = group.get(field, 0) + (value if isinstance(value, (int, float)) else 0)
+                    elif op == "$first":
+                        group.setdefault(field, value)
+                    elif op == "$max":
+                        group[field] = value if field not in group else max(group[field], value)
+                    else:
+                        raise NotImplementedError(f"group accumulator {op}")
+            docs = list(groups.values())
+        elif name == "$count":
+            docs = [{spec: len(docs)}]
+        elif name == "$facet":
+            docs = [{key: _aggregate(docs, sub_pipeline) for key, sub_pipeline in spec.items()}]
+        elif name == "$addFields":
+            docs = [{**doc, **{key: _evaluate(e, doc, {}) for key, e in spec.items()}} for doc in docs]
+        elif name == "$project":
+            if all(value in (0, 1, True, False) for value in spec.values()):
+                docs = [_project(doc, spec) for doc in docs]
+            else:
+                projected = []
+                for doc in docs:
+                    result = {"_id": doc.get("_id")} if spec.get("_id", 1) else {}
+                    for key, e in spec.items():
+                        if key == "_id":
+                            continue
+                        if e in (1, True):
+                            values = _values(doc, key.split("."))
+                            if values:
+                                result[key] = values[0]
+                        elif e not in (0, False):
+                            result[key] = _evaluate(e, doc, {})
+                    projected.append(result)
+                docs = projected
+        else:
+            raise NotImplementedError(f"aggregation stage {name}")
+    return docs
+
+
+class _AggregateCursor:
+    def __init__(self, collection: "MemoryCollection", pipeline: List[dict]):
+        self._collection = collection
+        self._pipeline = pipeline
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        await self._collection.database.round_trip()
+        docs = _aggregate(copy.deepcopy(list(self._collection.docs.values())), self._pipeline)
+        return docs[:length] if length else docs
+
+
+class MemoryCursor:
+    def __init__(self, collection: "MemoryCollection", query: dict, projection):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort: List[tuple] = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key, direction: int = 1):
+        self._sort = list(key) if isinstance(key, list) else [(key, direction)]
+        return self
+
+    def skip(self, count: int):
+        self._skip = count
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        await self._collection.database.round_trip()
+        docs = [doc for doc in self._collection.docs.values() if _matches(doc, self._query)]
+        for key, direction in reversed(self._sort):
+            present = [d for d in docs if _values(d, key.split("."))]
+            missing = [d for d in docs if not _values(d, key.split("."))]
+            present.sort(key=lambda d: _values(d, key.split("."))[0], reverse=direction < 0)
+            docs = missing + present if direction > 0 else present + missing
+        docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        if length:
+            docs = docs[:length]
+        if _includes_only(self._projection):
+            # Like Mongo, only the projected fields are copied out
+            return [copy.deepcopy(_project(doc, self._projection)) for doc in docs]
+        return [_project(copy.deepcopy(doc), self._projection) for doc in docs]
+
+    def __aiter__(self):
+        async def iterate():
+            for doc in await self.to_list():
+                yield doc
+        return iterate()
+
+
+class MemoryCollection:
+    def __init__(self, database: "MemoryDatabase", name: str):
+        self.database = database
+        self.name = name
+        self.docs: Dict[Any, dict] = {}
+
+    def _first(self, query: dict) -> Optional[dict]:
+        return next((doc for doc in self.docs.values() if _matches(doc, query)), None)
+
+    async def insert_one(self, document: dict) -> InsertOneResult:
+        await self.database.round_trip()
+        document.setdefault("_id", ObjectId())
+        self.docs[document["_id"]] = copy.deepcopy(document)
+        return InsertOneResult(document["_id"])
+
+    async def insert_many(self, documents: List[dict]):
+        for document in documents:
+            document.setdefault("_id", ObjectId())
+            self.docs[document["_id"]] = copy.deepcopy(document)
+        await self.database.round_trip()
+
+    async def find_one(self, query: Optional[dict] = None, projection=None, **kwargs) -> Optional[dict]:
+        await self.database.round_trip()
+        doc = self._first(query or {})
+        return _project(copy.deepcopy(doc), projection) if doc else None
+
+    def find(self, query: Optional[dict] = None, projection=None, **kwargs) -> MemoryCursor:
+        return MemoryCursor(self, query or {}, projection)
+
+    def aggregate(self, pipeline: List[dict], **kwargs) -> _AggregateCursor:
+        return _AggregateCursor(self, pipeline)
+
+    async def count_documents(self, query: dict) -> int:
+        await self.database.round_trip()
+        return sum(1 for doc in self.docs.values() if _matches(doc, query))
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False,
+                         array_filters: Optional[List[dict]] = None) -> UpdateResult:
+        await self.database.round_trip()
+        doc = self._first(query)
+        if doc is None:
+            if not upsert:
+                return UpdateResult(0, 0)
+            doc = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+            _update(doc, update, array_filters)
+            doc.setdefault("_id", ObjectId())
+            self.docs[doc["_id"]] = doc
+            return UpdateResult(0, 0, doc["_id"])
+        before = copy.deepcopy(doc)
+        _update(doc, update, array_filters)
+        return UpdateResult(1, int(doc != before))
+
+    async def find_one_and_update(self, query: dict, update: dict, projection=None,
+                                  return_document: bool = False, **kwargs) -> Optional[dict]:
+        await self.database.round_trip()
+        doc = self._first(query)
+        if doc is None:
+            return None
+        before = copy.deepcopy(doc)
+        _update(doc, update, kwargs.get("array_filters"))
+        # pymongo's ReturnDocument.AFTER is True
+        return _project(copy.deepcopy(doc) if return_document else before, projection)
+
+    async def replace_one(self, query: dict, replacement: dict, upsert: bool = False) -> UpdateResult:
+        await self.database.round_trip()
+        doc = self._first(query)
+        if doc is None and not upsert:
+            return UpdateResult(0, 0)
+        _id = doc["_id"] if doc else replacement.get("_id", ObjectId())
+        self.docs[_id] = {**copy.deepcopy(replacement), "_id": _id}
+        return UpdateResult(int(doc is not None), int(doc is not None), None if doc else _id)
+
+    async def delete_one(self, query: dict) -> DeleteResult:
+        await self.database.round_trip()
+        doc = self._first(query)
+        if doc is None:
+            return DeleteResult(0)
+        del self.docs[doc["_id"]]
+        return DeleteResult(1)
+
+    async def create_index(self, *args, **kwargs):
+        await self.database.round_trip()
+
+
+class MemoryDatabase:
+    def __init__(self, latency: float = 0.0):
+        # Simulated round-trip time per operation, in seconds
+        self.latency = latency
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    async def round_trip(self):
+        await asyncio.sleep(self.latency)
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(self, name)
+        return self._collections[name]
+
+    async def command(self, name: str):
+        await self.round_trip()
+        return {"ok": 1.0}
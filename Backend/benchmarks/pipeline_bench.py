@@ -0,0 +1,221 @@
+"""Offline end-to-end benchmark for LearningService.create_learning_content.
+
+Search, websites and Gemini are replaced by recorded/fake backends so the whole
+pipeline runs on a single machine without network access:
+
+    cd Backend
+    python -m benchmarks.pipeline_bench --shapes 3x5,5x7 --concurrency 1,4 --courses 8
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import resource
+import statistics
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Dict, List
+
+from LearningAssistant.content_generator import ContentGenerator
+from LearningAssistant.learning_service import LearningService
+from LearningAssistant.models import DifficultyLevel, LearningRequest
+from WebSearch.cache import TTLCache, search_results_size
+from WebSearch.content_extractor import ContentExtractor
+from WebSearch.domain_health import DomainHealth
+
+from .corpus_server import CorpusServer
+from .fakes import FakeGenAIClient, FakeWebSearcher, LatencyProfile
+
+
+# Stage name -> (attribute holder, method name)
+STAGES = {
+    "design": ("content_generator", "design_course_structure"),
+    "introduction": ("content_generator", "generate_topic_introduction"),
+    "subtopic": ("content_generator", "generate_subtopic_content"),
+    "search": ("web_searcher", "search_duckduckgo"),
+    "extract": ("content_extractor", "extract_multiple_contents"),
+}
+
+
+class StageRecorder:
+    """Times every call of the instrumented service methods"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def instrument(self, service: LearningService):
+        for stage, (holder, name) in STAGES.items():
+            target = getattr(service, holder)
+            setattr(target, name, self._wrap(stage, getattr(target, name)))
+
+    def _wrap(self, stage: str, method):
+        @functools.wraps(method)
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                self.samples[stage].append(time.perf_counter() - start)
+        return timed
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def parse_shapes(value: str) -> List[tuple]:
+    """'3x5,5x7' -> [(3, 5), (5, 7)]: user subtopics x designed subtopics"""
+    shapes = []
+    for part in value.split(","):
+        user, _, designed = part.strip().partition("x")
+        shapes.append((int(user), int(designed or user)))
+    return shapes
+
+
+async def run_config(args, base_url: str, shape: tuple, concurrency: int) -> dict:
+    user_subtopics, designed_subtopics = shape
+    client = FakeGenAIClient(
+        latency=LatencyProfile(args.llm_latency, args.llm_sigma, args.llm_error_rate),
+        designed_subtopics=designed_subtopics,
+        section_words=args.section_words,
+        seed=args.seed,
+    )
+    # Every configuration starts cold: its own caches (disabled unless --warm-cache) and
+    # domain statistics, so earlier configurations cannot speed up later ones
+    ttl = 24 * 3600 if args.warm_cache else 0
+    # The app's budgets, extraction quorum and coverage targets, so the production path is measured
+    settings = LearningService.settings_from_env()
+    service = LearningService(
+        content_generator=ContentGenerator(client=client),
+        web_searcher=FakeWebSearcher(
+            base_url,
+            latency=LatencyProfile(args.search_latency, args.search_sigma, args.search_error_rate),
+            blocking=args.blocking_search,
+            seed=args.seed,
+        ),
+        content_extractor=ContentExtractor(
+            timeout=settings["budget"].fetch_call,
+            max_bytes=int(os.getenv("FETCH_MAX_BYTES", "2000000")),
+            domain_health=DomainHealth(),
+            cache=TTLCache("bench_content", ttl=ttl, max_bytes=64 * 1024 * 1024),
+        ),
+        search_cache=TTLCache("bench_search", ttl=ttl, max_bytes=8 * 1024 * 1024, sizeof=search_results_size),
+        **settings,
+    )
+    recorder = StageRecorder()
+    recorder.instrument(service)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async def one_course(i: int):
+        nonlocal failures
+        request = LearningRequest(
+            topic=args.topic,
+            sub_topics=[f"{args.topic} Subtopic {j + 1}" for j in range(user_subtopics)],
+            difficulty=DifficultyLevel(args.difficulty),
+        )
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await service.create_learning_content(request)
+                recorder.samples["course"].append(time.perf_counter() - start)
+            except Exception as e:
+                failures += 1
+                print(f"course {i} failed: {e}")
+
+    tracemalloc.reset_peak()
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(one_course(i) for i in range(args.courses)))
+        elapsed = time.perf_counter() - started
+    finally:
+        await service.aclose()
+    _, peak = tracemalloc.get_traced_memory()
+
+    completed = len(recorder.samples["course"])
+    return {
+        "shape": f"{user_subtopics}x{designed_subtopics}",
+        "concurrency": concurrency,
+        "courses": args.courses,
+        "completed": completed,
+        "failed": failures,
+        "elapsed_s": round(elapsed, 3),
+        "courses_per_minute": round(completed / elapsed * 60, 2) if elapsed else 0.0,
+        "peak_traced_mb": round(peak / 2**20, 2),
+        "llm_calls": client.calls,
+        "stages": {
+            stage: {
+                "count": len(values),
+                "mean": round(statistics.fmean(values), 4),
+                "p50": round(percentile(values, 50), 4),
+                "p95": round(percentile(values, 95), 4),
+                "p99": round(percentile(values, 99), 4),
+            }
+            for stage, values in recorder.samples.items() if values
+        },
+    }
+
+
+def print_report(result: dict):
+    print(f"\n=== shape {result['shape']} | concurrency {result['concurrency']} ===")
+    print(f"completed {result['completed']}/{result['courses']} (failed {result['failed']}) "
+          f"in {result['elapsed_s']}s -> {result['courses_per_minute']} courses/min, "
+          f"peak traced memory {result['peak_traced_mb']} MB, {result['llm_calls']} LLM calls")
+    print(f"{'stage':<14}{'count':>7}{'p50 s':>10}{'p95 s':>10}{'p99 s':>10}")
+    for stage, stats in result["stages"].items():
+        print(f"{stage:<14}{stats['count']:>7}{stats['p50']:>10.3f}{stats['p95']:>10.3f}{stats['p99']:>10.3f}")
+
+
+async def main(args):
+    tracemalloc.start()
+    results = []
+    with CorpusServer(latency=args.fetch_latency, padding_bytes=args.page_padding_kb * 1024) as server:
+        for shape in parse_shapes(args.shapes):
+            for concurrency in (int(c) for c in args.concurrency.split(",")):
+                result = await run_config(args, server.base_url, shape, concurrency)
+                print_report(result)
+                results.append(result)
+    tracemalloc.stop()
+
+    # ru_maxrss is in KiB on Linux
+    max_rss_mb = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    print(f"\nprocess peak RSS: {max_rss_mb} MB")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"max_rss_mb": max_rss_mb, "results": results}, f, indent=2)
+        print(f"results written to {args.json}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Offline benchmark of the course generation pipeline")
+    parser.add_argument("--topic", default="Machine Learning")
+    parser.add_argument("--difficulty", default="beginner", choices=[d.value for d in DifficultyLevel])
+    parser.add_argument("--shapes", default="3x5", help="comma separated USERxDESIGNED subtopic counts")
+    parser.add_argument("--concurrency", default="1,4", help="comma separated concurrent course counts")
+    parser.add_argument("--courses", type=int, default=4, help="courses generated per configuration")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="median LLM latency (s)")
+    parser.add_argument("--llm-sigma", type=float, default=0.3, help="log-normal sigma of LLM latency")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--section-words", type=int, default=650)
+    parser.add_argument("--search-latency", type=float, default=0.2, help="median search latency (s)")
+    parser.add_argument("--search-sigma", type=float, default=0.3)
+    parser.add_argument("--search-error-rate", type=float, default=0.0)
+    parser.add_argument("--blocking-search", action="store_true", help="fake search blocks the event loop")
+    parser.add_argument("--fetch-latency", type=float, default=0.05, help="per-page server delay (s)")
+    parser.add_argument("--page-padding-kb", type=int, default=64, help="boilerplate added to each page")
+    parser.add_argument("--warm-cache", action="store_true",
+                        help="let courses of a configuration share search and page caches")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write machine readable results to this file")
+    return parser
+
+
+if __name__ == "__main__":
+    asyncio.run(main(build_parser().parse_args()))
@@ -1,50 +1,81 @@
+from dotenv import load_dotenv
+# Load .env once, before any module reads its settings
+load_dotenv()
+
 from pydantic import Field
 from fastapi import FastAPI, HTTPException , BackgroundTasks
 from fastapi import Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 from typing import Optional, List
-from WebSearch.websearch import WebSearcher
-from WebSearch.content_extractor import ContentExtractor
-from WebSearch.summarizer import Summarizer
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import os
-from middleware.auth import authorise
-from profanity_detection import is_profane
+import uuid
+from datetime import datetime, timezone
+from middleware.auth import authorise, authorise_admin, is_admin
 from api.login_register import app as login_register_app
-from LearningAssistant.models import LearningRequest
-from LearningAssistant.content_generator import ContentGenerator
+from LearningAssistant.models import GenerationMode, GenerationStatus, LearningRequest, SubTopicContent
 from LearningAssistant.learning_service import LearningService
-from model.db_connect import db
+from LearningAssistant.singleflight import SingleFlight, request_fingerprint
+from LearningAssistant.scheduler import GenerationScheduler
+from LearningAssistant.research_corpus import default_research_memory
+from LearningAssistant.cache_warmer import CacheWarmer, WarmingSchedule
+from model.db_connect import db, close_client, ping
+from model.course_store import (
+    IN_PROGRESS_STATUSES, list_course_progress, load_course_research, normalize_status, popular_subtopics,
+    record_section_generated, save_course_research, save_course_timings, set_generation_status
+)
+from model.course_search import course_search
+from model.compression import compress_course, compress_section, compress_text, decompress_course
+from observability.metrics import COURSE_DURATION, render_latest
+from observability.profiling import JobProfile
+from observability.tracing import start_trace
+from WebSearch.cache import default_content_cache, default_search_cache
+from WebSearch.domain_health import default_domain_health
 from bson import ObjectId
 # Global variables for services
 learning_service = None
+# Researches popular topics off-peak so their searches and pages are cached
+cache_warmer = None
+# Identical requests that arrive while a generation is running share its result
+generation_flights = SingleFlight()
+# Fair share of pipeline capacity across users
+generation_scheduler = GenerationScheduler(
+    max_running=int(os.getenv("GENERATION_MAX_RUNNING", "4")),
+    per_user_limit=int(os.getenv("GENERATION_PER_USER_LIMIT", "2")),
+)
+# Drafts are awaited by the request that asks for them, so they get their own slots: a
+# draft never waits for full courses, and one user cannot run several drafts at once
+draft_scheduler = GenerationScheduler(
+    max_running=int(os.getenv("DRAFT_MAX_RUNNING", "4")),
+    per_user_limit=int(os.getenv("DRAFT_PER_USER_LIMIT", "1")),
+)
+# content_id -> task running that course's generation on this pod
+running_generations: dict[str, asyncio.Task] = {}
+# How often a generation checks whether another pod received a cancel request for it
+CANCEL_POLL_SECONDS = float(os.getenv("CANCEL_POLL_SECONDS", "5"))
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    global learning_service
-    
-    gemini_api_key = os.getenv("GEMINI_API_KEY")
-    if not gemini_api_key:
-        raise ValueError("GEMINI_API_KEY environment variable is required")
+    global learning_service, cache_warmer
     
     # Initialize services
-    content_generator = ContentGenerator()
-    web_searcher = WebSearcher()  # Your existing class
-    content_extractor = ContentExtractor()  # Your existing class
-    
-    learning_service = LearningService(
-        content_generator=content_generator,
-        web_searcher=web_searcher,
-        content_extractor=content_extractor
-    )
+    service = LearningService.from_env()
+    learning_service = service
+    cache_warmer = CacheWarmer(service, WarmingSchedule.from_env(), popular_subtopics)
+    cache_warmer.start()
     
     yield
     
     # Shutdown
+    await cache_warmer.stop()
+    cache_warmer = None
     learning_service = None
+    await service.aclose()
+    close_client()
 
 
 app = FastAPI(title="CourseGen , AI Assistant", version="1.0.0", lifespan=lifespan)
@@ -78,6 +109,10 @@ def serialize_mongo_document(doc):
     for key, value in doc.items():
         if isinstance(value, ObjectId):
             doc[key] = str(value)
+        elif isinstance(value, datetime):
+            doc[key] = value.isoformat()
+        elif isinstance(value, dict):
+            serialize_mongo_document(value)
     return doc
 
 
@@ -85,37 +120,228 @@ def serialize_mongo_document(doc):
 async def get_course_content(content_id: str, payload: dict = Depends(authorise)):
     """Get course content by ID"""
     try:
-        content = await db['course_content'].find_one({"_id": ObjectId(content_id)})
+        # Courses generated before timings had their own collection still carry them
+        content = await db['course_content'].find_one({"_id": ObjectId(content_id)}, projection={"timings": 0})
         if not content:
             raise HTTPException(status_code=404, detail="Content not found")
 
-        return JSONResponse(content=serialize_mongo_document(content), status_code=200)
+        if not content.get("content_loaded"):
+            # Only the pod running the job knows its place in the queue
+            content["queue_position"] = generation_scheduler.position(content_id)
+
+        return JSONResponse(content=serialize_mongo_document(decompress_course(content)), status_code=200)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def generate_learning_background(request: LearningRequest , payload:dict):
-    """Background task to generate learning content"""
+@app.get("/api/course-content/{content_id}/status")
+async def get_course_status(content_id: str, payload: dict = Depends(authorise)):
+    """Generation status of a course, read without loading its content"""
     try:
-        if not learning_service:
-            raise HTTPException(status_code=500, detail="Learning service not initialized")
+        user_id = payload.get("user_id")
+        if not user_id:
+            raise HTTPException(status_code=401, detail="Could not validate user credentials")
+
+        course = await db['course_content'].find_one(
+            {"_id": ObjectId(content_id), "user_id": ObjectId(user_id)},
+            projection={"status": 1, "status_times": 1, "generation_progress": 1, "error": 1, "content_loaded": 1}
+        )
+        if not course:
+            raise HTTPException(status_code=404, detail="Content not found")
+
+        progress = course.get("generation_progress") or {}
+        status = normalize_status(course.get("status"), course.get("content_loaded", False))
+        return JSONResponse(content={
+            "content_id": content_id,
+            "status": status,
+            # Only the pod running the job knows its place in the queue; a draft waits for its upgrade
+            "queue_position": generation_scheduler.position(content_id)
+            if status in (GenerationStatus.QUEUED.value, GenerationStatus.DRAFT.value) else None,
+            "content_loaded": course.get("content_loaded", False),
+            "timestamps": {status: at.isoformat() for status, at in (course.get("status_times") or {}).items()},
+            "sections": {"total": progress.get("sections"), "completed": progress.get("completed", 0)},
+            "error": course.get("error"),
+        }, status_code=200)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        response = await learning_service.create_learning_content(request)
-        content = db['course_content'].find_one_and_update({"_id": ObjectId(payload["content_id"])},{
-            "$set": {
+
+async def generate_learning_background(request: LearningRequest , payload:dict, profile: bool = False, outline: Optional[List[str]] = None):
+    """Background task to generate learning content; with `outline` it upgrades a stored draft of that outline.
+
+    Every outcome is written to the course's status (nothing is raised to the caller,
+    which is the background task runner once the response has been sent).
+    """
+    content_id = payload["content_id"]
+    user_id = payload.get("user_id")
+    with start_trace() as trace:
+        if profile:
+            trace.profile = JobProfile()
+            trace.profile.start()
+        try:
+            if not learning_service:
+                raise Exception("Learning service not initialized")
+
+            async def on_stage(status: GenerationStatus, sections: Optional[int] = None):
+                fields = {"generation_progress": {"sections": sections, "completed": 0}} if sections is not None else None
+                await set_generation_status(content_id, status, fields)
+
+            async def on_section(index: int, section: SubTopicContent):
+                if outline:
+                    # Field by field so the read flag survives; sections regenerated meanwhile are no longer drafts
+                    await db['course_content'].update_one({"_id": ObjectId(content_id)}, {"$set": {
+                        "subtopic_contents.$[elem].content": compress_text(section.content),
+                        "subtopic_contents.$[elem].sources": section.sources,
+                        "subtopic_contents.$[elem].word_count": section.word_count,
+                        "subtopic_contents.$[elem].draft": False,
+                        "subtopic_contents.$[elem].model": section.model,
+                        "content_updated_at": datetime.now(timezone.utc),
+                    }}, array_filters=[{"elem.subtopic": section.subtopic, "elem.draft": True}])
+                await record_section_generated(content_id)
+
+            fingerprint = request_fingerprint(request)
+            scheduled = lambda: generation_scheduler.run(
+                user_id,
+                content_id,
+                lambda: learning_service.create_learning_content(
+                    request, outline=outline, on_section=on_section, on_stage=on_stage
+                )
+            )
+            # Profiled runs and draft upgrades must do their own work (the latter for the draft's
+            # outline), so they never join an identical in-flight generation. Courses that join
+            # one stay queued until it is done, since its stages are reported to its own course.
+            uncoalesced = profile or outline
+            flight = run_uncoalesced(scheduled) if uncoalesced else generation_flights.run(fingerprint, scheduled)
+            # Run in a child task so a cancel request can stop it while we record the outcome
+            job = asyncio.create_task(flight)
+            running_generations[content_id] = job
+            watcher = asyncio.create_task(watch_for_cancel(content_id, job))
+            try:
+                response, coalesced = await job
+            except asyncio.CancelledError:
+                # Cancelling this task (e.g. at shutdown) takes the job down with it; only a
+                # cancel of the job alone comes from the user
+                if not job.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                print(f"Generation of course {content_id} cancelled")
+                await set_generation_status(content_id, GenerationStatus.CANCELLED)
+                return None
+            finally:
+                watcher.cancel()
+                running_generations.pop(content_id, None)
+            COURSE_DURATION.labels(outcome="ok").observe(trace.elapsed())
+            if outline:
+                await finish_draft_upgrade(content_id, response, fingerprint, trace)
+                return response
+            # model_dump() builds fresh dicts, so every document gets its own read flags
+            await set_generation_status(content_id, GenerationStatus.DONE, {
                 "content_loaded": True,
-                **response.model_dump(),
-            }
+                # Markdown fields are stored compressed and expanded again on read
+                **compress_course(response.model_dump()),
+                # Kept up to date by mark-read and append, so progress never needs the sections
+                "progress": {"sections": len(response.subtopic_contents), "read": 0},
+                "generation_progress": {"sections": len(response.subtopic_contents), "completed": len(response.subtopic_contents)},
+                # Tells search indexes (and other readers) that the text changed
+                "content_updated_at": datetime.now(timezone.utc),
+                "fingerprint": fingerprint,
+                "coalesced": coalesced,
+            })
+            await save_timings(content_id, trace)
+            if response.research:
+                await save_course_research(content_id, response.research)
+            return response
+        except Exception as e:
+            COURSE_DURATION.labels(outcome="error").observe(trace.elapsed())
+            print(f"Generation of course {content_id} failed: {e}")
+            try:
+                await set_generation_status(content_id, GenerationStatus.FAILED, {"error": str(e)})
+            except Exception as write_error:
+                print(f"Could not record the failure of course {content_id}: {write_error}")
+            await save_timings(content_id, trace)
+            return None
+        finally:
+            if trace.profile is not None:
+                await save_profile(payload, trace)
+
+
+async def finish_draft_upgrade(content_id: str, response, fingerprint: str, trace):
+    """Complete an upgraded draft.
+
+    Its sections were already replaced one by one, so the course keeps its read flags,
+    progress and any sections appended meanwhile; only the rest of the course is written.
+    """
+    course = await db['course_content'].find_one(
+        {"_id": ObjectId(content_id)}, projection={"subtopic_contents.word_count": 1}
+    )
+    total_word_count = response.introduction.word_count + sum(
+        sc.get("word_count", 0) for sc in (course or {}).get("subtopic_contents", [])
+    )
+    fields = compress_course(response.model_dump(exclude={"subtopic_contents", "sub_topics"}))
+    await set_generation_status(content_id, GenerationStatus.DONE, {
+        **fields,
+        "total_word_count": total_word_count,
+        "estimated_reading_time": max(1, total_word_count // 200),
+        "content_updated_at": datetime.now(timezone.utc),
+        "fingerprint": fingerprint,
+        "coalesced": False,
+    })
+    await save_timings(content_id, trace)
+    if response.research:
+        await save_course_research(content_id, response.research)
+
+
+async def run_uncoalesced(factory):
+    return await factory(), False
+
+
+async def save_timings(content_id: str, trace):
+    """Store the generation's timing breakdown; losing it never fails the course"""
+    try:
+        await save_course_timings(content_id, trace.summary())
+    except Exception as e:
+        print(f"Could not store timings of course {content_id}: {e}")
+
+
+async def save_profile(payload: dict, trace):
+    """Stop the job's profiler and store its artifact, whatever the outcome of the generation"""
+    trace.profile.stop()
+    try:
+        await db['profiles'].insert_one({
+            "content_id": ObjectId(payload["content_id"]),
+            "user_id": ObjectId(payload.get("user_id")),
+            "created_at": trace.started_at,
+            "profile": trace.profile.summary(),
+            "timings": trace.summary(),
         })
-        return content
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        print(f"Could not store profile of course {payload['content_id']}: {e}")
+
+
+async def watch_for_cancel(content_id: str, job: asyncio.Task):
+    """Cancel the job once a cancel request for it shows up in Mongo (it may arrive on another pod)"""
+    while not job.done():
+        await asyncio.sleep(CANCEL_POLL_SECONDS)
+        doc = await db['course_content'].find_one({"_id": ObjectId(content_id)}, projection={"cancel_requested": 1})
+        if doc and doc.get("cancel_requested"):
+            job.cancel()
+            return
 
 
 class MarkReadPayload(BaseModel):
     sub_topic: str = Field(..., description="The name of the sub-topic to mark as read")
 
+class SubtopicPayload(BaseModel):
+    sub_topic: str = Field(..., description="The name of the sub-topic to generate")
+
+# Upper bound on sections per course, including appended ones
+MAX_COURSE_SUBTOPICS = 12
+MAX_PROGRESS_PAGE_SIZE = 100
+MAX_SEARCH_RESULTS = 50
+
 @app.get("/api/course-content")
 async def get_all_course_content(payload: dict = Depends(authorise)):
     """Get all course content for the authenticated user"""
@@ -133,6 +359,49 @@ async def get_all_course_content(payload: dict = Depends(authorise)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/course-progress")
+async def get_course_progress(page: int = 1, page_size: int = 20, payload: dict = Depends(authorise)):
+    """Reading progress and generation status of the user's courses, newest first"""
+    try:
+        user_id = payload.get("user_id")
+        if not user_id:
+            raise HTTPException(status_code=401, detail="Could not validate user credentials")
+        if page < 1 or not 1 <= page_size <= MAX_PROGRESS_PAGE_SIZE:
+            raise HTTPException(status_code=400, detail=f"page must be >= 1 and page_size between 1 and {MAX_PROGRESS_PAGE_SIZE}")
+
+        items, total = await list_course_progress(user_id, skip=(page - 1) * page_size, limit=page_size)
+        return JSONResponse(content={
+            "items": [serialize_mongo_document(item) for item in items],
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+        }, status_code=200)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/course-search")
+async def search_courses(q: str, limit: int = 20, payload: dict = Depends(authorise)):
+    """Sections of the user's courses matching `q`, best first, with highlighted snippets"""
+    try:
+        user_id = payload.get("user_id")
+        if not user_id:
+            raise HTTPException(status_code=401, detail="Could not validate user credentials")
+        if not q.strip():
+            raise HTTPException(status_code=400, detail="Search query cannot be empty")
+        if not 1 <= limit <= MAX_SEARCH_RESULTS:
+            raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_SEARCH_RESULTS}")
+
+        results = await course_search.search(user_id, q, limit=limit)
+        return JSONResponse(content={"query": q, **results}, status_code=200)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.put("/api/course-content/{content_id}/read")
 async def mark_course_content_as_read(req_body: MarkReadPayload, content_id: str, payload: dict = Depends(authorise)):
     """Mark course content as read"""
@@ -143,13 +412,16 @@ async def mark_course_content_as_read(req_body: MarkReadPayload, content_id: str
         if not user_id:
             raise HTTPException(status_code=401, detail="Could not validate user credentials")
 
+        # Only matches while the section is unread, so repeated calls count it once
         result = await db['course_content'].update_one(
             {
                 "_id": ObjectId(content_id),
-                "user_id": ObjectId(user_id)
+                "user_id": ObjectId(user_id),
+                "subtopic_contents": {"$elemMatch": {"subtopic": sub_topic, "read": {"$ne": True}}}
             },
             {
-                "$set": {"subtopic_contents.$[elem].read": True}
+                "$set": {"subtopic_contents.$[elem].read": True},
+                "$inc": {"progress.read": 1}
             },
             array_filters=[{"elem.subtopic": req_body.sub_topic}] # Access sub_topic from the validated payload
         )
@@ -166,14 +438,175 @@ async def mark_course_content_as_read(req_body: MarkReadPayload, content_id: str
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def load_generated_course(content_id: str, user_id: str):
+    """Fetch a fully generated course owned by the user, or raise 404/409"""
+    course = await db['course_content'].find_one(
+        {"_id": ObjectId(content_id), "user_id": ObjectId(user_id)},
+        projection={"subtopic_contents.content": 0}
+    )
+    if not course:
+        raise HTTPException(status_code=404, detail="Content not found")
+    if not course.get("content_loaded"):
+        raise HTTPException(status_code=409, detail="Course is still being generated")
+    return course
+
+
+@app.post("/api/course-content/{content_id}/subtopics/regenerate")
+async def regenerate_subtopic(req_body: SubtopicPayload, content_id: str, payload: dict = Depends(authorise)):
+    """Regenerate a single section of an existing course in place"""
+    try:
+        if not learning_service:
+            raise HTTPException(status_code=500, detail="Learning service not initialized")
+
+        user_id = payload.get("user_id")
+        if not user_id:
+            raise HTTPException(status_code=401, detail="Could not validate user credentials")
+
+        course = await load_generated_course(content_id, user_id)
+        existing = next((sc for sc in course.get("subtopic_contents", []) if sc["subtopic"] == req_body.sub_topic), None)
+        if not existing:
+            raise HTTPException(status_code=404, detail=f"Sub-topic '{req_body.sub_topic}' not found in this course")
+
+        research = await load_course_research(content_id)
+        subtopic_content, research = await generation_scheduler.run(
+            user_id,
+            f"section-{uuid.uuid4().hex}",
+            lambda: learning_service.create_subtopic_content(course, req_body.sub_topic, research),
+        )
+        # Regenerating a section does not change whether the user has read it
+        subtopic_content.read = existing.get("read", False)
+
+        total_word_count = course.get("total_word_count", 0) - existing.get("word_count", 0) + subtopic_content.word_count
+        await db['course_content'].update_one(
+            {"_id": ObjectId(content_id), "user_id": ObjectId(user_id)},
+            {
+                "$set": {
+                    "subtopic_contents.$[elem]": compress_section(subtopic_content.model_dump()),
+                    "total_word_count": total_word_count,
+                    "estimated_reading_time": max(1, total_word_count // 200),
+                    "content_updated_at": datetime.now(timezone.utc),
+                }
+            },
+            array_filters=[{"elem.subtopic": req_body.sub_topic}]
+        )
+        await save_course_research(content_id, research)
+
+        return JSONResponse(content=subtopic_content.model_dump(), status_code=200)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/course-content/{content_id}/subtopics")
+async def append_subtopic(req_body: SubtopicPayload, content_id: str, payload: dict = Depends(authorise)):
+    """Generate a new section and append it to an existing course"""
+    try:
+        if not learning_service:
+            raise HTTPException(status_code=500, detail="Learning service not initialized")
+
+        user_id = payload.get("user_id")
+        if not user_id:
+            raise HTTPException(status_code=401, detail="Could not validate user credentials")
+
+        sub_topic = req_body.sub_topic.strip()
+        if not sub_topic:
+            raise HTTPException(status_code=400, detail="Sub-topic cannot be empty")
+
+        course = await load_generated_course(content_id, user_id)
+        subtopics = [sc["subtopic"] for sc in course.get("subtopic_contents", [])]
+        if sub_topic in subtopics:
+            raise HTTPException(status_code=400, detail=f"Sub-topic '{sub_topic}' already exists in this course")
+        if len(subtopics) >= MAX_COURSE_SUBTOPICS:
+            raise HTTPException(status_code=400, detail=f"Maximum {MAX_COURSE_SUBTOPICS} subtopics allowed per course")
+
+        research = await load_course_research(content_id)
+        subtopic_content, research = await generation_scheduler.run(
+            user_id,
+            f"section-{uuid.uuid4().hex}",
+            lambda: learning_service.create_subtopic_content(course, sub_topic, research),
+        )
+
+        total_word_count = course.get("total_word_count", 0) + subtopic_content.word_count
+        result = await db['course_content'].update_one(
+            # Checked again in the write, since another append may have landed during generation
+            {
+                "_id": ObjectId(content_id),
+                "user_id": ObjectId(user_id),
+                "subtopic_contents.subtopic": {"$ne": sub_topic},
+                f"subtopic_contents.{MAX_COURSE_SUBTOPICS - 1}": {"$exists": False},
+            },
+            {
+                "$push": {
+                    "subtopic_contents": compress_section(subtopic_content.model_dump()),
+                    "sub_topics": sub_topic,
+                },
+                "$set": {
+                    "total_word_count": total_word_count,
+                    "estimated_reading_time": max(1, total_word_count // 200),
+                    "content_updated_at": datetime.now(timezone.utc),
+                },
+                # Courses stored before progress counters existed are counted from their sections
+                **({"$inc": {"progress.sections": 1}} if "sections" in course.get("progress", {}) else {}),
+            }
+        )
+        if not result.matched_count:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Sub-topic '{sub_topic}' was added meanwhile or the course reached {MAX_COURSE_SUBTOPICS} subtopics"
+            )
+        await save_course_research(content_id, research)
+
+        return JSONResponse(content=subtopic_content.model_dump(), status_code=201)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/course-content/{content_id}/cancel")
+async def cancel_course_generation(content_id: str, payload: dict = Depends(authorise)):
+    """Cancel a course that is still queued or generating"""
+    try:
+        user_id = payload.get("user_id")
+        if not user_id:
+            raise HTTPException(status_code=401, detail="Could not validate user credentials")
+
+        result = await db['course_content'].update_one(
+            # Drafts are readable but still being upgraded, so the status decides
+            {"_id": ObjectId(content_id), "user_id": ObjectId(user_id), "status": {"$in": IN_PROGRESS_STATUSES}},
+            {"$set": {"cancel_requested": True}}
+        )
+        if result.matched_count == 0:
+            raise HTTPException(status_code=404, detail="No pending generation found for this course")
+
+        # Cancel right away if the job runs here; otherwise its pod picks the request up
+        job = running_generations.get(content_id)
+        if job:
+            job.cancel()
+
+        return JSONResponse(content={"message": "Cancellation requested.", "content_id": content_id}, status_code=202)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/api/generate-learning-content")
-async def generate_learning_content(request:  LearningRequest, background_tasks: BackgroundTasks, payload: dict = Depends(authorise)):
+async def generate_learning_content(request:  LearningRequest, background_tasks: BackgroundTasks, profile: bool = False, payload: dict = Depends(authorise)):
     """
-    Generate comprehensive learning content for a given topic and subtopics
+    Generate comprehensive learning content for a given topic and subtopics.
+    Admins can pass ?profile=true to record a CPU and allocation profile of the job.
     """
     try:
         if not learning_service:
             raise HTTPException(status_code=500, detail="Learning service not initialized")
+
+        if profile and not is_admin(payload):
+            raise HTTPException(status_code=403, detail="Profiling is restricted to admins")
         
         # Validate request
         if not request.topic.strip():
@@ -185,32 +618,170 @@ async def generate_learning_content(request:  LearningRequest, background_tasks:
         if len(request.sub_topics) > 10:
             raise HTTPException(status_code=400, detail="Maximum 10 subtopics allowed")
         
+        draft = None
+        if request.mode == GenerationMode.DRAFT:
+            try:
+                draft = await draft_scheduler.run(
+                    payload.get("user_id"),
+                    f"draft-{uuid.uuid4().hex}",
+                    lambda: learning_service.create_draft_content(request),
+                )
+            except Exception as e:
+                # The full course is still generated, just without a draft to read meanwhile
+                print(f"Draft of '{request.topic}' failed, generating the full course only: {e}")
+
         # Generate content
         # response = await learning_service.create_learning_content(request)
-        content = await db['course_content'].insert_one({
+        created_at = datetime.now(timezone.utc)
+        document = {
             "user_id": ObjectId(payload.get("user_id")),
             "topic": request.topic,
             "sub_topics": request.sub_topics,
+            # sub_topics becomes the designed outline; popular_subtopics counts what was asked for
+            "requested_sub_topics": request.sub_topics,
+            "difficulty": request.difficulty.value,
+            "language": request.language or "english",
             "content_loaded":False,
-        })
+            "status": GenerationStatus.QUEUED.value,
+            "status_times": {GenerationStatus.QUEUED.value: created_at},
+        }
+        if draft:
+            document.update({
+                **compress_course(draft.model_dump()),
+                "content_loaded": True,
+                "status": GenerationStatus.DRAFT.value,
+                "status_times": {GenerationStatus.QUEUED.value: created_at, GenerationStatus.DRAFT.value: datetime.now(timezone.utc)},
+                "progress": {"sections": len(draft.subtopic_contents), "read": 0},
+                "content_updated_at": datetime.now(timezone.utc),
+            })
+        content = await db['course_content'].insert_one(document)
         payload["content_id"] = str(content.inserted_id)
-        background_tasks.add_task(generate_learning_background, request, payload)
+        if draft:
+            background_tasks.add_task(generate_learning_background, request, payload, profile, draft.sub_topics)
+            return JSONResponse(
+                content={"message": "Draft course ready. The full course replaces its sections in the background.",
+                         "content_id": payload["content_id"],
+                         "course": draft.model_dump(mode="json")},
+                status_code=201
+            )
+        background_tasks.add_task(generate_learning_background, request, payload, profile)
         return JSONResponse(
             content={"message": "Learning content generation started in the background. You can check the status later." , 
                      "content_id": payload["content_id"]},
             status_code=202
         )
 
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/admin/profiles")
+async def list_profiles(limit: int = 20, payload: dict = Depends(authorise_admin)):
+    """Most recent generation profiles, without their stacks"""
+    try:
+        limit = max(1, min(limit, MAX_PROGRESS_PAGE_SIZE))
+        profiles = await db['profiles'].find(
+            {},
+            projection={"content_id": 1, "user_id": 1, "created_at": 1, "profile.duration": 1, "profile.samples": 1, "timings.total_seconds": 1}
+        ).sort("created_at", -1).limit(limit).to_list(length=limit)
+        return JSONResponse(content=[serialize_mongo_document(p) for p in profiles], status_code=200)
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/admin/profiles/{content_id}")
+async def get_profile(content_id: str, payload: dict = Depends(authorise_admin)):
+    """Full profile artifact of a course generation; collapsed stacks feed flame graph tools"""
+    try:
+        profile = await db['profiles'].find_one({"content_id": ObjectId(content_id)}, sort=[("created_at", -1)])
+        if not profile:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        return JSONResponse(content=serialize_mongo_document(profile), status_code=200)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/admin/timings/{content_id}")
+async def get_timings(content_id: str, payload: dict = Depends(authorise_admin)):
+    """Span and fetch breakdown of a course's latest generation"""
+    try:
+        timings = await db['course_timings'].find_one({"content_id": ObjectId(content_id)}, projection={"_id": 0})
+        if not timings:
+            raise HTTPException(status_code=404, detail="Timings not found")
+        return JSONResponse(content=serialize_mongo_document(timings), status_code=200)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/admin/cache-warm")
+async def warm_caches(background_tasks: BackgroundTasks, minutes: float = 60, payload: dict = Depends(authorise_admin)):
+    """Run a cache warming pass now, outside the off-peak window, within the warmer's budgets"""
+    try:
+        if not cache_warmer:
+            raise HTTPException(status_code=503, detail="Service not ready")
+        if minutes <= 0:
+            raise HTTPException(status_code=400, detail="minutes must be positive")
+        background_tasks.add_task(cache_warmer.warm, minutes * 60)
+        return JSONResponse(content={"message": "Cache warming started", "last_run": cache_warmer.last_run}, status_code=202)
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint"""
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
+
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "AI Learning Assistant"}
 
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: services are initialized and MongoDB answers"""
+    checks = {
+        "services": learning_service is not None,
+        "database": await ping(),
+    }
+    ready = all(checks.values())
+    return JSONResponse(
+        content={
+            "status": "ready" if ready else "not ready",
+            "checks": checks,
+            "research": default_research_memory.usage(),
+            "models": learning_service.content_generator.router.snapshot() if learning_service else {},
+            "search": course_search.usage(),
+            "generation": {"courses": generation_scheduler.stats(), "drafts": draft_scheduler.stats()},
+            "domains": default_domain_health.snapshot(),
+            "caches": {
+                "search": default_search_cache.usage(),
+                "content": default_content_cache.usage(),
+                "last_warming": cache_warmer.last_run if cache_warmer else None,
+            },
+        },
+        status_code=200 if ready else 503
+    )
+
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
@@ -220,6 +791,9 @@ async def root():
         "endpoints": {
             "generate_content": "/generate-learning-content",
             "health": "/health",
+            "liveness": "/health/live",
+            "readiness": "/health/ready",
+            "metrics": "/metrics",
             "docs": "/docs"
         }
     }
@@ -3,12 +3,11 @@ from fastapi.responses import JSONResponse
 import jwt
 from jwt.exceptions import InvalidTokenError
 import os
-from dotenv import load_dotenv
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import status
-load_dotenv()
 SECRET_KEY = os.getenv('SECRET_KEY','1234567890')
 ALGORITHM = os.getenv('ALGORITHM','HS256')
+ADMIN_EMAILS = {email.strip().lower() for email in os.getenv('ADMIN_EMAILS', '').split(',') if email.strip()}
 
 credentials_exception = HTTPException(
     status_code=status.HTTP_401_UNAUTHORIZED,
@@ -28,4 +27,14 @@ async def authorise(request: Request):
         raise HTTPException(status_code=401, detail="Invalid token")
     
     
-    
\ No newline at end of file
+    
+
+def is_admin(payload: dict) -> bool:
+    return (payload.get("email") or "").lower() in ADMIN_EMAILS
+
+
+async def authorise_admin(request: Request):
+    payload = await authorise(request)
+    if not is_admin(payload):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return payload
@@ -0,0 +1,138 @@
+import glob
+import os
+import threading
+import zlib
+from typing import Dict, List, Optional
+
+from bson import Binary
+
+try:
+    import zstandard
+except ImportError:  # zlib keeps working, just with a worse ratio
+    zstandard = None
+
+# Shorter strings gain little and cost a round trip through the codec on every read
+MIN_COMPRESS_CHARS = int(os.getenv("COMPRESSION_MIN_CHARS", "512"))
+ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+# Trained dictionaries (*.zdict); the newest compresses, all of them can decompress
+DICT_DIR = os.getenv("COMPRESSION_DICT_DIR", os.path.join(os.path.dirname(__file__), "dictionaries"))
+
+# Course fields holding generated markdown
+INTRODUCTION_FIELDS = ("introduction", "overview")
+
+
+class _Codecs:
+    """zstd compressors/decompressors, built on first use and keyed by dictionary id.
+
+    zstd contexts must not be used by two threads at once, and (de)compression also runs
+    in worker threads (search indexing), so every thread gets its own.
+    """
+
+    def __init__(self):
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.dictionaries: Dict[int, "zstandard.ZstdCompressionDict"] = {}
+        self.current: Optional["zstandard.ZstdCompressionDict"] = None
+        self._local = threading.local()
+
+    def load(self):
+        if self._loaded or zstandard is None:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            paths = sorted(glob.glob(os.path.join(DICT_DIR, "*.zdict")), key=os.path.getmtime)
+            for path in paths:
+                with open(path, "rb") as f:
+                    dictionary = zstandard.ZstdCompressionDict(f.read())
+                self.dictionaries[dictionary.dict_id()] = dictionary
+                self.current = dictionary
+            self._loaded = True
+
+    def compress(self, data: bytes) -> bytes:
+        self.load()
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = self._local.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=self.current)
+        return compressor.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        self.load()
+        dict_id = zstandard.get_frame_parameters(data).dict_id
+        decompressors = getattr(self._local, "decompressors", None)
+        if decompressors is None:
+            decompressors = self._local.decompressors = {}
+        decompressor = decompressors.get(dict_id)
+        if decompressor is None:
+            if dict_id and dict_id not in self.dictionaries:
+                raise ValueError(f"compression dictionary {dict_id} not found in {DICT_DIR}")
+            decompressor = zstandard.ZstdDecompressor(dict_data=self.dictionaries.get(dict_id))
+            decompressors[dict_id] = decompressor
+        return decompressor.decompress(data)
+
+
+_codecs = _Codecs()
+
+
+def is_compressed(value) -> bool:
+    return isinstance(value, dict) and "_z" in value and "b" in value
+
+
+def compress_text(text):
+    """Compressed form of a large string, stored as {"_z": codec, "b": Binary}; other values pass through"""
+    if not isinstance(text, str) or len(text) < MIN_COMPRESS_CHARS:
+        return text
+    raw = text.encode("utf-8")
+    if zstandard is not None:
+        return {"_z": "zstd", "b": Binary(_codecs.compress(raw))}
+    return {"_z": "zlib", "b": Binary(zlib.compress(raw, 6))}
+
+
+def decompress_text(value):
+    """Inverse of compress_text; plain strings (e.g. documents not yet migrated) pass through"""
+    if not is_compressed(value):
+        return value
+    codec = value["_z"]
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("zstandard is required to read zstd compressed course content")
+        return _codecs.decompress(bytes(value["b"])).decode("utf-8")
+    if codec == "zlib":
+        return zlib.decompress(bytes(value["b"])).decode("utf-8")
+    raise ValueError(f"unknown compression codec '{codec}'")
+
+
+def compress_section(section: dict) -> dict:
+    """Compress a stored subtopic section (a SubTopicContent dump)"""
+    if "content" in section:
+        section["content"] = compress_text(section["content"])
+    return section
+
+
+def course_texts(doc: dict) -> List[str]:
+    """The (uncompressed) markdown fields of a course, e.g. as dictionary training samples"""
+    texts = []
+    _map_course(doc, lambda value: texts.append(decompress_text(value)) or value)
+    return [text for text in texts if isinstance(text, str) and text]
+
+
+def _map_course(doc: dict, convert) -> dict:
+    introduction = doc.get("introduction")
+    if isinstance(introduction, dict):
+        for field in INTRODUCTION_FIELDS:
+            if field in introduction:
+                introduction[field] = convert(introduction[field])
+    for section in doc.get("subtopic_contents") or []:
+        if "content" in section:
+            section["content"] = convert(section["content"])
+    return doc
+
+
+def compress_course(doc: dict) -> dict:
+    """Compress the markdown fields of a course document in place before it is written"""
+    return _map_course(doc, compress_text)
+
+
+def decompress_course(doc: dict) -> dict:
+    """Decompress the markdown fields of a course document in place after it is read"""
+    return _map_course(doc, decompress_text)
@@ -0,0 +1,258 @@
+import asyncio
+import heapq
+import html
+import math
+import os
+import re
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from model.compression import decompress_text
+from model.db_connect import db
+
+# Field weights: a query term in the course topic or section title counts like several in the body
+TOPIC_WEIGHT = 3
+TITLE_WEIGHT = 2
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+SNIPPET_CHARS = 200
+MAX_QUERY_TERMS = 16
+# Courses loaded and indexed per worker-thread hop while an index is built or refreshed
+SYNC_BATCH = 25
+
+_TOKEN = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from how in is it of on or that the this to was what when where which with".split()
+)
+_MARKDOWN = re.compile(r"[#*_`|>\[\]]+|-{3,}")
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.casefold()) if token not in _STOPWORDS]
+
+
+class _Section:
+    __slots__ = ("content_id", "position", "subtopic", "topic", "length", "terms")
+
+    def __init__(self, content_id: str, position: int, subtopic: str, topic: str, length: float, terms: Tuple[str, ...]):
+        self.content_id = content_id
+        self.position = position   # -1 for the introduction, else the index in subtopic_contents
+        self.subtopic = subtopic
+        self.topic = topic
+        self.length = length
+        self.terms = terms
+
+
+class UserIndex:
+    """Inverted index over one user's course sections, ranked with BM25.
+
+    Each section (and the course introduction) is a document made of the course topic,
+    the section title and the section body, with the topic and title weighted up. Only
+    postings and lengths are kept; snippets are cut from the hit sections when searched.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, float]] = {}
+        self.sections: Dict[int, _Section] = {}
+        self.courses: Dict[str, Tuple[object, List[int]]] = {}  # content_id -> (version, section ids)
+        self.total_length = 0.0
+        self._next_id = 0
+        self.lock = asyncio.Lock()
+
+    def add_course(self, course: dict, version):
+        content_id = str(course["_id"])
+        self.remove_course(content_id)
+        topic = course.get("topic", "")
+        topic_terms = Counter(tokenize(topic))
+        parts = []
+        introduction = course.get("introduction") or {}
+        if introduction:
+            body = f"{decompress_text(introduction.get('introduction', ''))}\n{decompress_text(introduction.get('overview', ''))}"
+            parts.append((-1, "Introduction", body))
+        for position, section in enumerate(course.get("subtopic_contents") or []):
+            parts.append((position, section.get("subtopic", ""), decompress_text(section.get("content", ""))))
+
+        ids = []
+        for position, title, body in parts:
+            weighted = Counter({term: TOPIC_WEIGHT * count for term, count in topic_terms.items()})
+            for term, count in Counter(tokenize(title)).items():
+                weighted[term] += TITLE_WEIGHT * count
+            weighted.update(tokenize(body))
+            section_id = self._next_id
+            self._next_id += 1
+            length = float(sum(weighted.values()))
+            self.sections[section_id] = _Section(content_id, position, title, topic, length, tuple(weighted))
+            self.total_length += length
+            for term, weight in weighted.items():
+                self.postings.setdefault(term, {})[section_id] = weight
+            ids.append(section_id)
+        self.courses[content_id] = (version, ids)
+
+    def add_courses(self, courses: List[dict]):
+        for course in courses:
+            self.add_course(course, course.get("content_updated_at"))
+
+    def remove_course(self, content_id: str):
+        _, ids = self.courses.pop(content_id, (None, []))
+        for section_id in ids:
+            section = self.sections.pop(section_id)
+            self.total_length -= section.length
+            for term in section.terms:
+                posting = self.postings[term]
+                del posting[section_id]
+                if not posting:
+                    del self.postings[term]
+
+    def search(self, terms: List[str], limit: int) -> Tuple[List[Tuple[float, _Section]], int]:
+        """Top `limit` sections for the query terms and the number of sections matching any term"""
+        count = len(self.sections)
+        if not count:
+            return [], 0
+        average_length = self.total_length / count
+        scores: Dict[int, float] = {}
+        for term in set(terms):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for section_id, tf in posting.items():
+                length = self.sections[section_id].length
+                norm = tf + K1 * (1 - B + B * length / average_length)
+                scores[section_id] = scores.get(section_id, 0.0) + idf * tf * (K1 + 1) / norm
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [(score, self.sections[section_id]) for section_id, score in top], len(scores)
+
+
+def highlight(text: str, terms: List[str], width: int = SNIPPET_CHARS) -> str:
+    """The window of `text` with the most query terms, with matches wrapped in <mark>.
+
+    The text is generated from scraped pages, so it is HTML-escaped; <mark> is the only markup.
+    """
+    text = re.sub(r"\s+", " ", _MARKDOWN.sub(" ", text)).strip()
+    wanted = set(terms)
+    matches = [m for m in _TOKEN.finditer(text) if m.group().casefold() in wanted]
+    if not matches:
+        return html.escape(text[:width]) + ("..." if len(text) > width else "")
+
+    # Slide over the matches for the window of `width` chars holding the most of them
+    best_start, best_count, j = matches[0].start(), 0, 0
+    for i, match in enumerate(matches):
+        while matches[j].start() < match.end() - width:
+            j += 1
+        if i - j + 1 > best_count:
+            best_count, best_start = i - j + 1, matches[j].start()
+    start = max(0, min(best_start - width // 4, len(text) - width))
+    end = min(len(text), start + width)
+    # Whole words only
+    if start > 0:
+        start = text.find(" ", start) + 1 or start
+    if end < len(text):
+        cut = text.rfind(" ", start, end)
+        end = cut if cut > start else end
+
+    pieces, cursor = [], start
+    for match in matches:
+        if match.start() < start or match.end() > end:
+            continue
+        pieces.append(html.escape(text[cursor:match.start()]))
+        pieces.append(f"<mark>{html.escape(match.group())}</mark>")
+        cursor = match.end()
+    pieces.append(html.escape(text[cursor:end]))
+    return ("..." if start > 0 else "") + "".join(pieces) + ("..." if end < len(text) else "")
+
+
+class CourseSearch:
+    """Per-user search indexes kept in this process.
+
+    A user's index is built on their first search and then brought up to date on every
+    search: one small query lists the user's generated courses with their
+    `content_updated_at` marker, and only courses that are new or changed since they were
+    indexed are loaded and re-indexed (deleted ones are dropped). Writes from other pods
+    are therefore picked up too. Decompressing and tokenizing happens in a worker thread,
+    `SYNC_BATCH` courses at a time, so building a large index does not stall the event
+    loop; the index lock keeps searches of that user out meanwhile. Indexes of the least
+    recently searching users are evicted beyond `max_users`.
+    """
+
+    def __init__(self, max_users: Optional[int] = None):
+        self.max_users = max_users or int(os.getenv("SEARCH_INDEX_USERS", "500"))
+        self._indexes: "OrderedDict[str, UserIndex]" = OrderedDict()
+        # Indexing threads compete with the event loop for the GIL; a couple at a time is plenty
+        self._indexing = asyncio.Semaphore(int(os.getenv("SEARCH_INDEX_THREADS", "2")))
+
+    def _index_for(self, user_id: str) -> UserIndex:
+        index = self._indexes.get(user_id)
+        if index is None:
+            index = self._indexes[user_id] = UserIndex()
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+        self._indexes.move_to_end(user_id)
+        return index
+
+    async def _sync(self, user_id: str, index: UserIndex):
+        courses = db['course_content']
+        markers = await courses.find(
+            {"user_id": ObjectId(user_id), "content_loaded": True},
+            projection={"_id": 1, "content_updated_at": 1}
+        ).to_list(length=None)
+        current = {str(doc["_id"]): doc.get("content_updated_at") for doc in markers}
+        for content_id in [cid for cid in index.courses if cid not in current]:
+            index.remove_course(content_id)
+        changed = [cid for cid, version in current.items() if cid not in index.courses or index.courses[cid][0] != version]
+        if not changed:
+            return
+        projection = {"topic": 1, "introduction.introduction": 1, "introduction.overview": 1,
+                      "subtopic_contents.subtopic": 1, "subtopic_contents.content": 1, "content_updated_at": 1}
+        for start in range(0, len(changed), SYNC_BATCH):
+            batch = [ObjectId(cid) for cid in changed[start:start + SYNC_BATCH]]
+            loaded = await courses.find({"_id": {"$in": batch}}, projection=projection).to_list(length=None)
+            async with self._indexing:
+                await asyncio.to_thread(index.add_courses, loaded)
+
+    async def search(self, user_id: str, query: str, limit: int = 20) -> Dict[str, object]:
+        terms = tokenize(query)[:MAX_QUERY_TERMS]
+        if not terms:
+            return {"hits": [], "total": 0}
+        index = self._index_for(user_id)
+        async with index.lock:
+            await self._sync(user_id, index)
+            ranked, total = index.search(terms, limit)
+
+        # Snippets come from the hit sections only
+        content_ids = list({section.content_id for _, section in ranked})
+        bodies: Dict[Tuple[str, int], str] = {}
+        if content_ids:
+            async for course in db['course_content'].find(
+                {"_id": {"$in": [ObjectId(cid) for cid in content_ids]}},
+                projection={"introduction.introduction": 1, "introduction.overview": 1, "subtopic_contents.content": 1}
+            ):
+                cid = str(course["_id"])
+                introduction = course.get("introduction") or {}
+                bodies[(cid, -1)] = f"{decompress_text(introduction.get('introduction', ''))} {decompress_text(introduction.get('overview', ''))}"
+                for position, section in enumerate(course.get("subtopic_contents") or []):
+                    bodies[(cid, position)] = decompress_text(section.get("content", ""))
+
+        hits = [
+            {
+                "content_id": section.content_id,
+                "topic": section.topic,
+                "subtopic": section.subtopic,
+                "section_index": section.position,
+                "score": round(score, 4),
+                "snippet": highlight(bodies.get((section.content_id, section.position), ""), terms),
+            }
+            for score, section in ranked
+        ]
+        return {"hits": hits, "total": total}
+
+    def usage(self) -> Dict[str, int]:
+        return {
+            "users": len(self._indexes),
+            "sections": sum(len(index.sections) for index in self._indexes.values()),
+            "terms": sum(len(index.postings) for index in self._indexes.values()),
+        }
+
+
+course_search = CourseSearch()
@@ -0,0 +1,169 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional
+
+from bson import ObjectId
+from LearningAssistant.models import GenerationStatus, ResearchSnapshot
+from model.db_connect import db
+
+# A generation only moves forward through these; a final status is never replaced
+STATUS_ORDER = [
+    GenerationStatus.QUEUED,
+    GenerationStatus.DRAFT,
+    GenerationStatus.DESIGNING,
+    GenerationStatus.RESEARCHING,
+    GenerationStatus.GENERATING,
+]
+IN_PROGRESS_STATUSES = [status.value for status in STATUS_ORDER]
+STATUS_WRITE_ATTEMPTS = 3
+# Statuses written before the state machine existed
+LEGACY_STATUSES = {"completed": GenerationStatus.DONE.value, "running": GenerationStatus.GENERATING.value}
+
+
+def normalize_status(status: Optional[str], content_loaded: bool = False) -> str:
+    if not status:
+        return GenerationStatus.DONE.value if content_loaded else GenerationStatus.QUEUED.value
+    return LEGACY_STATUSES.get(status, status)
+
+
+async def set_generation_status(content_id: str, status: GenerationStatus, fields: Optional[dict] = None) -> bool:
+    """Move a course to `status`, stamping when it got there, together with any other `fields`.
+
+    The filter only matches courses in an earlier status, so late or repeated writes (e.g.
+    a stage finishing after a cancel) change nothing. Returns whether the course moved.
+    """
+    if status in STATUS_ORDER:
+        earlier = [s.value for s in STATUS_ORDER[:STATUS_ORDER.index(status)]]
+    else:
+        earlier = IN_PROGRESS_STATUSES + ["running"]
+    update = {"$set": {
+        "status": status.value,
+        f"status_times.{status.value}": datetime.now(timezone.utc),
+        **(fields or {}),
+    }}
+    # The write is idempotent, so transient database errors are retried
+    for attempt in range(STATUS_WRITE_ATTEMPTS):
+        try:
+            result = await db['course_content'].update_one({"_id": ObjectId(content_id), "status": {"$in": earlier}}, update)
+            return result.modified_count > 0
+        except Exception as e:
+            if attempt == STATUS_WRITE_ATTEMPTS - 1:
+                raise
+            print(f"Retrying status write for course {content_id}: {e}")
+            await asyncio.sleep(0.5 * 2 ** attempt)
+
+
+async def record_section_generated(content_id: str):
+    await db['course_content'].update_one(
+        {"_id": ObjectId(content_id)}, {"$inc": {"generation_progress.completed": 1}}
+    )
+
+
+async def load_course_research(content_id: str):
+    """Research stored for a course, if any"""
+    doc = await db['course_research'].find_one({"content_id": ObjectId(content_id)}, projection={"_id": 0, "content_id": 0})
+    return ResearchSnapshot(**doc) if doc else None
+
+
+async def save_course_research(content_id: str, research: ResearchSnapshot):
+    await db['course_research'].replace_one(
+        {"content_id": ObjectId(content_id)},
+        {"content_id": ObjectId(content_id), **research.model_dump()},
+        upsert=True
+    )
+
+
+async def save_course_timings(content_id: str, timings: dict):
+    """Span and fetch breakdown of a course's latest generation, kept out of the course document"""
+    await db['course_timings'].replace_one(
+        {"content_id": ObjectId(content_id)},
+        {"content_id": ObjectId(content_id), **timings},
+        upsert=True
+    )
+
+
+# Reading speed behind estimated_reading_time
+WORDS_PER_MINUTE = 200
+
+
+def _sections(condition=None):
+    """Subtopic sections of a course in aggregation expressions, optionally filtered"""
+    sections = {"$ifNull": ["$subtopic_contents", []]}
+    if condition is None:
+        return sections
+    return {"$filter": {"input": sections, "as": "section", "cond": condition}}
+
+
+async def list_course_progress(user_id: str, skip: int = 0, limit: int = 20):
+    """Per-course progress for a user, newest first, computed in Mongo so section bodies stay there.
+
+    Courses carry `progress` counters (sections, read) maintained on every write; courses
+    stored before the counters existed are counted from their sections instead.
+    """
+    unread = {"$not": ["$$section.read"]}
+    pipeline = [
+        {"$match": {"user_id": ObjectId(user_id)}},
+        {"$sort": {"_id": -1}},
+        {"$facet": {
+            "items": [
+                {"$skip": skip},
+                {"$limit": limit},
+                {"$project": {
+                    "_id": 1,
+                    "topic": 1,
+                    "difficulty": 1,
+                    "status": {"$ifNull": ["$status", {"$cond": ["$content_loaded", "done", "queued"]}]},
+                    "total_sections": {"$ifNull": ["$progress.sections", {"$size": _sections()}]},
+                    "sections_read": {"$cond": [
+                        {"$ifNull": ["$progress.sections", False]},
+                        {"$ifNull": ["$progress.read", 0]},
+                        {"$size": _sections("$$section.read")},
+                    ]},
+                    "remaining_words": {"$sum": {"$map": {
+                        "input": _sections(unread), "as": "section", "in": "$$section.word_count"
+                    }}},
+                }},
+                {"$addFields": {
+                    # Rounded up, so a course with unread sections never shows 0 minutes left
+                    "remaining_reading_time": {"$ceil": {"$divide": ["$remaining_words", WORDS_PER_MINUTE]}},
+                }},
+                {"$project": {"remaining_words": 0}},
+            ],
+            "total": [{"$count": "count"}],
+        }},
+    ]
+    result = await db['course_content'].aggregate(pipeline).to_list(length=1)
+    facet = result[0] if result else {"items": [], "total": []}
+    total = facet["total"][0]["count"] if facet["total"] else 0
+    for item in facet["items"]:
+        item["status"] = normalize_status(item["status"])
+    return facet["items"], total
+
+
+async def popular_subtopics(limit: int = 50, history: int = 5000):
+    """The most requested (topic, subtopic) pairs among the last `history` course requests.
+
+    Pairs are counted case-insensitively and returned most requested first, spelled as
+    they were first seen, as {"topic", "subtopic", "count"}. Only `requested_sub_topics`
+    is counted: `sub_topics` is replaced by the designed outline once a course is generated.
+    """
+    pipeline = [
+        {"$match": {"requested_sub_topics": {"$exists": True}}},
+        {"$sort": {"_id": -1}},
+        {"$limit": history},
+        {"$project": {"topic": 1, "requested_sub_topics": 1}},
+        {"$unwind": "$requested_sub_topics"},
+        {"$group": {
+            "_id": {
+                "topic": {"$toLower": {"$trim": {"input": "$topic"}}},
+                "subtopic": {"$toLower": {"$trim": {"input": "$requested_sub_topics"}}},
+            },
+            "topic": {"$first": "$topic"},
+            "subtopic": {"$first": "$requested_sub_topics"},
+            "count": {"$sum": 1},
+        }},
+        {"$sort": {"count": -1}},
+        {"$limit": limit},
+        {"$project": {"_id": 0, "topic": 1, "subtopic": 1, "count": 1}},
+    ]
+    return await db['course_content'].aggregate(pipeline).to_list(length=limit)
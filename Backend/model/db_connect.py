@@ -1,11 +1,59 @@
-from motor.motor_asyncio import AsyncIOMotorClient
-from dotenv import load_dotenv
+import asyncio
 import os
-load_dotenv()
 
-MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
+DB_NAME = "CourseGen"
 
-client = AsyncIOMotorClient(MONGO_URL)
-db = client["CourseGen"]
+# The Motor client is created on first use rather than at import time, so importing the
+# app stays cheap and nothing connects before the process is actually serving
+_client = None
+_database_override = None
 
-print("db connected")
+
+def get_client():
+    global _client
+    if _client is None:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        _client = AsyncIOMotorClient(os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+    return _client
+
+
+def get_db():
+    if _database_override is not None:
+        return _database_override
+    return get_client()[DB_NAME]
+
+
+def set_database(database):
+    """Point `db` at another database object (e.g. an in-memory stand-in); None restores Mongo"""
+    global _database_override
+    _database_override = database
+
+
+async def ping(timeout: float = 2.0) -> bool:
+    """True if the database answers within `timeout` seconds"""
+    try:
+        await asyncio.wait_for(get_db().command("ping"), timeout=timeout)
+        return True
+    except Exception as e:
+        print(f"Database ping failed: {str(e)}")
+        return False
+
+
+def close_client():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+class _LazyDatabase:
+    """Stands in for the Motor database so `db['collection']` keeps working everywhere"""
+
+    def __getitem__(self, name):
+        return get_db()[name]
+
+    def __getattr__(self, name):
+        return getattr(get_db(), name)
+
+
+db = _LazyDatabase()
@@ -0,0 +1,75 @@
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Buckets cover everything from a cache hit to a multi-minute course
+_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+SPAN_DURATION = Histogram(
+    "coursegen_span_duration_seconds",
+    "Duration of pipeline stages and external calls",
+    ["span", "outcome"],
+    buckets=_BUCKETS,
+)
+COURSE_DURATION = Histogram(
+    "coursegen_course_duration_seconds",
+    "End-to-end duration of a course generation",
+    ["outcome"],
+    buckets=_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "coursegen_llm_tokens_total",
+    "Tokens sent to / received from the LLM",
+    ["call", "direction"],
+)
+LLM_FAILOVERS = Counter(
+    "coursegen_llm_failovers_total",
+    "LLM attempts that failed or timed out and moved on to the next model",
+    ["call", "model"],
+)
+FETCH_OUTCOMES = Counter(
+    "coursegen_fetch_outcomes_total",
+    "Per-URL fetch and extraction outcomes",
+    ["outcome"],
+)
+
+FETCH_BYTES = Counter(
+    "coursegen_fetch_bytes_total",
+    "Bytes downloaded while fetching pages",
+)
+FETCH_KEPT_CHARS = Counter(
+    "coursegen_fetch_kept_chars_total",
+    "Characters of extracted content kept from fetched pages",
+)
+RESEARCH_BYTES = Gauge(
+    "coursegen_research_bytes",
+    "Research passages held by running generations, in memory or spilled to disk",
+    ["location"],
+)
+SEARCH_QUERIES = Counter(
+    "coursegen_search_queries_total",
+    "Research search queries issued, templated or reformulated",
+    ["scope", "kind"],
+)
+QUERY_PLAN_STOPS = Counter(
+    "coursegen_query_plan_stops_total",
+    "Why research of a topic or subtopic stopped searching",
+    ["scope", "reason"],
+)
+CACHE_LOOKUPS = Counter(
+    "coursegen_cache_lookups_total",
+    "Search and page content cache lookups",
+    ["cache", "outcome"],
+)
+CACHE_BYTES = Gauge(
+    "coursegen_cache_bytes",
+    "Bytes held by the search and page content caches",
+    ["cache"],
+)
+CACHE_WARMED = Counter(
+    "coursegen_cache_warmed_total",
+    "(topic, subtopic) pairs researched ahead of demand by the cache warmer",
+)
+
+
+def render_latest() -> tuple[bytes, str]:
+    """Prometheus text exposition of the default registry"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,189 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+# Top-level stages that get an allocation snapshot; other spans (and per-subtopic ones,
+# which carry attributes) only mark their task as part of the job
+SNAPSHOT_STAGES = ("design", "research", "design_research", "generation")
+MAX_STACK_DEPTH = 64
+
+_tracemalloc_users = 0
+_tracemalloc_lock = threading.Lock()
+
+
+def _start_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+        _tracemalloc_users += 1
+
+
+def _stop_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _is_idle_worker(frame) -> bool:
+    """A thread pool worker waiting for its next work item"""
+    return frame.f_code.co_name == "_worker" and frame.f_code.co_filename.endswith("thread.py")
+
+
+class JobProfile:
+    """Sampling CPU profile and per-stage allocation snapshots of one generation.
+
+    A sampler thread reads every thread's stack each `interval` seconds. Event-loop
+    samples count only while a task of this job is running (tasks join the job when they
+    open a tracing span); busy thread-pool workers are counted separately since they are
+    shared with other jobs, as is tracemalloc, which traces the whole process.
+    """
+
+    def __init__(self, interval: float = 0.005, trace_allocations: bool = True, top: int = 25):
+        self.interval = interval
+        self.trace_allocations = trace_allocations
+        self.top = top
+        self.tasks = set()
+        self.loop_stacks: Counter = Counter()
+        self.worker_stacks: Counter = Counter()
+        self.samples = {"job": 0, "other_tasks": 0, "idle": 0, "workers": 0}
+        self.stages: List[Dict[str, Any]] = []
+        self._open_stages: Dict[tuple, tuple] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+        self._duration = 0.0
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self.register_current_task()
+        if self.trace_allocations:
+            _start_tracemalloc()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample, name="job-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._duration = time.perf_counter() - self._started
+        if self.trace_allocations:
+            _stop_tracemalloc()
+
+    def register_current_task(self):
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            return
+        if task is not None:
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    def _snapshots(self, name: str, attrs: Dict[str, Any]) -> bool:
+        return name in SNAPSHOT_STAGES and not attrs and self.trace_allocations and tracemalloc.is_tracing()
+
+    def enter_span(self, name: str, attrs: Dict[str, Any]):
+        self.register_current_task()
+        if self._snapshots(name, attrs):
+            tracemalloc.reset_peak()
+            self._open_stages[(name, id(asyncio.current_task()))] = (time.perf_counter(), tracemalloc.take_snapshot())
+
+    def exit_span(self, name: str):
+        if not self._open_stages:
+            return
+        opened = self._open_stages.pop((name, id(asyncio.current_task())), None)
+        if opened is None:
+            return
+        started, before = opened
+        if not tracemalloc.is_tracing():
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        growth = tracemalloc.take_snapshot().compare_to(before, "lineno")
+        self.stages.append({
+            "name": name,
+            "duration": round(time.perf_counter() - started, 4),
+            "traced_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "top_allocations": [
+                {"where": str(stat.traceback[0]), "size_kb": round(stat.size_diff / 1024, 1), "count": stat.count_diff}
+                for stat in growth[:self.top] if stat.size_diff > 0
+            ],
+        })
+
+    def _sample(self):
+        me = threading.get_ident()
+        worker_names = {t.ident: t.name for t in threading.enumerate()}
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == me:
+                    continue
+                if ident == self._loop_thread:
+                    task = asyncio.current_task(self._loop)
+                    if task is None:
+                        self.samples["idle"] += 1
+                    elif task in self.tasks:
+                        self.samples["job"] += 1
+                        self.loop_stacks[self._collapse(frame)] += 1
+                    else:
+                        self.samples["other_tasks"] += 1
+                    continue
+                if ident not in worker_names:
+                    worker_names = {t.ident: t.name for t in threading.enumerate()}
+                if worker_names.get(ident, "").startswith("asyncio_") and not _is_idle_worker(frame):
+                    self.samples["workers"] += 1
+                    self.worker_stacks[self._collapse(frame)] += 1
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        names = []
+        while frame is not None and len(names) < MAX_STACK_DEPTH:
+            names.append(_frame_name(frame))
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def _top_functions(self, stacks: Counter) -> List[Dict[str, Any]]:
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in stacks.items():
+            names = stack.split(";")
+            own[names[-1]] += count
+            for name in set(names):
+                total[name] += count
+        return [
+            {"function": name, "self": count, "total": total[name]}
+            for name, count in own.most_common(self.top)
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        """Stored artifact; stacks are in collapsed format (`a;b;c count`) for flame graph tools"""
+        return {
+            "interval": self.interval,
+            "duration": round(self._duration, 4),
+            "samples": self.samples,
+            "loop": {
+                "top_functions": self._top_functions(self.loop_stacks),
+                "stacks": [f"{stack} {count}" for stack, count in self.loop_stacks.most_common(200)],
+            },
+            "workers": {
+                "top_functions": self._top_functions(self.worker_stacks),
+                "stacks": [f"{stack} {count}" for stack, count in self.worker_stacks.most_common(200)],
+            },
+            "stages": self.stages,
+        }
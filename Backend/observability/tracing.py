@@ -0,0 +1,136 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from .metrics import FETCH_BYTES, FETCH_KEPT_CHARS, FETCH_OUTCOMES, LLM_TOKENS, SPAN_DURATION
+
+_current_trace: ContextVar[Optional["CourseTrace"]] = ContextVar("course_trace", default=None)
+
+
+class CourseTrace:
+    """Collects the spans, LLM token counts and fetch outcomes of one course generation.
+
+    The trace lives in a ContextVar, so tasks spawned by asyncio.gather and threads started
+    with asyncio.to_thread record into the same trace as the request that started them.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self._origin = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.fetches: List[Dict[str, Any]] = []
+        self.tokens: Dict[str, Dict[str, int]] = {}
+        # JobProfile of an admin-requested profiled run; None for every other generation
+        self.profile = None
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._origin
+
+    def add_span(self, name: str, start: float, duration: float, outcome: str, attrs: Dict[str, Any]):
+        self.spans.append({
+            "name": name,
+            "start": round(start - self._origin, 4),
+            "duration": round(duration, 4),
+            "outcome": outcome,
+            **attrs,
+        })
+
+    def add_tokens(self, call: str, prompt_tokens: int, response_tokens: int, cached_tokens: int = 0):
+        totals = self.tokens.setdefault(call, {"prompt": 0, "response": 0, "cached": 0})
+        totals["prompt"] += prompt_tokens
+        totals["response"] += response_tokens
+        totals["cached"] += cached_tokens
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-course breakdown persisted alongside the course document"""
+        stages: Dict[str, Dict[str, float]] = {}
+        for span in self.spans:
+            stage = stages.setdefault(span["name"], {"count": 0, "total": 0.0, "max": 0.0})
+            stage["count"] += 1
+            stage["total"] = round(stage["total"] + span["duration"], 4)
+            stage["max"] = max(stage["max"], span["duration"])
+        return {
+            "started_at": self.started_at.isoformat(),
+            "total_seconds": round(self.elapsed(), 4),
+            "stages": stages,
+            "spans": self.spans,
+            "fetches": self.fetches,
+            "tokens": self.tokens,
+        }
+
+
+@contextmanager
+def start_trace():
+    """Start a new trace for the current context"""
+    trace = CourseTrace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def current_trace() -> Optional[CourseTrace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a block; always feeds the histogram and, inside a trace, the course breakdown.
+
+    Extra attributes can be attached while the span is open through the yielded dict.
+    """
+    trace = _current_trace.get()
+    profile = trace.profile if trace is not None else None
+    if profile is not None:
+        profile.enter_span(name, attrs)
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield attrs
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        SPAN_DURATION.labels(span=name, outcome=outcome).observe(duration)
+        if trace is not None:
+            trace.add_span(name, start, duration, outcome, attrs)
+        if profile is not None:
+            profile.exit_span(name)
+
+
+def record_llm_usage(call: str, response):
+    """Record prompt/response token counts from a genai response, when it reports them.
+
+    Prompt tokens include those served from a context cache, which are also counted as cached.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", None) or 0
+    response_tokens = getattr(usage, "candidates_token_count", None) or 0
+    cached_tokens = getattr(usage, "cached_content_token_count", None) or 0
+    LLM_TOKENS.labels(call=call, direction="prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels(call=call, direction="response").inc(response_tokens)
+    LLM_TOKENS.labels(call=call, direction="cached").inc(cached_tokens)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_tokens(call, prompt_tokens, response_tokens, cached_tokens)
+    return prompt_tokens, response_tokens
+
+
+def record_fetch(url: str, outcome: str, duration: float, chars: int = 0, downloaded: int = 0):
+    """Record the outcome of fetching and extracting a single URL, with bytes downloaded vs characters kept"""
+    FETCH_OUTCOMES.labels(outcome=outcome).inc()
+    FETCH_BYTES.inc(downloaded)
+    FETCH_KEPT_CHARS.inc(chars)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.fetches.append({
+            "url": url,
+            "outcome": outcome,
+            "duration": round(duration, 4),
+            "bytes": downloaded,
+            "chars": chars,
+        })
@@ -0,0 +1,265 @@
+"""Generate courses in bulk from a JSONL file of LearningRequest records.
+
+Each line is a LearningRequest (topic, sub_topics, difficulty, language) with an
+optional "id". Requests are streamed from the file, run through LearningService with
+bounded concurrency and a start-rate limit, and written to Mongo or a JSONL file.
+Finished requests are appended to a checkpoint file, so an interrupted run picks up
+where it stopped when started again with the same arguments:
+
+    cd Backend
+    python -m scripts.bulk_generate catalogue.jsonl --output mongo --user-id <catalogue owner>
+    python -m scripts.bulk_generate catalogue.jsonl --output courses.jsonl --concurrency 4 --rate 10
+"""
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, Optional, Set, Tuple
+
+from bson import ObjectId
+from pydantic import ValidationError
+
+from LearningAssistant.learning_service import LearningService
+from LearningAssistant.models import LearningRequest, LearningResponse
+from LearningAssistant.singleflight import request_fingerprint
+from observability.tracing import start_trace
+
+
+class RateLimiter:
+    """Spaces out job starts to at most `per_minute` per minute (0 disables)"""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            delay = self._next_start - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_start = max(self._next_start, loop.time()) + self.interval
+
+
+class Checkpoint:
+    """Append-only record of finished requests; failed ones are retried on the next run"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.completed: Set[str] = set()
+        try:
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        if entry.get("status") == "ok":
+                            self.completed.add(entry["key"])
+        except FileNotFoundError:
+            pass
+        self._file = open(path, "a")
+
+    def record(self, key: str, status: str, **details):
+        # Flushed per line so a killed run loses at most the courses still in flight
+        self._file.write(json.dumps({"key": key, "status": status, **details}) + "\n")
+        self._file.flush()
+        if status == "ok":
+            self.completed.add(key)
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlSink:
+    def __init__(self, path: str):
+        self._file = open(path, "a")
+
+    async def write(self, key: str, request: LearningRequest, response: LearningResponse, timings: dict):
+        record = {
+            "key": key,
+            "request": request.model_dump(mode="json"),
+            "course": response.model_dump(mode="json"),
+            "research": response.research.model_dump() if response.research else None,
+            "timings": timings,
+        }
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    async def close(self):
+        self._file.close()
+
+
+class MongoSink:
+    """Stores courses the way the API does, owned by `user_id`"""
+
+    def __init__(self, user_id: str):
+        self.user_id = ObjectId(user_id)
+
+    async def write(self, key: str, request: LearningRequest, response: LearningResponse, timings: dict):
+        from model.db_connect import db
+        from model.course_store import save_course_research, save_course_timings
+        from model.compression import compress_course
+
+        content = await db['course_content'].insert_one({
+            "user_id": self.user_id,
+            "language": request.language or "english",
+            "content_loaded": True,
+            "status": "done",
+            "status_times": {"done": datetime.now(timezone.utc)},
+            **compress_course(response.model_dump()),
+            "progress": {"sections": len(response.subtopic_contents), "read": 0},
+            "content_updated_at": datetime.now(timezone.utc),
+            "fingerprint": key,
+            "bulk": True,
+        })
+        await save_course_timings(str(content.inserted_id), timings)
+        if response.research:
+            await save_course_research(str(content.inserted_id), response.research)
+
+    async def close(self):
+        from model.db_connect import close_client
+        close_client()
+
+
+async def read_requests(path: str) -> AsyncIterator[Tuple[int, Optional[str], Optional[LearningRequest], Optional[str]]]:
+    """Yield (line number, id, request, error) one line at a time"""
+    with open(path) as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                record_id = record.pop("id", None)
+                yield line_number, record_id, LearningRequest(**record), None
+            except (json.JSONDecodeError, ValidationError, TypeError) as e:
+                yield line_number, None, None, str(e)
+            # Let workers pick up jobs between lines
+            await asyncio.sleep(0)
+
+
+class Stats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.ok = 0
+        self.failed = 0
+        self.skipped = 0
+        self.invalid = 0
+        self.durations = []
+        self.tokens = {"prompt": 0, "response": 0}
+
+    def summary(self) -> Dict[str, float]:
+        elapsed = time.perf_counter() - self.started
+        durations = sorted(self.durations)
+        return {
+            "ok": self.ok,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "invalid": self.invalid,
+            "elapsed_seconds": round(elapsed, 1),
+            "courses_per_minute": round(self.ok / elapsed * 60, 2) if elapsed else 0.0,
+            "p50_seconds": round(statistics.median(durations), 1) if durations else None,
+            "p95_seconds": round(durations[int(0.95 * (len(durations) - 1))], 1) if durations else None,
+            "prompt_tokens": self.tokens["prompt"],
+            "response_tokens": self.tokens["response"],
+        }
+
+
+async def run(args, service: LearningService, sink, stats: Stats):
+    checkpoint = Checkpoint(args.checkpoint or f"{args.input}.checkpoint")
+    limiter = RateLimiter(args.rate)
+    # Bounded so the file is read only as fast as courses are generated
+    queue: asyncio.Queue = asyncio.Queue(maxsize=args.concurrency * 2)
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            key, request = item
+            await limiter.wait()
+            with start_trace() as trace:
+                try:
+                    response = await service.create_learning_content(request)
+                    timings = trace.summary()
+                    await sink.write(key, request, response, timings)
+                except Exception as e:
+                    stats.failed += 1
+                    checkpoint.record(key, "failed", topic=request.topic, error=str(e))
+                    print(f"[failed] {request.topic}: {str(e)}")
+                    continue
+            stats.ok += 1
+            stats.durations.append(trace.elapsed())
+            for totals in trace.tokens.values():
+                stats.tokens["prompt"] += totals["prompt"]
+                stats.tokens["response"] += totals["response"]
+            checkpoint.record(key, "ok", topic=request.topic, seconds=round(trace.elapsed(), 1))
+            print(f"[ok] {request.topic} in {trace.elapsed():.1f}s ({stats.ok} done)")
+
+    workers = [asyncio.create_task(worker()) for _ in range(args.concurrency)]
+    try:
+        seen: Set[str] = set()
+        async for line_number, record_id, request, error in read_requests(args.input):
+            if error:
+                stats.invalid += 1
+                print(f"[invalid] line {line_number}: {error}")
+                continue
+            key = record_id or request_fingerprint(request)
+            if key in checkpoint.completed or key in seen:
+                stats.skipped += 1
+                continue
+            seen.add(key)
+            if args.limit and len(seen) > args.limit:
+                break
+            await queue.put((key, request))
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+        checkpoint.close()
+
+
+async def main(args) -> int:
+    if args.output == "mongo" and not args.user_id:
+        print("--user-id is required when writing to Mongo")
+        return 2
+
+    service = LearningService.from_env()
+    sink = MongoSink(args.user_id) if args.output == "mongo" else JsonlSink(args.output)
+    stats = Stats()
+    try:
+        await run(args, service, sink, stats)
+    finally:
+        await service.aclose()
+        await sink.close()
+        print(json.dumps(stats.summary(), indent=2))
+    return 1 if stats.failed else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Generate courses from a JSONL file of LearningRequest records")
+    parser.add_argument("input", help="JSONL file, one LearningRequest per line")
+    parser.add_argument("--output", default="mongo", help="'mongo' or a JSONL file to append courses to")
+    parser.add_argument("--user-id", help="account that owns the courses when writing to Mongo")
+    parser.add_argument("--concurrency", type=int, default=2, help="courses generated at the same time")
+    parser.add_argument("--rate", type=float, default=0, help="max courses started per minute (0 = no limit)")
+    parser.add_argument("--checkpoint", help="progress file (default: <input>.checkpoint)")
+    parser.add_argument("--limit", type=int, default=0, help="stop after this many new requests")
+    return parser
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(asyncio.run(main(build_parser().parse_args())))
+    except KeyboardInterrupt:
+        print("Interrupted; rerun the same command to resume from the checkpoint")
+        sys.exit(130)
@@ -0,0 +1,95 @@
+"""Compress (or, with --decompress, expand) the markdown of existing courses in place.
+
+Courses written before compression was introduced keep plain strings; the API reads
+both forms, so this can run while the app is serving:
+
+    cd Backend
+    python -m scripts.compress_courses --dry-run
+    python -m scripts.compress_courses --batch-size 200
+"""
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import asyncio
+import sys
+from typing import Dict
+
+import bson
+
+from model.compression import INTRODUCTION_FIELDS, compress_text, decompress_text
+
+
+def field_updates(doc: dict, convert) -> Dict[str, object]:
+    """Dotted paths of the markdown fields whose stored form changes"""
+    updates = {}
+    introduction = doc.get("introduction") or {}
+    for field in INTRODUCTION_FIELDS:
+        if field in introduction:
+            value = convert(introduction[field])
+            if value is not introduction[field]:
+                updates[f"introduction.{field}"] = value
+    for i, section in enumerate(doc.get("subtopic_contents") or []):
+        if "content" in section:
+            value = convert(section["content"])
+            if value is not section["content"]:
+                updates[f"subtopic_contents.{i}.content"] = value
+    return updates
+
+
+async def migrate(args) -> Dict[str, int]:
+    from model.db_connect import db
+    convert = decompress_text if args.decompress else compress_text
+    totals = {"documents": 0, "updated": 0, "skipped": 0, "bytes_before": 0, "bytes_after": 0}
+
+    cursor = db['course_content'].find(
+        {"content_loaded": True},
+        projection={"introduction": 1, "subtopic_contents.content": 1, "total_word_count": 1},
+        batch_size=args.batch_size
+    )
+    async for doc in cursor:
+        totals["documents"] += 1
+        before = len(bson.encode(doc))
+        updates = field_updates(doc, convert)
+        if not updates:
+            totals["bytes_before"] += before
+            totals["bytes_after"] += before
+            continue
+        for path, value in updates.items():
+            section, _, field = path.rpartition(".")
+            target = doc
+            for part in section.split("."):
+                target = target[int(part)] if part.isdigit() else target[part]
+            target[field] = value
+        totals["bytes_before"] += before
+        totals["bytes_after"] += len(bson.encode(doc))
+        if args.dry_run:
+            continue
+        # Sections are addressed by position, so skip courses whose sections changed meanwhile
+        result = await db['course_content'].update_one(
+            {"_id": doc["_id"], "total_word_count": doc.get("total_word_count")},
+            {"$set": updates}
+        )
+        totals["updated" if result.modified_count else "skipped"] += 1
+    return totals
+
+
+async def main(args) -> int:
+    from model.db_connect import close_client
+    try:
+        totals = await migrate(args)
+    finally:
+        close_client()
+    ratio = totals["bytes_before"] / totals["bytes_after"] if totals["bytes_after"] else 0
+    print(f"{totals['documents']} courses, {totals['updated']} updated, {totals['skipped']} changed during migration "
+          f"(rerun to pick them up); {totals['bytes_before']} -> {totals['bytes_after']} bytes ({ratio:.2f}x)"
+          + (" [dry run]" if args.dry_run else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate stored course markdown to or from compressed form")
+    parser.add_argument("--decompress", action="store_true", help="expand compressed fields back to plain strings")
+    parser.add_argument("--dry-run", action="store_true", help="report the size change without writing")
+    parser.add_argument("--batch-size", type=int, default=100)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,80 @@
+"""Train a zstd dictionary for course markdown.
+
+Samples come from generated courses in Mongo, or from a JSONL file written by
+scripts.bulk_generate. The dictionary is written to model/dictionaries (or
+COMPRESSION_DICT_DIR). New writes use the newest dictionary; older ones must be kept
+as long as documents compressed with them exist.
+
+    cd Backend
+    python -m scripts.train_compression_dict --samples 2000
+    python -m scripts.train_compression_dict --input courses.jsonl --size 112640
+"""
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from typing import List
+
+import zstandard
+
+from model import compression
+
+
+def load_jsonl_samples(path: str, limit: int) -> List[bytes]:
+    samples = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                samples.extend(t.encode("utf-8") for t in compression.course_texts(json.loads(line)["course"]))
+            if len(samples) >= limit:
+                break
+    return samples[:limit]
+
+
+async def load_mongo_samples(limit: int) -> List[bytes]:
+    from model.db_connect import db, close_client
+    samples = []
+    try:
+        # Most recent courses first, so the dictionary follows the current prompts
+        cursor = db['course_content'].find(
+            {"content_loaded": True},
+            projection={"introduction": 1, "subtopic_contents.content": 1}
+        ).sort("_id", -1)
+        async for doc in cursor:
+            samples.extend(t.encode("utf-8") for t in compression.course_texts(doc))
+            if len(samples) >= limit:
+                break
+    finally:
+        close_client()
+    return samples[:limit]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Train a zstd dictionary on generated course markdown")
+    parser.add_argument("--input", help="JSONL courses from scripts.bulk_generate (default: read Mongo)")
+    parser.add_argument("--samples", type=int, default=2000, help="markdown fields to train on")
+    parser.add_argument("--size", type=int, default=110 * 1024, help="dictionary size in bytes")
+    parser.add_argument("--level", type=int, default=compression.ZSTD_LEVEL)
+    args = parser.parse_args()
+
+    samples = load_jsonl_samples(args.input, args.samples) if args.input else asyncio.run(load_mongo_samples(args.samples))
+    if len(samples) < 100:
+        print(f"Only {len(samples)} samples found; generate more courses before training a dictionary")
+        return 1
+
+    dictionary = zstandard.train_dictionary(args.size, samples, level=args.level)
+    os.makedirs(compression.DICT_DIR, exist_ok=True)
+    path = os.path.join(compression.DICT_DIR, f"course-{dictionary.dict_id()}.zdict")
+    with open(path, "wb") as f:
+        f.write(dictionary.as_bytes())
+    print(f"Trained dictionary {dictionary.dict_id()} ({len(dictionary.as_bytes())} bytes) "
+          f"on {len(samples)} samples -> {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
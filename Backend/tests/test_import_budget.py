@@ -0,0 +1,21 @@
+import os
+import statistics
+from pathlib import Path
+
+from benchmarks.import_budget import DEFERRED_MODULES, measure
+
+BACKEND = Path(__file__).resolve().parent.parent
+# Same default as `python -m benchmarks.import_budget`; slow CI machines can raise it
+BUDGET = float(os.getenv("IMPORT_BUDGET_SECONDS", "1.0"))
+
+
+def test_importing_main_is_within_budget(monkeypatch):
+    monkeypatch.chdir(BACKEND)
+    samples = [measure("main") for _ in range(3)]
+
+    median = statistics.median(sample["seconds"] for sample in samples)
+    assert median <= BUDGET, f"import main took {median:.3f}s, budget {BUDGET:.3f}s"
+
+    loaded = set(samples[-1]["modules"])
+    eager = [module for module in DEFERRED_MODULES if module in loaded]
+    assert not eager, f"imported eagerly by main: {', '.join(eager)}"
@@ -0,0 +1,40 @@
+from LearningAssistant.learning_service import LearningService
+
+match = LearningService._match_subtopics
+
+
+def test_exact_and_reworded_subtopics_match():
+    assert match(["Neural Networks"], ["neural networks"], "Deep Learning") == {"Neural Networks": "neural networks"}
+    assert match(["Introduction to Neural Networks"], ["Neural Networks"], "Deep Learning") == {
+        "Introduction to Neural Networks": "Neural Networks"
+    }
+
+
+def test_containment_of_two_significant_words_matches():
+    assert match(["Convolutional Neural Networks"], ["Neural Networks"], "Deep Learning") == {
+        "Convolutional Neural Networks": "Neural Networks"
+    }
+
+
+def test_one_differing_word_does_not_match():
+    assert match(["Nonlinear Regression"], ["Linear Regression"], "Machine Learning") == {}
+    assert match(["Machine Learning Subtopic 1"], ["Machine Learning Part 1"], "Machine Learning") == {}
+    assert match(["Machine Learning Subtopic 1"], ["Machine Learning Part 1"]) == {}
+
+
+def test_single_shared_word_does_not_match():
+    assert match(["Searching Algorithms"], ["Searching"], "Data Structures") == {}
+
+
+def test_topic_words_are_ignored():
+    # In an algorithms course "Searching" and "Searching Algorithms" are the same section
+    assert match(["Searching Algorithms"], ["Searching"], "Algorithms") == {"Searching Algorithms": "Searching"}
+
+
+def test_each_subtopic_is_used_once_best_match_first():
+    designed = ["Binary Search", "Binary Search Trees"]
+    user = ["Binary Search Trees", "Binary Search"]
+    assert match(designed, user, "Algorithms") == {"Binary Search": "Binary Search", "Binary Search Trees": "Binary Search Trees"}
+    assert match(["Linear Regression", "Nonlinear Regression"], ["Linear Regression"], "Machine Learning") == {
+        "Linear Regression": "Linear Regression"
+    }